@@ -9,6 +9,7 @@ Este módulo centraliza las importaciones de:
 """
 
 from app.core.database import get_session, init_db
+from app.core.replica import get_session_lectura
 from app.core.seguridad import (
     hashear_password,
     verificar_password,
@@ -16,11 +17,12 @@ from app.core.seguridad import (
     verificar_token,
 )
 from app.core.auditoria import registrar_actividad
-from app.core.templates import templates
+from app.core.templates import templates, respuesta_streaming
 
 __all__ = [
     # Database
     "get_session",
+    "get_session_lectura",
     "init_db",
     # Seguridad
     "hashear_password",
@@ -31,4 +33,5 @@ __all__ = [
     "registrar_actividad",
     # Templates
     "templates",
+    "respuesta_streaming",
 ]
@@ -0,0 +1,221 @@
+"""
+Control de admisión: límites de concurrencia por clase de ruta.
+
+Ante un pico, sin límites, todas las peticiones entran a la vez, esperan
+una conexión de PgBouncer o su turno de bcrypt y terminan expirando
+juntas. El middleware `ControlAdmision` (registrado en main.py) clasifica
+cada petición y le asigna un cupo de su clase:
+
+| Clase       | Peticiones                                     |
+|-------------|------------------------------------------------|
+| `auth`      | POST en `/auth/` (login y registro, con bcrypt) |
+| `escritura` | Resto de POST, PUT, PATCH y DELETE             |
+| `lectura`   | GET y HEAD de páginas y API                    |
+| `estatico`  | Archivos de `/static`                          |
+
+Sin cupo libre, la petición espera en una cola FIFO acotada durante un
+plazo corto. Si la cola está llena o vence el plazo, se rechaza en el
+acto con 503 y `Retry-After`: rechazar rápido una parte de la carga es
+mejor que dejar que todas las peticiones fallen tarde. `/metrics` nunca
+se limita, para poder observar el servidor saturado.
+
+El cupo se retiene hasta enviar el último byte del cuerpo: es un
+middleware ASGI puro y no `@app.middleware("http")`, cuyo `call_next`
+retorna en cuanto existen las cabeceras y liberaría el cupo antes de
+generar el cuerpo de las páginas en streaming y los archivos estáticos.
+
+Cada clase se configura con `ADMISION_<CLASE>_LIMITE`,
+`ADMISION_<CLASE>_COLA` y `ADMISION_<CLASE>_ESPERA` (segundos). Los
+límites son por proceso.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi.responses import HTMLResponse, JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metricas
+
+# Con "0" se admiten todas las peticiones sin límite
+ACTIVA = os.getenv("ADMISION_ACTIVA", "1") != "0"
+
+# Valor de Retry-After en las respuestas 503 (segundos)
+REINTENTAR_EN = int(os.getenv("ADMISION_REINTENTAR_SEGUNDOS", "2"))
+
+# Rutas que nunca se limitan
+RUTAS_EXENTAS = frozenset({"/metrics"})
+
+METODOS_LECTURA = frozenset({"GET", "HEAD", "OPTIONS"})
+
+MENSAJE_RECHAZO = "El servidor está saturado. Inténtalo de nuevo en unos segundos."
+
+# clase: (límite, cola, espera) por defecto
+_POR_DEFECTO = {
+    "auth": (4, 16, 2.0),
+    "escritura": (16, 64, 1.0),
+    "lectura": (64, 256, 0.5),
+    "estatico": (128, 256, 2.0),
+}
+
+
+class Limitador:
+    """
+    Semáforo con cola FIFO acotada y plazo de espera.
+
+    Al liberar un cupo se entrega directamente a la primera petición en
+    cola, así las que llegan después no se adelantan a las que esperan.
+    """
+
+    def __init__(self, clase: str, limite: int, cola: int, espera: float):
+        self.clase = clase
+        self.limite = limite
+        self.cola = cola
+        self.espera = espera
+        self.en_curso = 0
+        self._esperando: deque[asyncio.Future] = deque()
+
+    @property
+    def en_cola(self) -> int:
+        return len(self._esperando)
+
+    async def adquirir(self) -> bool:
+        """Espera un cupo hasta el plazo. Retorna False si la petición se rechaza."""
+        inicio = time.perf_counter()
+        if self.en_curso < self.limite and not self._esperando:
+            self.en_curso += 1
+            self._publicar()
+            metricas.espera_admision.observar(0, clase=self.clase, resultado="admitida")
+            return True
+        if len(self._esperando) >= self.cola or self.espera <= 0:
+            self._rechazar("cola_llena", inicio)
+            return False
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando.append(futuro)
+        self._publicar()
+        try:
+            await asyncio.wait((futuro,), timeout=self.espera)
+        except asyncio.CancelledError:
+            # El cliente se fue o el servidor se detiene
+            self._abandonar(futuro)
+            raise
+        if not futuro.done():
+            self._abandonar(futuro)
+            self._rechazar("plazo", inicio)
+            return False
+        metricas.espera_admision.observar(
+            time.perf_counter() - inicio, clase=self.clase, resultado="admitida"
+        )
+        return True
+
+    def liberar(self) -> None:
+        """Devuelve el cupo, entregándolo a la primera petición en cola si la hay."""
+        while self._esperando:
+            futuro = self._esperando.popleft()
+            if not futuro.done():
+                # El cupo pasa a la petición en cola: en_curso no cambia
+                futuro.set_result(None)
+                self._publicar()
+                return
+        self.en_curso -= 1
+        self._publicar()
+
+    def _abandonar(self, futuro: asyncio.Future) -> None:
+        if futuro.done() and not futuro.cancelled():
+            # Se le entregó un cupo que ya no usará
+            self.liberar()
+            return
+        futuro.cancel()
+        try:
+            self._esperando.remove(futuro)
+        except ValueError:
+            pass
+        self._publicar()
+
+    def _rechazar(self, motivo: str, inicio: float) -> None:
+        metricas.espera_admision.observar(
+            time.perf_counter() - inicio, clase=self.clase, resultado="rechazada"
+        )
+        metricas.peticiones_rechazadas_total.incrementar(clase=self.clase, motivo=motivo)
+
+    def _publicar(self) -> None:
+        metricas.admision_en_curso.fijar(self.en_curso, clase=self.clase)
+        metricas.admision_en_cola.fijar(len(self._esperando), clase=self.clase)
+
+
+def _configurar(clase: str) -> Limitador:
+    limite, cola, espera = _POR_DEFECTO[clase]
+    prefijo = f"ADMISION_{clase.upper()}_"
+    return Limitador(
+        clase,
+        limite=int(os.getenv(prefijo + "LIMITE", str(limite))),
+        cola=int(os.getenv(prefijo + "COLA", str(cola))),
+        espera=float(os.getenv(prefijo + "ESPERA", str(espera))),
+    )
+
+
+limitadores: dict[str, Limitador] = {clase: _configurar(clase) for clase in _POR_DEFECTO}
+
+
+def clasificar(metodo: str, ruta: str) -> Optional[str]:
+    """Clase de la petición, o None si no se limita."""
+    if ruta in RUTAS_EXENTAS:
+        return None
+    if ruta.startswith("/static/"):
+        return "estatico"
+    if metodo in METODOS_LECTURA:
+        return "lectura"
+    if ruta.startswith("/auth/"):
+        return "auth"
+    return "escritura"
+
+
+def limitador_para(metodo: str, ruta: str) -> Optional[Limitador]:
+    """Limitador que corresponde a la petición (None si no se limita)."""
+    if not ACTIVA:
+        return None
+    clase = clasificar(metodo, ruta)
+    return limitadores[clase] if clase else None
+
+
+def respuesta_rechazo(ruta: str):
+    """Respuesta 503 barata: sin plantillas ni base de datos."""
+    headers = {"Retry-After": str(REINTENTAR_EN), "Cache-Control": "no-store"}
+    if ruta.startswith("/api/"):
+        return JSONResponse({"detail": MENSAJE_RECHAZO}, status_code=503, headers=headers)
+    return HTMLResponse(
+        f"<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+        f"<title>VOCES - Servicio saturado</title></head>"
+        f"<body><h1>Servicio saturado</h1><p>{MENSAJE_RECHAZO}</p></body></html>",
+        status_code=503,
+        headers=headers,
+    )
+
+
+class ControlAdmision:
+    """Middleware ASGI que admite, pone en cola o rechaza cada petición HTTP."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        ruta = scope["path"]
+        limitador = limitador_para(scope["method"], ruta)
+        if limitador is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limitador.adquirir():
+            await respuesta_rechazo(ruta)(scope, receive, send)
+            return
+        try:
+            # Retorna después de enviar todo el cuerpo (o al desconectarse el cliente)
+            await self.app(scope, receive, send)
+        finally:
+            limitador.liberar()
@@ -2,11 +2,19 @@
 Utilidades para registrar actividad del usuario en el sistema de auditoría.
 """
 
+import base64
+import json
+import math
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import tuple_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
+from app.core import contadores_actividad
 from app.models.log_actividad import LogActividad
+from app.models.vistas import FilaLog
 from app.models.enums import TipoAccion
 
 
@@ -20,9 +28,11 @@ async def registrar_actividad(
     user_agent: Optional[str] = None,
     exitoso: bool = True,
     mensaje_error: Optional[str] = None,
+    contar: bool = True,
 ) -> LogActividad:
     """
     Registra una actividad del usuario en el sistema de auditoría.
+    Con `contar`, la suma además a los contadores del panel de actividad.
     """
     log = LogActividad(
         usuario_id=usuario_id,
@@ -37,25 +47,103 @@ async def registrar_actividad(
 
     session.add(log)
     await session.commit()
+    if contar:
+        contadores_actividad.registrar(tipo_accion, exitoso)
     await session.refresh(log)
 
     return log
 
 
+def codificar_cursor(creado_en: datetime, log_id: int) -> str:
+    """Cursor opaco que apunta justo después de un log del historial."""
+    texto = f"{creado_en.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Optional[tuple[datetime, int]]:
+    """Retorna (creado_en, id) del cursor, o None si no es válido."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, log_id = texto.split("|")
+        return datetime.fromisoformat(fecha), int(log_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
 async def obtener_actividad_usuario(
     session: AsyncSession,
     usuario_id: str,
-    limite: int = 50,
-    tipo_accion: Optional[TipoAccion] = None,
-) -> list[LogActividad]:
+    limite: int = 20,
+    tipos: Optional[list[TipoAccion]] = None,
+    cursor: Optional[tuple[datetime, int]] = None,
+) -> tuple[list[FilaLog], Optional[str]]:
     """
-    Obtiene el historial de actividad de un usuario.
+    Obtiene una página del historial de actividad de un usuario, del más
+    reciente al más antiguo.
+
+    Usa paginación por cursor sobre (creado_en, id): cada página se lee
+    directamente del índice `ix_logactividad_usuario_creado` (solo índice,
+    sin visitar la tabla), con el mismo costo para un usuario nuevo que para
+    uno con cientos de miles de eventos. Retorna (filas, cursor_siguiente);
+    el cursor es None en la última página.
     """
-    statement = select(LogActividad).where(LogActividad.usuario_id == usuario_id)
+    statement = select(*FilaLog.columnas).where(LogActividad.usuario_id == usuario_id)
 
-    if tipo_accion:
-        statement = statement.where(LogActividad.tipo_accion == tipo_accion)
+    if tipos:
+        statement = statement.where(LogActividad.tipo_accion.in_(tipos))
+    if cursor:
+        statement = statement.where(tuple_(LogActividad.creado_en, LogActividad.id) < cursor)
 
-    statement = statement.order_by(LogActividad.creado_en.desc()).limit(limite)
+    # Un registro extra indica si hay página siguiente
+    statement = statement.order_by(
+        LogActividad.creado_en.desc(), LogActividad.id.desc()
+    ).limit(limite + 1)
     result = await session.execute(statement)
-    return result.scalars().all()
+    filas = [FilaLog(*fila) for fila in result]
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1].creado_en, filas[-1].id)
+    return filas, siguiente
+
+
+def parsear_filtro_detalle(texto: str) -> Optional[dict]:
+    """
+    Convierte un filtro `clave:valor` en el documento JSON a buscar.
+    Las claves anidadas se separan con puntos: `a.b:valor` -> {"a": {"b": "valor"}}.
+    Los valores escalares JSON conservan su tipo (`intentos:5` -> 5,
+    `exitoso:true` -> True); para buscar el texto, se escribe entre
+    comillas (`codigo:"5"`). Retorna None si el texto no tiene el formato esperado.
+    """
+    clave, separador, valor = texto.partition(":")
+    clave, valor = clave.strip(), valor.strip()
+    if not separador or not clave or not valor:
+        return None
+    documento = _valor_filtro(valor)
+    for parte in reversed(clave.split(".")):
+        if not parte:
+            return None
+        documento = {parte: documento}
+    return documento
+
+
+def _valor_filtro(valor: str):
+    """Número, booleano, null o texto entre comillas si es un escalar JSON; si no, el texto."""
+    try:
+        escalar = json.loads(valor)
+    except ValueError:
+        return valor
+    if isinstance(escalar, (dict, list)) or (isinstance(escalar, float) and not math.isfinite(escalar)):
+        return valor
+    return escalar
+
+
+def filtrar_por_detalles(statement, filtros: list[dict]):
+    """
+    Restringe la consulta a los logs cuyos `detalles` contienen todos los
+    documentos de `filtros` (operador `@>`, resuelto con el índice GIN).
+    """
+    for filtro in filtros:
+        statement = statement.where(type_coerce(LogActividad.detalles, JSONB).contains(filtro))
+    return statement
@@ -0,0 +1,119 @@
+"""
+Búsqueda de usuarios por username, nombres y apellidos.
+
+La búsqueda se apoya en funciones SQL inmutables que normalizan el texto
+(minúsculas y sin tildes), definidas en `SENTENCIAS_DDL`
+(`app/core/database.py`) e indexadas:
+
+- `voces_texto_busqueda(username, nombres, apellidos)`, con un índice GIN
+  `pg_trgm`, para coincidencias por subcadena (3+ caracteres).
+- `voces_normalizar(campo)`, con un índice B-tree `text_pattern_ops` por
+  campo, para prefijos cortos (1-2 caracteres): el término se busca al
+  inicio del username, de los nombres o de los apellidos. Solo al inicio
+  de cada campo: "pe" encuentra "Pérez García" pero no "García Pérez".
+
+Las consultas usan exactamente la misma expresión que los índices para que
+el planificador de PostgreSQL pueda aprovecharlos.
+"""
+
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models.enums import EstadoCuenta
+from app.models.usuario import Usuario
+
+# Longitud mínima para que el índice de trigramas sea útil
+LONGITUD_MINIMA_TRIGRAMA = 3
+
+# Límite máximo de resultados que puede solicitar un cliente
+LIMITE_MAXIMO = 20
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """
+    Normaliza un término de búsqueda igual que lo hace la base de datos:
+    minúsculas, sin tildes ni diacríticos y sin espacios redundantes.
+    """
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+
+def _escapar_like(texto: str) -> str:
+    """Escapa los comodines de LIKE para que se busquen literalmente."""
+    return texto.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def expresion_busqueda():
+    """
+    Expresión SQL indexada sobre la que se realizan las búsquedas.
+    Debe coincidir con la expresión usada en los índices.
+    """
+    return func.voces_texto_busqueda(
+        Usuario.username, Usuario.nombres, Usuario.apellidos
+    )
+
+
+def expresiones_prefijo() -> tuple:
+    """Expresiones indexadas para prefijos cortos, una por campo."""
+    return tuple(
+        func.voces_normalizar(campo)
+        for campo in (Usuario.username, Usuario.nombres, Usuario.apellidos)
+    )
+
+
+def filtrar_por_termino(statement, termino: str):
+    """
+    Aplica a una consulta sobre `Usuario` el filtro y el orden de relevancia
+    de la búsqueda. El término debe venir ya normalizado.
+    """
+    patron = _escapar_like(termino)
+
+    if len(termino) < LONGITUD_MINIMA_TRIGRAMA:
+        # Prefijo corto: un OR que combina los índices B-tree de cada campo
+        return statement.where(
+            or_(*(e.like(f"{patron}%", escape="!") for e in expresiones_prefijo()))
+        ).order_by(Usuario.username)
+
+    expresion = expresion_busqueda()
+
+    # Subcadena: usa el índice GIN de trigramas
+    return statement.where(expresion.like(f"%{patron}%", escape="!")).order_by(
+        func.similarity(expresion, termino).desc(),
+        Usuario.username,
+    )
+
+
+async def buscar_usuarios(
+    session: AsyncSession,
+    termino: str,
+    limite: int = 10,
+) -> list:
+    """
+    Busca usuarios cuyo username, nombres o apellidos coincidan con el término.
+
+    Returns:
+        Filas con `username`, `nombres`, `apellidos` y `avatar_url`,
+        ordenadas por relevancia.
+    """
+    termino = normalizar_texto(termino)
+    if not termino:
+        return []
+
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    statement = select(
+        Usuario.username,
+        Usuario.nombres,
+        Usuario.apellidos,
+        Usuario.avatar_url,
+    ).where(Usuario.estado_cuenta != EstadoCuenta.Eliminado)
+    statement = filtrar_por_termino(statement, termino).limit(limite)
+
+    result = await session.execute(statement)
+    return result.all()
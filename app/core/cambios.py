@@ -0,0 +1,22 @@
+"""
+Detección de cambios entre los datos recibidos y el estado actual de un modelo.
+
+Permite emitir UPDATE dirigidos solo con los campos modificados y omitir
+por completo la escritura cuando el formulario no cambia nada.
+"""
+
+from typing import Any
+
+
+def calcular_cambios(actual: Any, nuevos: dict) -> dict:
+    """
+    Compara los valores de `nuevos` con los atributos de `actual`.
+
+    Returns:
+        Diccionario {campo: valor_nuevo} solo con los campos que cambiaron.
+    """
+    return {
+        campo: valor
+        for campo, valor in nuevos.items()
+        if getattr(actual, campo, None) != valor
+    }
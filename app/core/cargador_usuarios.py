@@ -0,0 +1,128 @@
+"""
+Carga por lotes de perfiles públicos (estilo DataLoader).
+
+Feeds, hilos de comentarios o listados necesitan los datos de muchos
+autores a la vez. Consultarlos uno por uno cuesta un viaje a la base de
+datos por usuario. `CargadorUsuarios` junta las búsquedas por id o
+username hechas en el mismo ciclo del event loop y las resuelve con una
+sola consulta `WHERE id = ANY(...) OR username = ANY(...)`:
+
+    cargador = obtener_cargador(session)
+    autores = await asyncio.gather(*(cargador.por_id(i) for i in ids))
+
+Cada búsqueda queda en caché durante la petición. El cargador vive en
+`session.info`, así que con la sesión compartida de la petición
+(app/core/sesion_peticion.py) hay uno por petición. Solo un lote se
+consulta a la vez: la sesión nunca se usa de forma concurrente.
+"""
+
+import asyncio
+from typing import Iterable, Optional
+
+from sqlalchemy import String, any_, bindparam, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import EstadoCuenta, PerfilPublico, Usuario
+
+_CLAVE_SESION = "voces_cargador_usuarios"
+
+
+class CargadorUsuarios:
+    """Resuelve búsquedas de perfiles por id o username en lotes."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.consultas = 0
+        self._por_id: dict[str, Optional[PerfilPublico]] = {}
+        self._por_username: dict[str, Optional[PerfilPublico]] = {}
+        self._pendientes_id: dict[str, asyncio.Future] = {}
+        self._pendientes_username: dict[str, asyncio.Future] = {}
+        self._programado = False
+        self._tarea: Optional[asyncio.Task] = None
+        self._candado = asyncio.Lock()
+
+    async def por_id(self, usuario_id: str) -> Optional[PerfilPublico]:
+        return await self._futuro(usuario_id, self._por_id, self._pendientes_id)
+
+    async def por_username(self, username: str) -> Optional[PerfilPublico]:
+        return await self._futuro(username, self._por_username, self._pendientes_username)
+
+    async def muchos(
+        self, ids: Iterable[str] = (), usernames: Iterable[str] = ()
+    ) -> list[Optional[PerfilPublico]]:
+        """Perfiles en el orden pedido (None si no existe), en una sola consulta."""
+        futuros = [self._futuro(i, self._por_id, self._pendientes_id) for i in ids]
+        futuros += [
+            self._futuro(u, self._por_username, self._pendientes_username) for u in usernames
+        ]
+        return list(await asyncio.gather(*futuros))
+
+    def _futuro(self, clave: str, cache: dict, pendientes: dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if clave in cache:
+            futuro = loop.create_future()
+            futuro.set_result(cache[clave])
+            return futuro
+        futuro = pendientes.get(clave)
+        if futuro is None:
+            futuro = pendientes[clave] = loop.create_future()
+            if not self._programado:
+                # Despachar al final del ciclo, cuando ya se juntaron las demás búsquedas
+                self._programado = True
+                loop.call_soon(self._iniciar_despacho)
+        return futuro
+
+    def _iniciar_despacho(self) -> None:
+        # Referencia a la tarea para que no la recolecte el GC a medio camino
+        self._tarea = asyncio.ensure_future(self._despachar())
+
+    async def _despachar(self) -> None:
+        async with self._candado:
+            self._programado = False
+            ids, self._pendientes_id = self._pendientes_id, {}
+            usernames, self._pendientes_username = self._pendientes_username, {}
+            if not ids and not usernames:
+                return
+            try:
+                filas = await self._consultar(list(ids), list(usernames))
+            except Exception as e:
+                for futuro in (*ids.values(), *usernames.values()):
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                return
+
+        for perfil in filas:
+            self._por_id[perfil.id] = perfil
+            self._por_username[perfil.username] = perfil
+        for claves, cache in ((ids, self._por_id), (usernames, self._por_username)):
+            for clave, futuro in claves.items():
+                perfil = cache.setdefault(clave, None)
+                if not futuro.done():
+                    futuro.set_result(perfil)
+
+    async def _consultar(self, ids: list[str], usernames: list[str]) -> list[PerfilPublico]:
+        self.consultas += 1
+        condiciones = []
+        # Un solo parámetro de tipo arreglo: la misma sentencia para cualquier N
+        if ids:
+            condiciones.append(Usuario.id == any_(bindparam("ids", ids, type_=ARRAY(String))))
+        if usernames:
+            condiciones.append(
+                Usuario.username == any_(bindparam("usernames", usernames, type_=ARRAY(String)))
+            )
+        result = await self.session.execute(
+            select(*PerfilPublico.columnas).where(
+                or_(*condiciones), Usuario.estado_cuenta != EstadoCuenta.Eliminado
+            )
+        )
+        return [PerfilPublico(*fila) for fila in result]
+
+
+def obtener_cargador(session: AsyncSession) -> CargadorUsuarios:
+    """Cargador asociado a la sesión (uno por petición con la sesión compartida)."""
+    cargador = session.info.get(_CLAVE_SESION)
+    if cargador is None:
+        cargador = session.info[_CLAVE_SESION] = CargadorUsuarios(session)
+    return cargador
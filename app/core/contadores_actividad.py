@@ -0,0 +1,246 @@
+"""
+Contadores de actividad en memoria para el panel de seguridad.
+
+Responder "¿cuántos logins fallidos por minuto hay ahora?" agregando
+`LogActividad` obliga a recorrer la tabla. En su lugar, cada worker
+mantiene un buffer circular de 1440 cubetas de un minuto (24 horas) con
+el número de eventos por `TipoAccion` y resultado, alimentado por
+`registrar_actividad` y, para los logins fallidos, por el limitador de
+intentos en cada intento (la auditoría solo guarda un resumen por IP).
+
+Para combinar los workers, `tarea_volcado_contadores()` copia cada pocos
+segundos las cubetas modificadas a la tabla `contador_actividad` (una
+fila por worker, minuto, tipo y resultado). El panel suma esas filas de
+los demás workers con las cubetas en memoria del propio worker: como
+mucho unas decenas de miles de filas indexadas por minuto, nunca la
+tabla de auditoría.
+
+Ventanas: último minuto (estimado con la cubeta actual más la parte
+proporcional de la anterior), última hora y último día.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.database import async_session_maker
+from app.core.invalidacion import ORIGEN
+from app.core.trabajos import periodico, trabajo
+from app.models import ContadorActividad, TipoAccion
+
+logger = logging.getLogger("voces.contadores")
+
+MINUTOS_DIA = 1440
+
+# Cada cuánto se vuelcan los contadores a la base de datos (segundos)
+INTERVALO_VOLCADO = float(os.getenv("CONTADORES_INTERVALO_VOLCADO", "10"))
+
+# Minutos de historial que se conservan en la tabla
+MINUTOS_RETENCION = MINUTOS_DIA + 60
+
+
+def _minuto(ahora: Optional[float] = None) -> int:
+    return int((time.time() if ahora is None else ahora) // 60)
+
+
+class ContadoresActividad:
+    """Buffer circular de cubetas por minuto con conteos por (tipo, exitoso)."""
+
+    def __init__(self, cubetas: int = MINUTOS_DIA):
+        self.cubetas = cubetas
+        self._minutos = [-1] * cubetas
+        self._conteos: list[Counter] = [Counter() for _ in range(cubetas)]
+        self._modificados: set[int] = set()
+
+    def _cubeta(self, minuto: int) -> Counter:
+        indice = minuto % self.cubetas
+        if self._minutos[indice] != minuto:
+            # La cubeta pertenecía a un minuto de hace más de un día
+            self._minutos[indice] = minuto
+            self._conteos[indice] = Counter()
+        return self._conteos[indice]
+
+    def registrar(
+        self, tipo_accion: TipoAccion, exitoso: bool, cantidad: int = 1, ahora: Optional[float] = None
+    ) -> None:
+        minuto = _minuto(ahora)
+        self._cubeta(minuto)[(TipoAccion(tipo_accion).value, bool(exitoso))] += cantidad
+        self._modificados.add(minuto)
+
+    def sumar(self, desde_minuto: int, hasta_minuto: int) -> Counter:
+        """Suma de las cubetas en [desde_minuto, hasta_minuto]."""
+        total: Counter = Counter()
+        for minuto in range(max(desde_minuto, hasta_minuto - self.cubetas + 1), hasta_minuto + 1):
+            indice = minuto % self.cubetas
+            if self._minutos[indice] == minuto:
+                total.update(self._conteos[indice])
+        return total
+
+    def tomar_modificados(self) -> dict[int, Counter]:
+        """Cubetas modificadas desde la última llamada (para volcarlas)."""
+        modificados = {}
+        for minuto in self._modificados:
+            indice = minuto % self.cubetas
+            if self._minutos[indice] == minuto:
+                modificados[minuto] = Counter(self._conteos[indice])
+        self._modificados = set()
+        return modificados
+
+    def devolver_modificados(self, minutos) -> None:
+        """Vuelve a marcar como modificadas las cubetas de un volcado fallido."""
+        self._modificados.update(minutos)
+
+
+contadores = ContadoresActividad()
+
+
+def registrar(tipo_accion: TipoAccion, exitoso: bool, cantidad: int = 1) -> None:
+    """Cuenta un evento de auditoría en el worker actual."""
+    contadores.registrar(tipo_accion, exitoso, cantidad)
+
+
+def _ventanas(actual: Counter, anterior: Counter, hora: Counter, dia: Counter, fraccion: float) -> dict:
+    """Arma las ventanas minuto/hora/día por tipo de acción."""
+    claves = set(dia) | set(hora) | set(actual) | set(anterior)
+    minuto = Counter(
+        {clave: actual[clave] + anterior[clave] * (1 - fraccion) for clave in claves}
+    )
+    resultado = {}
+    for nombre, conteo in (("minuto", minuto), ("hora", hora), ("dia", dia)):
+        por_tipo: dict[str, dict] = {}
+        for (tipo, exitoso), total in conteo.items():
+            if not total:
+                continue
+            fila = por_tipo.setdefault(tipo, {"tipo_accion": tipo, "exitosos": 0, "fallidos": 0})
+            fila["exitosos" if exitoso else "fallidos"] += round(total, 1)
+        resultado[nombre] = sorted(por_tipo.values(), key=lambda f: f["tipo_accion"])
+    return resultado
+
+
+def _sumas_locales(minuto_actual: int) -> tuple[Counter, Counter, Counter, Counter]:
+    return (
+        contadores.sumar(minuto_actual, minuto_actual),
+        contadores.sumar(minuto_actual - 1, minuto_actual - 1),
+        contadores.sumar(minuto_actual - 59, minuto_actual),
+        contadores.sumar(minuto_actual - MINUTOS_DIA + 1, minuto_actual),
+    )
+
+
+async def _sumas_otros_workers(session, minuto_actual: int) -> tuple[Counter, Counter, Counter, Counter]:
+    tabla = ContadorActividad
+    result = await session.execute(
+        select(
+            tabla.tipo_accion,
+            tabla.exitoso,
+            func.sum(tabla.total).filter(tabla.minuto == minuto_actual),
+            func.sum(tabla.total).filter(tabla.minuto == minuto_actual - 1),
+            func.sum(tabla.total).filter(tabla.minuto > minuto_actual - 60),
+            func.sum(tabla.total),
+        )
+        .where(
+            tabla.minuto > minuto_actual - MINUTOS_DIA,
+            tabla.minuto <= minuto_actual,
+            tabla.worker != ORIGEN,
+        )
+        .group_by(tabla.tipo_accion, tabla.exitoso)
+    )
+    sumas = (Counter(), Counter(), Counter(), Counter())
+    for tipo, exitoso, *totales in result.all():
+        for conteo, total in zip(sumas, totales):
+            if total:
+                conteo[(tipo, exitoso)] += total
+    return sumas
+
+
+async def resumen_actividad(session=None, ahora: Optional[float] = None) -> dict:
+    """
+    Conteos por tipo de acción en el último minuto, hora y día.
+    Con `session`, combina los contadores de todos los workers; si la
+    consulta falla (o sin sesión), usa solo los del worker actual.
+    """
+    ahora = time.time() if ahora is None else ahora
+    minuto_actual = _minuto(ahora)
+    sumas = list(_sumas_locales(minuto_actual))
+    combinado = False
+    if session is not None:
+        try:
+            otros = await _sumas_otros_workers(session, minuto_actual)
+            for local, ajeno in zip(sumas, otros):
+                local.update(ajeno)
+            combinado = True
+        except Exception as e:
+            logger.warning("No se pudieron combinar los contadores de otros workers: %s", e)
+
+    fraccion = (ahora % 60) / 60
+    return {
+        "ventanas": _ventanas(*sumas, fraccion),
+        "todos_los_workers": combinado,
+        "generado_en": int(ahora),
+    }
+
+
+async def volcar_contadores() -> int:
+    """Copia a la tabla las cubetas modificadas. Retorna cuántas filas escribió."""
+    modificados = contadores.tomar_modificados()
+    filas = [
+        {"worker": ORIGEN, "minuto": minuto, "tipo_accion": tipo, "exitoso": exitoso, "total": total}
+        for minuto, conteo in modificados.items()
+        for (tipo, exitoso), total in conteo.items()
+    ]
+    if not filas:
+        return 0
+    try:
+        async with async_session_maker() as session:
+            sentencia = insert(ContadorActividad).values(filas)
+            await session.execute(
+                sentencia.on_conflict_do_update(
+                    index_elements=["worker", "minuto", "tipo_accion", "exitoso"],
+                    set_={"total": sentencia.excluded.total},
+                )
+            )
+            await session.commit()
+    except Exception:
+        contadores.devolver_modificados(modificados)
+        raise
+    return len(filas)
+
+
+@trabajo("purgar_contadores_antiguos")
+async def purgar_contadores_antiguos() -> None:
+    async with async_session_maker() as session:
+        await session.execute(
+            delete(ContadorActividad).where(
+                ContadorActividad.minuto < _minuto() - MINUTOS_RETENCION
+            )
+        )
+        await session.commit()
+
+
+async def tarea_volcado_contadores() -> None:
+    """
+    Tarea de fondo iniciada en el `lifespan`: vuelca los contadores del
+    worker cada `INTERVALO_VOLCADO` segundos. Al cancelarse hace un último
+    volcado. El historial viejo lo purga el trabajo periódico
+    `purgar_contadores_antiguos` (una vez por hora).
+    """
+    try:
+        while True:
+            await asyncio.sleep(INTERVALO_VOLCADO)
+            try:
+                await volcar_contadores()
+            except Exception as e:
+                logger.warning("Error al volcar los contadores de actividad: %s", e)
+    finally:
+        try:
+            await volcar_contadores()
+        except Exception:
+            pass
+
+
+periodico("purgar_contadores_antiguos", "7 * * * *")
@@ -0,0 +1,86 @@
+"""
+Expresiones cron de cinco campos para los trabajos periódicos.
+
+Formato: `minuto hora día-del-mes mes día-de-la-semana`, con `*`, listas
+(`1,15`), rangos (`1-5`) y pasos (`*/10`, `8-18/2`). El día de la semana
+va de 0 (domingo) a 6; también se acepta 7 como domingo. Como en cron, si
+se restringen tanto el día del mes como el de la semana, basta con que
+coincida uno de los dos.
+
+    Cron("*/5 * * * *").siguiente(datetime.now())
+"""
+
+from datetime import datetime, timedelta
+
+_RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parsear_campo(texto: str, minimo: int, maximo: int) -> frozenset[int]:
+    valores = set()
+    for parte in texto.split(","):
+        rango, _, paso = parte.partition("/")
+        paso = int(paso) if paso else 1
+        if rango == "*":
+            inicio, fin = minimo, maximo
+        elif "-" in rango:
+            inicio, fin = (int(v) for v in rango.split("-", 1))
+        else:
+            inicio = fin = int(rango)
+            if paso != 1:
+                fin = maximo
+        if paso < 1 or not (minimo <= inicio <= fin <= maximo):
+            raise ValueError(f"Campo cron fuera de rango: {texto!r}")
+        valores.update(range(inicio, fin + 1, paso))
+    return frozenset(valores)
+
+
+class Cron:
+    """Expresión cron ya interpretada."""
+
+    __slots__ = ("expresion", "minutos", "horas", "dias", "meses", "dias_semana", "_dia_libre", "_semana_libre")
+
+    def __init__(self, expresion: str):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: {expresion!r}")
+        try:
+            self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+                _parsear_campo(campo, *rango) for campo, rango in zip(campos, _RANGOS)
+            )
+        except ValueError as e:
+            raise ValueError(f"Expresión cron inválida {expresion!r}: {e}") from None
+        self.expresion = expresion
+        # 7 también es domingo
+        self.dias_semana = frozenset(d % 7 for d in dias_semana)
+        self._dia_libre = campos[2] == "*"
+        self._semana_libre = campos[4] == "*"
+
+    def _coincide_dia(self, momento: datetime) -> bool:
+        dia = momento.day in self.dias
+        # isoweekday: lunes=1 ... domingo=7
+        semana = momento.isoweekday() % 7 in self.dias_semana
+        if self._dia_libre or self._semana_libre:
+            return dia and semana
+        return dia or semana
+
+    def siguiente(self, desde: datetime) -> datetime:
+        """Primer momento estrictamente posterior a `desde` que coincide."""
+        momento = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Cota de seguridad: cualquier expresión válida coincide en menos de 5 años
+        limite = momento + timedelta(days=366 * 5)
+        while momento < limite:
+            if momento.month not in self.meses:
+                anio, mes = divmod(momento.month, 12)
+                momento = momento.replace(year=momento.year + anio, month=mes + 1, day=1, hour=0, minute=0)
+            elif not self._coincide_dia(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+        raise ValueError(f"La expresión cron nunca coincide: {self.expresion!r}")
+
+    def __repr__(self) -> str:
+        return f"Cron({self.expresion!r})"
@@ -15,6 +15,10 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 
+from app.core import metricas, perfilado
+from app.core.esquema import asegurar_esquema
+from app.core.sesion_peticion import sesion_compartida
+
 # Importar modelos para que SQLModel los detecte al crear tablas
 from app.models import *  # noqa: F401, F403
 
@@ -41,22 +45,126 @@ engine = create_async_engine(
     future=True,  # future se en
 )
 
+# Réplica de lectura opcional (ver app/core/replica.py). Si no se configura,
+# las sesiones de lectura usan el engine principal.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL and DATABASE_REPLICA_URL.startswith("postgresql://"):
+    DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://")
+
+engine_replica = (
+    create_async_engine(DATABASE_REPLICA_URL, echo=False, poolclass=NullPool, future=True)
+    if DATABASE_REPLICA_URL
+    else None
+)
+
+# Medir número y duración de las consultas (ver app/core/metricas.py)
+# y registrar consultas lentas y patrones N+1 (ver app/core/perfilado.py)
+for _engine in filter(None, (engine, engine_replica)):
+    metricas.instrumentar_engine(_engine)
+    perfilado.instrumentar_engine(_engine)
+
+# Sentencias DDL adicionales que `create_all` no gestiona (extensiones,
+# funciones e índices sobre expresiones). Deben ser idempotentes.
+SENTENCIAS_DDL = [
+    # Columnas añadidas a tablas existentes (create_all no altera tablas)
+    "ALTER TABLE usuario ADD COLUMN IF NOT EXISTS version_token integer NOT NULL DEFAULT 0",
+    # Búsqueda estructurada en la auditoría: detalles pasa de json a jsonb
+    """
+    DO $$ BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'logactividad' AND column_name = 'detalles') = 'json' THEN
+            ALTER TABLE logactividad ALTER COLUMN detalles TYPE jsonb USING detalles::jsonb;
+        END IF;
+    END $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_logactividad_detalles_gin ON logactividad
+    USING gin (detalles jsonb_path_ops)
+    """,
+    # Historial de actividad por usuario (obtener_actividad_usuario): índice
+    # cubriente para paginar por cursor solo con el índice. Reemplaza al
+    # índice simple de usuario_id, que es su prefijo.
+    """
+    CREATE INDEX IF NOT EXISTS ix_logactividad_usuario_creado ON logactividad
+    (usuario_id, creado_en DESC, id DESC) INCLUDE (tipo_accion, exitoso, descripcion)
+    """,
+    "DROP INDEX IF EXISTS ix_logactividad_usuario_id",
+    # Cola de trabajos (app/core/trabajos.py): índice parcial con solo los
+    # pendientes, en el orden en que se reclaman
+    """
+    CREATE INDEX IF NOT EXISTS ix_trabajo_pendientes ON trabajo (disponible_en, id)
+    WHERE estado = 'Pendiente'
+    """,
+    # Clave única solo entre los trabajos vivos: un trabajo Fallido no impide
+    # volver a encolar la misma clave (por ejemplo, la purga de una cuenta)
+    "ALTER TABLE trabajo DROP CONSTRAINT IF EXISTS trabajo_clave_unica_key",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_trabajo_clave_unica ON trabajo (clave_unica)
+    WHERE estado <> 'Fallido'
+    """,
+    # Búsqueda de usuarios (app/core/busqueda.py)
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION voces_texto_busqueda(text, text, text)
+    RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary,
+                                    $1 || ' ' || $2 || ' ' || $3)) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_usuario_busqueda_trgm ON usuario
+    USING gin (voces_texto_busqueda(username, nombres, apellidos) gin_trgm_ops)
+    """,
+    # Prefijos cortos: un índice por campo, para que "an" encuentre también
+    # a quien se llama Ana o se apellida Andrade (no solo usernames "an...")
+    """
+    CREATE OR REPLACE FUNCTION voces_normalizar(text)
+    RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$
+    """,
+    "DROP INDEX IF EXISTS ix_usuario_busqueda_prefijo",
+    """
+    CREATE INDEX IF NOT EXISTS ix_usuario_prefijo_username ON usuario
+    (voces_normalizar(username) text_pattern_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_usuario_prefijo_nombres ON usuario
+    (voces_normalizar(nombres) text_pattern_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_usuario_prefijo_apellidos ON usuario
+    (voces_normalizar(apellidos) text_pattern_ops)
+    """,
+    # Emails sin distinguir mayúsculas (disponibilidad y registro)
+    "CREATE INDEX IF NOT EXISTS ix_usuario_email_lower ON usuario (lower(email))",
+]
+
 # Factory de sesiones asíncronas
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+async_session_maker_replica = (
+    sessionmaker(engine_replica, class_=AsyncSession, expire_on_commit=False)
+    if engine_replica
+    else async_session_maker
+)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependencia para obtener una sesión de base de datos en los endpoints.
+    Dentro de una petición es la misma sesión que usa el middleware
+    (ver app/core/sesion_peticion.py).
     """
-    async with async_session_maker() as session:
+    async with sesion_compartida(async_session_maker) as session:
         yield session
 
 
-async def init_db():
+async def init_db() -> bool:
     """
-    Inicializa la base de datos creando las tablas definidas en los modelos.
+    Inicializa la base de datos creando las tablas definidas en los modelos
+    y aplicando las sentencias DDL adicionales (extensiones e índices).
+
+    Solo ejecuta DDL si la huella del esquema cambió desde el último
+    arranque (ver app/core/esquema.py). Retorna True si aplicó cambios.
     """
-    async with engine.begin() as conn:
-        # await conn.run_sync(SQLModel.metadata.drop_all) # Descomentar para reiniciar DB
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # Para reiniciar la DB: SQLModel.metadata.drop_all y ESQUEMA_FORZAR_DDL=1
+    return await asegurar_esquema(engine, SQLModel.metadata, SENTENCIAS_DDL)
@@ -0,0 +1,192 @@
+"""
+Comprobación de disponibilidad de username y email respaldada por filtros de Bloom.
+
+Cada worker mantiene en memoria dos filtros de Bloom con contadores
+(uno para usernames y otro para emails) que se reconstruyen al iniciar
+la aplicación y se actualizan en cada alta y baja de usuario.
+
+- Si el filtro dice que el valor NO existe, es seguro: está disponible
+  y no se consulta la base de datos.
+- Si el filtro dice que PUEDE existir, se confirma con una consulta.
+
+Los emails se comparan sin distinguir mayúsculas: el filtro guarda y
+consulta `normalizar_email(email)` y la confirmación en la base de datos
+usa `lower(email)` (índice `ix_usuario_email_lower`).
+
+Los filtros son por proceso. Las altas y bajas de otros workers llegan
+por el bus de invalidación (app/core/invalidacion.py) con un pequeño
+retraso, por lo que `registrar_usuario` sigue validando contra la base
+de datos antes de insertar.
+"""
+
+import hashlib
+import math
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core import invalidacion
+from app.models.usuario import Usuario
+
+# Capacidad mínima con la que se dimensionan los filtros
+CAPACIDAD_MINIMA = 10_000
+
+# Tasa de falsos positivos objetivo
+TASA_FALSOS_POSITIVOS = 0.01
+
+# Valor máximo de cada contador (los saturados nunca se decrementan)
+_CONTADOR_MAXIMO = 255
+
+
+def normalizar_email(email: str) -> str:
+    """Forma canónica de un email para compararlo sin distinguir mayúsculas."""
+    return email.strip().lower()
+
+
+class FiltroBloomContador:
+    """
+    Filtro de Bloom con contadores de 8 bits, lo que permite quitar
+    elementos además de agregarlos.
+    """
+
+    __slots__ = ("_contadores", "_tamano", "_num_hashes", "total")
+
+    def __init__(
+        self,
+        capacidad: int = CAPACIDAD_MINIMA,
+        tasa_falsos_positivos: float = TASA_FALSOS_POSITIVOS,
+    ):
+        capacidad = max(1, capacidad)
+        # m = -n·ln(p) / ln(2)²  y  k = (m/n)·ln(2)
+        tamano = math.ceil(-capacidad * math.log(tasa_falsos_positivos) / math.log(2) ** 2)
+        self._tamano = max(8, tamano)
+        self._num_hashes = max(1, round(self._tamano / capacidad * math.log(2)))
+        self._contadores = bytearray(self._tamano)
+        self.total = 0
+
+    def _posiciones(self, valor: str):
+        """Posiciones del valor usando doble hashing (Kirsch-Mitzenmacher)."""
+        digest = hashlib.blake2b(valor.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self._num_hashes):
+            yield (h1 + i * h2) % self._tamano
+
+    def agregar(self, valor: str) -> None:
+        """Agrega un valor al filtro."""
+        for pos in self._posiciones(valor):
+            if self._contadores[pos] < _CONTADOR_MAXIMO:
+                self._contadores[pos] += 1
+        self.total += 1
+
+    def quitar(self, valor: str) -> None:
+        """
+        Quita un valor previamente agregado.
+        Quitar un valor que nunca se agregó puede provocar falsos negativos.
+        """
+        if valor not in self:
+            return
+        for pos in self._posiciones(valor):
+            if 0 < self._contadores[pos] < _CONTADOR_MAXIMO:
+                self._contadores[pos] -= 1
+        self.total = max(0, self.total - 1)
+
+    def __contains__(self, valor: str) -> bool:
+        """True si el valor puede estar en el filtro; False si seguro no está."""
+        return all(self._contadores[pos] for pos in self._posiciones(valor))
+
+
+class _FiltrosDisponibilidad:
+    """Estado por proceso de los filtros de usernames y emails."""
+
+    def __init__(self):
+        self.usernames = FiltroBloomContador()
+        self.emails = FiltroBloomContador()
+        self.listo = False
+
+
+_filtros = _FiltrosDisponibilidad()
+
+
+async def reconstruir_filtros(session: AsyncSession) -> int:
+    """
+    Reconstruye los filtros a partir de todos los usuarios existentes.
+    Se invoca al iniciar la aplicación. Retorna el número de usuarios cargados.
+    """
+    result = await session.execute(select(Usuario.username, Usuario.email))
+    filas = result.all()
+
+    capacidad = max(CAPACIDAD_MINIMA, len(filas) * 2)
+    usernames = FiltroBloomContador(capacidad)
+    emails = FiltroBloomContador(capacidad)
+    for username, email in filas:
+        usernames.agregar(username)
+        emails.agregar(normalizar_email(email))
+
+    _filtros.usernames = usernames
+    _filtros.emails = emails
+    _filtros.listo = True
+    return len(filas)
+
+
+def registrar_alta(username: str, email: str) -> None:
+    """Refleja en los filtros un usuario recién creado."""
+    _filtros.usernames.agregar(username)
+    _filtros.emails.agregar(normalizar_email(email))
+
+
+def registrar_baja(username: str, email: str) -> None:
+    """Refleja en los filtros un usuario eliminado definitivamente."""
+    _filtros.usernames.quitar(username)
+    _filtros.emails.quitar(normalizar_email(email))
+
+
+async def _recargar_filtros() -> None:
+    """Reconstruye los filtros tras una reconexión del bus (pudo perder altas)."""
+    from app.core.database import async_session_maker
+
+    async with async_session_maker() as session:
+        await reconstruir_filtros(session)
+
+
+invalidacion.suscribir(invalidacion.TEMA_ALTA_USUARIO, registrar_alta)
+invalidacion.suscribir(invalidacion.TEMA_BAJA_USUARIO, registrar_baja)
+invalidacion.al_reconectar(_recargar_filtros)
+
+
+async def _existe_en_db(session: AsyncSession, columna, valor: str) -> bool:
+    result = await session.execute(select(Usuario.id).where(columna == valor).limit(1))
+    return result.first() is not None
+
+
+async def verificar_disponibilidad(
+    session: AsyncSession,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+) -> dict:
+    """
+    Indica si un username y/o email están disponibles.
+    Solo consulta la base de datos cuando el filtro reporta un posible acierto.
+    """
+    resultado = {}
+    consultas = (
+        ("username", username, username, _filtros.usernames, Usuario.username),
+        (
+            "email",
+            email,
+            email and normalizar_email(email),
+            _filtros.emails,
+            func.lower(Usuario.email),
+        ),
+    )
+    for campo, valor, clave, filtro, columna in consultas:
+        if not valor:
+            continue
+        if _filtros.listo and clave not in filtro:
+            disponible = True
+        else:
+            disponible = not await _existe_en_db(session, columna, clave)
+        resultado[campo] = {"valor": valor, "disponible": disponible}
+    return resultado
@@ -0,0 +1,98 @@
+"""
+Verificación rápida del esquema al arrancar.
+
+`metadata.create_all` inspecciona el catálogo tabla por tabla en cada
+arranque de cada worker. En su lugar se calcula una huella (SHA-256 del
+DDL que generaría el metadata más las sentencias DDL adicionales) y se
+guarda en la tabla `voces_esquema`. Al arrancar:
+
+1. Se lee la huella guardada con una sola consulta.
+2. Si coincide, no se ejecuta ningún DDL.
+3. Si no coincide (o la tabla no existe), se toma un advisory lock para
+   que solo un worker aplique el DDL; los demás esperan, vuelven a leer la
+   huella y continúan sin repetir el trabajo.
+
+`ESQUEMA_FORZAR_DDL=1` fuerza el camino lento (útil tras cambios manuales).
+"""
+
+import hashlib
+import logging
+import os
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+logger = logging.getLogger("voces.esquema")
+
+FORZAR_DDL = os.getenv("ESQUEMA_FORZAR_DDL", "0") == "1"
+
+# Clave del advisory lock (arbitraria, única para VOCES)
+CLAVE_BLOQUEO = 0x564F434553
+
+_CREAR_TABLA_HUELLA = """
+CREATE TABLE IF NOT EXISTS voces_esquema (
+    id integer PRIMARY KEY,
+    huella varchar(64) NOT NULL,
+    aplicado_en timestamp NOT NULL DEFAULT now()
+)
+"""
+
+_GUARDAR_HUELLA = """
+INSERT INTO voces_esquema (id, huella) VALUES (1, :huella)
+ON CONFLICT (id) DO UPDATE SET huella = EXCLUDED.huella, aplicado_en = now()
+"""
+
+
+def calcular_huella(metadata: MetaData, sentencias: list[str]) -> str:
+    """
+    Huella del esquema esperado. Solo depende del DDL generado, así que
+    cambia al añadir tablas, columnas, índices o sentencias adicionales.
+    """
+    dialecto = postgresql.dialect()
+    partes = []
+    for tabla in metadata.sorted_tables:
+        partes.append(str(CreateTable(tabla).compile(dialect=dialecto)))
+        for indice in sorted(tabla.indexes, key=lambda i: i.name or ""):
+            partes.append(str(CreateIndex(indice).compile(dialect=dialecto)))
+    partes.extend(sentencias)
+    normalizado = "\n".join(" ".join(parte.split()) for parte in partes)
+    return hashlib.sha256(normalizado.encode()).hexdigest()
+
+
+async def _leer_huella(conn):
+    resultado = await conn.execute(text("SELECT huella FROM voces_esquema WHERE id = 1"))
+    return resultado.scalar_one_or_none()
+
+
+async def asegurar_esquema(engine, metadata: MetaData, sentencias: list[str]) -> bool:
+    """
+    Aplica el esquema solo si su huella cambió.
+    Retorna True si se ejecutó DDL y False si el esquema ya estaba al día.
+    """
+    huella = calcular_huella(metadata, sentencias)
+
+    if not FORZAR_DDL:
+        try:
+            async with engine.connect() as conn:
+                if await _leer_huella(conn) == huella:
+                    return False
+        except DBAPIError:
+            # La tabla voces_esquema aún no existe: primera instalación
+            pass
+
+    async with engine.begin() as conn:
+        # Se libera al terminar la transacción
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+        await conn.execute(text(_CREAR_TABLA_HUELLA))
+        if not FORZAR_DDL and await _leer_huella(conn) == huella:
+            # Otro worker aplicó el esquema mientras esperábamos el lock
+            return False
+
+        logger.info("Aplicando esquema (huella %s)", huella[:12])
+        await conn.run_sync(metadata.create_all)
+        for sentencia in sentencias:
+            await conn.execute(text(sentencia))
+        await conn.execute(text(_GUARDAR_HUELLA), {"huella": huella})
+    return True
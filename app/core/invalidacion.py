@@ -0,0 +1,210 @@
+"""
+Bus de invalidación de cachés entre workers sobre LISTEN/NOTIFY de Postgres.
+
+Cada worker mantiene cachés en memoria (`CacheProceso`, filtros de
+disponibilidad, etc.). Cuando una petición modifica datos, publica un
+mensaje compacto con `publicar(session, tema, *claves)`:
+
+- El `NOTIFY` se emite dentro de la misma transacción, así que Postgres
+  solo lo entrega a los demás workers si la transacción se confirma.
+- En el propio worker, los manejadores se ejecutan justo después del
+  `commit` (nunca antes, para no volver a cachear datos viejos).
+
+`tarea_escucha()` se inicia en el `lifespan`: mantiene una conexión con
+`LISTEN`, despacha los mensajes de otros workers y se reconecta con
+espera exponencial. Tras reconectar vacía todas las cachés y ejecuta los
+ganchos de `al_reconectar`, porque pudo perder mensajes mientras estaba
+desconectado.
+
+LISTEN necesita una conexión de sesión: si `DATABASE_URL` apunta a
+PgBouncer en modo transacción, configura `INVALIDACION_DATABASE_URL`
+con la conexión directa a Postgres.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("voces.invalidacion")
+
+CANAL = "voces_invalidacion"
+
+# Identifica a este proceso para ignorar sus propios mensajes
+ORIGEN = f"{os.getpid()}-{secrets.token_hex(3)}"
+
+# Espera máxima entre reintentos de conexión (segundos)
+ESPERA_MAXIMA = 30.0
+
+# Cada cuánto se comprueba que la conexión de escucha sigue viva (segundos)
+INTERVALO_LATIDO = 30.0
+
+# Temas publicados por la aplicación
+TEMA_USUARIO = "usuario"  # claves: (id, username) de un usuario modificado o eliminado
+TEMA_ALTA_USUARIO = "usuario.alta"  # claves: (username, email) de un usuario creado
+TEMA_BAJA_USUARIO = "usuario.baja"  # claves: (username, email) de un usuario purgado
+TEMA_VERSION_TOKEN = "usuario.token"  # claves: (id, version_token) tras invalidar sus sesiones
+TEMA_TRABAJOS = "trabajos"  # sin claves: hay trabajos nuevos en la cola
+
+_manejadores: dict[str, list[Callable[..., None]]] = {}
+_caches: list["CacheProceso"] = []
+_ganchos_reconexion: list[Callable[[], Awaitable[None]]] = []
+
+
+def suscribir(tema: str, manejador: Callable[..., None]) -> None:
+    """Registra `manejador(*claves)` para los mensajes de `tema`."""
+    _manejadores.setdefault(tema, []).append(manejador)
+
+
+def al_reconectar(gancho: Callable[[], Awaitable[None]]) -> None:
+    """Registra una corrutina que se ejecuta tras recuperar la conexión."""
+    _ganchos_reconexion.append(gancho)
+
+
+def despachar(tema: str, claves) -> None:
+    """Ejecuta los manejadores de `tema`. Los errores se registran, no se propagan."""
+    for manejador in _manejadores.get(tema, ()):
+        try:
+            manejador(*claves)
+        except Exception:
+            logger.exception("Error al procesar la invalidación %s %s", tema, claves)
+
+
+class CacheProceso:
+    """
+    Caché en memoria del proceso con expiración y tamaño máximo (LRU).
+    Se invalida automáticamente con los mensajes de su `tema`.
+    """
+
+    def __init__(self, tema: str, ttl: float = 60.0, maximo: int = 10_000):
+        self.tema = tema
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        suscribir(tema, self.invalidar)
+        _caches.append(self)
+
+    def obtener(self, clave: Hashable, defecto: Any = None) -> Any:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return defecto
+        expira, valor = entrada
+        if expira < time.monotonic():
+            del self._datos[clave]
+            return defecto
+        self._datos.move_to_end(clave)
+        return valor
+
+    def guardar(self, clave: Hashable, valor: Any) -> None:
+        self._datos[clave] = (time.monotonic() + self.ttl, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.maximo:
+            self._datos.popitem(last=False)
+
+    def invalidar(self, *claves: Hashable) -> None:
+        for clave in claves:
+            self._datos.pop(clave, None)
+
+    def limpiar(self) -> None:
+        self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+async def publicar(session, tema: str, *claves) -> None:
+    """
+    Publica una invalidación como parte de la transacción de `session`.
+    Debe llamarse antes del `commit`; si la transacción se revierte, no
+    se entrega a nadie.
+    """
+    mensaje = json.dumps({"o": ORIGEN, "t": tema, "k": claves}, separators=(",", ":"))
+    await session.execute(
+        text("SELECT pg_notify(:canal, :mensaje)"), {"canal": CANAL, "mensaje": mensaje}
+    )
+    sesion_sync = getattr(session, "sync_session", session)
+    sesion_sync.info.setdefault("voces_invalidaciones", []).append((tema, claves))
+
+
+@event.listens_for(Session, "after_commit")
+def _despachar_tras_commit(session: Session) -> None:
+    for tema, claves in session.info.pop("voces_invalidaciones", ()):
+        despachar(tema, claves)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tras_rollback(session: Session) -> None:
+    session.info.pop("voces_invalidaciones", None)
+
+
+def procesar_mensaje(carga: str) -> None:
+    """Procesa un mensaje recibido por el canal, ignorando los propios."""
+    try:
+        mensaje = json.loads(carga)
+    except ValueError:
+        logger.warning("Mensaje de invalidación inválido: %r", carga)
+        return
+    if mensaje.get("o") == ORIGEN:
+        return
+    despachar(mensaje.get("t", ""), mensaje.get("k", ()))
+
+
+def _dsn() -> str:
+    url = os.getenv("INVALIDACION_DATABASE_URL") or os.getenv("DATABASE_URL", "")
+    return url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+async def _al_reconectar() -> None:
+    for cache in _caches:
+        cache.limpiar()
+    for gancho in _ganchos_reconexion:
+        try:
+            await gancho()
+        except Exception:
+            logger.exception("Error en un gancho de reconexión")
+
+
+async def tarea_escucha() -> None:
+    """
+    Tarea de fondo iniciada en el `lifespan`: escucha el canal de
+    invalidación y se reconecta indefinidamente si se pierde la conexión.
+    """
+    espera = 1.0
+    conectado_antes = False
+    while True:
+        conexion: Optional[asyncpg.Connection] = None
+        try:
+            conexion = await asyncpg.connect(_dsn())
+            terminada = asyncio.Event()
+            conexion.add_termination_listener(lambda _: terminada.set())
+            await conexion.add_listener(CANAL, lambda _c, _p, _canal, carga: procesar_mensaje(carga))
+            if conectado_antes:
+                logger.info("Bus de invalidación reconectado")
+                await _al_reconectar()
+            espera = 1.0
+
+            while not terminada.is_set():
+                try:
+                    await asyncio.wait_for(terminada.wait(), timeout=INTERVALO_LATIDO)
+                except asyncio.TimeoutError:
+                    await conexion.fetchval("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Bus de invalidación desconectado: %s", e)
+        finally:
+            if conexion is not None and not conexion.is_closed():
+                await conexion.close()
+
+        # Si se perdió la conexión, los mensajes intermedios se perdieron
+        conectado_antes = True
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, ESPERA_MAXIMA)
@@ -0,0 +1,274 @@
+"""
+Limitador de intentos de inicio de sesión en memoria.
+
+Mantiene contadores de ventana deslizante por IP y por username para
+rechazar ráfagas de intentos ANTES de consultar la base de datos o
+ejecutar bcrypt. Los fallos no se auditan uno a uno: se agregan por IP
+y se emite un único evento `IntentoLoginFallido` por ventana.
+
+Los intentos ya rechazados por el limitador no cuentan para los
+contadores: solo se agregan al resumen de auditoría. Si contaran, quien
+siga enviando el username de otra persona mantendría su cuenta bloqueada
+indefinidamente.
+
+La ventana deslizante se aproxima con dos contadores (ventana anterior y
+actual) ponderados por el tiempo transcurrido, lo que ocupa memoria
+constante por clave. Las claves inactivas se desalojan periódicamente.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from app.core import contadores_actividad
+from app.core.auditoria import registrar_actividad
+from app.core.database import async_session_maker
+from app.models.enums import TipoAccion
+
+logger = logging.getLogger("voces.limite_intentos")
+
+# Configuración (segundos / número de intentos)
+VENTANA_SEGUNDOS = float(os.getenv("LOGIN_VENTANA_SEGUNDOS", "60"))
+MAX_INTENTOS_POR_IP = int(os.getenv("LOGIN_MAX_INTENTOS_POR_IP", "20"))
+MAX_INTENTOS_POR_USUARIO = int(os.getenv("LOGIN_MAX_INTENTOS_POR_USUARIO", "5"))
+
+# Máximo de claves por contador (y de resúmenes) en memoria. Al llegar al
+# límite se desalojan las inactivas y, si no basta, las más antiguas
+MAX_CLAVES = 100_000
+
+# Máximo de usernames distintos guardados en cada resumen de auditoría
+MAX_USERNAMES_POR_RESUMEN = 20
+
+
+class _Ventana:
+    __slots__ = ("inicio", "previo", "actual")
+
+    def __init__(self, inicio: float):
+        self.inicio = inicio
+        self.previo = 0
+        self.actual = 0
+
+
+class ContadorDeslizante:
+    """
+    Contador aproximado de eventos por clave en una ventana deslizante.
+    """
+
+    def __init__(self, ventana: float, max_claves: int = MAX_CLAVES):
+        self.ventana = ventana
+        self.max_claves = max_claves
+        self._claves: dict[str, _Ventana] = {}
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+    def _avanzar(self, v: _Ventana, ahora: float) -> None:
+        transcurridas = int((ahora - v.inicio) // self.ventana)
+        if transcurridas >= 1:
+            v.previo = v.actual if transcurridas == 1 else 0
+            v.actual = 0
+            v.inicio += transcurridas * self.ventana
+
+    def estimar(self, clave: str, ahora: float) -> float:
+        """Número estimado de eventos de la clave en la última ventana."""
+        v = self._claves.get(clave)
+        if v is None:
+            return 0.0
+        self._avanzar(v, ahora)
+        peso_previo = 1 - (ahora - v.inicio) / self.ventana
+        return v.previo * peso_previo + v.actual
+
+    def incrementar(self, clave: str, ahora: float) -> float:
+        """Registra un evento y retorna la nueva estimación."""
+        v = self._claves.get(clave)
+        if v is None:
+            if len(self._claves) >= self.max_claves:
+                self._liberar_espacio(ahora)
+            v = self._claves[clave] = _Ventana(ahora)
+        else:
+            self._avanzar(v, ahora)
+        v.actual += 1
+        return self.estimar(clave, ahora)
+
+    def reiniciar(self, clave: str) -> None:
+        self._claves.pop(clave, None)
+
+    def _liberar_espacio(self, ahora: float) -> None:
+        if self.desalojar(ahora):
+            return
+        # Todas activas: descartar la más antigua (orden de inserción del dict)
+        del self._claves[next(iter(self._claves))]
+
+    def desalojar(self, ahora: float) -> int:
+        """Elimina las claves sin actividad en las dos últimas ventanas."""
+        limite = ahora - 2 * self.ventana
+        inactivas = [k for k, v in self._claves.items() if v.inicio < limite]
+        for clave in inactivas:
+            del self._claves[clave]
+        return len(inactivas)
+
+
+class _Resumen:
+    __slots__ = ("inicio", "intentos", "bloqueados", "usernames", "user_agent")
+
+    def __init__(self, inicio: float):
+        self.inicio = inicio
+        self.intentos = 0
+        self.bloqueados = 0
+        self.usernames: set[str] = set()
+        self.user_agent: Optional[str] = None
+
+
+class LimitadorLogin:
+    """
+    Limitador de intentos de login por IP y por username, con agregación
+    de los fallos para auditoría.
+    """
+
+    def __init__(
+        self,
+        ventana: float = VENTANA_SEGUNDOS,
+        max_por_ip: int = MAX_INTENTOS_POR_IP,
+        max_por_usuario: int = MAX_INTENTOS_POR_USUARIO,
+    ):
+        self.ventana = ventana
+        self.max_por_ip = max_por_ip
+        self.max_por_usuario = max_por_usuario
+        self._por_ip = ContadorDeslizante(ventana)
+        self._por_usuario = ContadorDeslizante(ventana)
+        self._resumenes: dict[str, _Resumen] = {}
+
+    def permitido(
+        self, ip: Optional[str], username: str, ahora: Optional[float] = None
+    ) -> bool:
+        """Indica si se puede procesar un intento de login."""
+        ahora = time.monotonic() if ahora is None else ahora
+        if ip and self._por_ip.estimar(ip, ahora) >= self.max_por_ip:
+            return False
+        return self._por_usuario.estimar(username, ahora) < self.max_por_usuario
+
+    def registrar_fallo(
+        self,
+        ip: Optional[str],
+        username: str,
+        user_agent: Optional[str] = None,
+        bloqueado: bool = False,
+        ahora: Optional[float] = None,
+    ) -> None:
+        """
+        Cuenta un intento fallido y lo agrega al resumen de la IP. Los
+        intentos `bloqueado` (ya rechazados) solo se agregan al resumen.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        if not bloqueado:
+            if ip:
+                self._por_ip.incrementar(ip, ahora)
+            self._por_usuario.incrementar(username, ahora)
+
+        clave = ip or "desconocida"
+        resumen = self._resumenes.get(clave)
+        if resumen is None:
+            if len(self._resumenes) >= MAX_CLAVES:
+                # Sin espacio: se agrega al resumen sin IP
+                clave = "desconocida"
+                resumen = self._resumenes.get(clave)
+            if resumen is None:
+                resumen = self._resumenes[clave] = _Resumen(ahora)
+        resumen.intentos += 1
+        if bloqueado:
+            resumen.bloqueados += 1
+        if len(resumen.usernames) < MAX_USERNAMES_POR_RESUMEN:
+            resumen.usernames.add(username)
+        resumen.user_agent = user_agent
+
+        # El panel de actividad cuenta cada intento, no solo los resúmenes
+        contadores_actividad.registrar(TipoAccion.IntentoLoginFallido, exitoso=False)
+
+    def registrar_exito(self, username: str) -> None:
+        """Un login correcto reinicia el contador del username."""
+        self._por_usuario.reiniciar(username)
+
+    def segundos_para_reintentar(self) -> int:
+        """Valor sugerido para la cabecera `Retry-After`."""
+        return int(self.ventana)
+
+    def recolectar(self, ahora: Optional[float] = None, forzar: bool = False) -> list[dict]:
+        """
+        Desaloja claves inactivas y retorna los resúmenes de las ventanas
+        ya cerradas (todas si `forzar`), listos para registrarse en auditoría.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        self._por_ip.desalojar(ahora)
+        self._por_usuario.desalojar(ahora)
+
+        cerrados = [
+            clave
+            for clave, resumen in self._resumenes.items()
+            if forzar or ahora - resumen.inicio >= self.ventana
+        ]
+        resultado = []
+        for clave in cerrados:
+            resumen = self._resumenes.pop(clave)
+            resultado.append(
+                {
+                    "ip_address": None if clave == "desconocida" else clave,
+                    "user_agent": resumen.user_agent,
+                    "intentos": resumen.intentos,
+                    "bloqueados": resumen.bloqueados,
+                    "usernames_intentados": sorted(resumen.usernames),
+                }
+            )
+        return resultado
+
+
+limitador_login = LimitadorLogin()
+
+
+async def registrar_resumenes(forzar: bool = False) -> int:
+    """
+    Escribe en auditoría un evento `IntentoLoginFallido` por cada resumen cerrado.
+    """
+    resumenes = limitador_login.recolectar(forzar=forzar)
+    if not resumenes:
+        return 0
+
+    async with async_session_maker() as session:
+        for resumen in resumenes:
+            await registrar_actividad(
+                session=session,
+                tipo_accion=TipoAccion.IntentoLoginFallido,
+                descripcion=f"{resumen['intentos']} intento(s) de inicio de sesión fallido(s)",
+                exitoso=False,
+                detalles={
+                    "intentos": resumen["intentos"],
+                    "bloqueados": resumen["bloqueados"],
+                    "usernames_intentados": resumen["usernames_intentados"],
+                    "ventana_segundos": int(limitador_login.ventana),
+                },
+                ip_address=resumen["ip_address"],
+                user_agent=resumen["user_agent"],
+                contar=False,  # ya contados en registrar_fallo
+            )
+    return len(resumenes)
+
+
+async def tarea_limpieza(intervalo: float = 10.0) -> None:
+    """
+    Tarea de fondo: desaloja claves y vuelca los resúmenes cerrados.
+    Al cancelarse vuelca los resúmenes pendientes.
+    """
+    try:
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await registrar_resumenes()
+            except Exception as e:
+                logger.warning("Error al registrar intentos de login: %s", e)
+    except asyncio.CancelledError:
+        try:
+            await registrar_resumenes(forzar=True)
+        except Exception:
+            pass
+        raise
@@ -0,0 +1,344 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Registra, sin servicios externos:
+- Latencia, conteo por estado y peticiones en curso por ruta HTTP.
+- Número y tiempo de consultas a la base de datos (total y por petición),
+  mediante eventos del engine de SQLAlchemy.
+- Tiempo de bcrypt y de renderizado de plantillas.
+
+Las métricas son por proceso: con varios workers cada uno expone las
+suyas y el recolector de Prometheus debe consultar cada worker.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+# Buckets por defecto (segundos), iguales a los de los clientes oficiales
+BUCKETS_LATENCIA = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0,
+)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+_registro: list["_Metrica"] = []
+
+# Marca en `conn.info` mientras el perfilado captura un plan (app/core/perfilado.py):
+# esas consultas no son de la aplicación y no se cuentan
+EN_EXPLAIN = "voces_en_explain"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica(ABC):
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: dict[tuple, object] = {}
+        _registro.append(self)
+
+    def _clave(self, etiquetas: dict) -> tuple:
+        return tuple(etiquetas.get(n, "") for n in self.etiquetas)
+
+    @abstractmethod
+    def _lineas(self) -> list[str]:
+        """Líneas de muestras de la métrica, sin HELP ni TYPE."""
+
+    def renderizar(self) -> str:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._lineas())
+        return "\n".join(lineas)
+
+
+class Contador(_Metrica):
+    """Valor que solo aumenta."""
+
+    tipo = "counter"
+
+    def incrementar(self, cantidad: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(self._clave(etiquetas), 0)
+
+    def _lineas(self) -> list[str]:
+        if not self._valores and not self.etiquetas:
+            return [f"{self.nombre} 0"]
+        return [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_valor(v)}"
+            for clave, v in self._valores.items()
+        ]
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja."""
+
+    tipo = "gauge"
+
+    def sumar(self, cantidad: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def restar(self, cantidad: float = 1, **etiquetas) -> None:
+        self.sumar(-cantidad, **etiquetas)
+
+    def fijar(self, valor: float, **etiquetas) -> None:
+        self._valores[self._clave(etiquetas)] = valor
+
+    def valor(self, **etiquetas) -> float:
+        return self._valores.get(self._clave(etiquetas), 0)
+
+    def _lineas(self) -> list[str]:
+        if not self._valores and not self.etiquetas:
+            return [f"{self.nombre} 0"]
+        return [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_valor(v)}"
+            for clave, v in self._valores.items()
+        ]
+
+
+class _SerieHistograma:
+    __slots__ = ("conteos", "suma", "total")
+
+    def __init__(self, num_buckets: int):
+        self.conteos = [0] * num_buckets
+        self.suma = 0.0
+        self.total = 0
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en buckets acumulativos."""
+
+    tipo = "histogram"
+
+    def __init__(
+        self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets=BUCKETS_LATENCIA
+    ):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        serie = self._valores.get(clave)
+        if serie is None:
+            serie = self._valores[clave] = _SerieHistograma(len(self.buckets))
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie.conteos[i] += 1
+                break
+        serie.suma += valor
+        serie.total += 1
+
+    def _lineas(self) -> list[str]:
+        lineas = []
+        for clave, serie in self._valores.items():
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie.conteos):
+                acumulado += conteo
+                le = f'le="{_formatear_valor(limite)}"'
+                lineas.append(
+                    f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+                )
+            infinito = _formatear_etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{infinito} {serie.total}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear_valor(serie.suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {serie.total}")
+        return lineas
+
+
+@contextmanager
+def cronometrar(histograma: Histograma, **etiquetas):
+    """Observa en `histograma` la duración del bloque `with`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+def renderizar() -> str:
+    """Todas las métricas registradas en formato de texto de Prometheus."""
+    return "\n".join(m.renderizar() for m in _registro) + "\n"
+
+
+# --- Métricas HTTP ---
+peticiones_total = Contador(
+    "voces_http_peticiones_total",
+    "Peticiones HTTP atendidas",
+    ("metodo", "ruta", "estado"),
+)
+duracion_peticion = Histograma(
+    "voces_http_duracion_segundos",
+    "Latencia de las peticiones HTTP",
+    ("metodo", "ruta"),
+)
+peticiones_en_curso = Medidor(
+    "voces_http_peticiones_en_curso",
+    "Peticiones HTTP en curso",
+)
+
+# --- Métricas de base de datos ---
+consultas_total = Contador("voces_db_consultas_total", "Consultas SQL ejecutadas")
+duracion_consulta = Histograma(
+    "voces_db_consulta_duracion_segundos", "Duración de cada consulta SQL"
+)
+consultas_por_peticion = Histograma(
+    "voces_db_consultas_por_peticion",
+    "Consultas SQL emitidas por petición HTTP",
+    ("ruta",),
+    buckets=BUCKETS_CONSULTAS,
+)
+tiempo_db_por_peticion = Histograma(
+    "voces_db_tiempo_por_peticion_segundos",
+    "Tiempo total en la base de datos por petición HTTP",
+    ("ruta",),
+)
+
+# --- Métricas de seguridad y plantillas ---
+duracion_bcrypt = Histograma(
+    "voces_bcrypt_duracion_segundos",
+    "Duración de las operaciones bcrypt",
+    ("operacion",),
+)
+duracion_plantilla = Histograma(
+    "voces_plantilla_duracion_segundos",
+    "Duración del renderizado de plantillas Jinja2",
+    ("plantilla",),
+)
+
+# --- Métricas de réplica de lectura ---
+sesiones_lectura_total = Contador(
+    "voces_db_sesiones_lectura_total",
+    "Sesiones de solo lectura abiertas, por destino (replica o primaria)",
+    ("destino",),
+)
+retraso_replica = Medidor(
+    "voces_db_replica_retraso_segundos",
+    "Retraso de replicación medido en la réplica de lectura",
+)
+
+# --- Métricas de lecturas compartidas (app/core/vuelo_unico.py) ---
+lecturas_compartidas_total = Contador(
+    "voces_lecturas_compartidas_total",
+    "Lecturas que se unieron a una consulta idéntica en curso en vez de repetirla",
+    ("operacion",),
+)
+
+# --- Métricas de la cola de trabajos (app/core/trabajos.py) ---
+trabajos_total = Contador(
+    "voces_trabajos_total",
+    "Trabajos ejecutados, por tipo y resultado (completado, reintento o fallido)",
+    ("tipo", "resultado"),
+)
+duracion_trabajo = Histograma(
+    "voces_trabajo_duracion_segundos",
+    "Duración de la ejecución de cada trabajo",
+    ("tipo",),
+)
+
+# --- Métricas de control de admisión (app/core/admision.py) ---
+espera_admision = Histograma(
+    "voces_admision_espera_segundos",
+    "Tiempo en cola antes de admitir o rechazar una petición, por clase de ruta",
+    ("clase", "resultado"),
+)
+peticiones_rechazadas_total = Contador(
+    "voces_admision_rechazadas_total",
+    "Peticiones rechazadas con 503, por clase y motivo (cola_llena o plazo)",
+    ("clase", "motivo"),
+)
+admision_en_curso = Medidor(
+    "voces_admision_en_curso",
+    "Peticiones admitidas en curso, por clase de ruta",
+    ("clase",),
+)
+admision_en_cola = Medidor(
+    "voces_admision_en_cola",
+    "Peticiones esperando un cupo, por clase de ruta",
+    ("clase",),
+)
+
+# --- Métricas de usuarios ---
+usuarios_en_linea = Medidor(
+    "voces_usuarios_en_linea",
+    "Usuarios con actividad en los últimos EN_LINEA_MINUTOS",
+)
+
+
+class _ConsumoDB:
+    """Acumulador de consultas y tiempo de DB de la petición actual."""
+
+    __slots__ = ("consultas", "tiempo")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+
+_consumo_peticion: ContextVar[Optional[_ConsumoDB]] = ContextVar(
+    "voces_consumo_db", default=None
+)
+
+
+def iniciar_peticion():
+    """Empieza a acumular el consumo de DB de la petición actual."""
+    return _consumo_peticion.set(_ConsumoDB())
+
+
+def finalizar_peticion(token, ruta: str) -> None:
+    """Publica el consumo de DB acumulado por la petición actual."""
+    consumo = _consumo_peticion.get()
+    _consumo_peticion.reset(token)
+    if consumo is not None:
+        consultas_por_peticion.observar(consumo.consultas, ruta=ruta)
+        tiempo_db_por_peticion.observar(consumo.tiempo, ruta=ruta)
+
+
+def instrumentar_engine(engine) -> None:
+    """Registra los eventos que miden cada consulta del engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(EN_EXPLAIN):
+            return
+        conn.info.setdefault("voces_inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(EN_EXPLAIN):
+            return
+        pila = conn.info.get("voces_inicio_consulta")
+        if not pila:
+            return
+        duracion = time.perf_counter() - pila.pop()
+        consultas_total.incrementar()
+        duracion_consulta.observar(duracion)
+        consumo = _consumo_peticion.get()
+        if consumo is not None:
+            consumo.consultas += 1
+            consumo.tiempo += duracion
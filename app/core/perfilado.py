@@ -0,0 +1,146 @@
+"""
+Perfilado de consultas SQL: registro de consultas lentas y detector de N+1.
+
+- Consultas lentas: toda consulta que supere `SLOW_QUERY_MS` se registra
+  en el logger `voces.sql` con sus parámetros y la ruta de origen. Si
+  `SLOW_QUERY_EXPLAIN=1`, para los SELECT se captura además el plan
+  estimado con `EXPLAIN`, en un SAVEPOINT para que un fallo no aborte la
+  transacción de la petición. Sin ANALYZE: la consulta no se vuelve a
+  ejecutar, así un SELECT con efectos (como `pg_notify`) no se repite.
+- N+1: por cada petición se cuenta cuántas veces se repite la misma forma
+  de consulta (el SQL parametrizado). Si alguna se repite al menos
+  `N_MAS_1_UMBRAL` veces, se emite una advertencia con la ruta.
+
+El seguimiento por petición se activa solo en una fracción de las
+peticiones (`PERFILADO_MUESTREO`, entre 0 y 1) para poder dejarlo
+encendido en producción. Las consultas lentas se registran siempre.
+"""
+
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.metricas import EN_EXPLAIN
+
+logger = logging.getLogger("voces.sql")
+
+# Configuración
+UMBRAL_LENTA_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+CAPTURAR_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+UMBRAL_N_MAS_1 = int(os.getenv("N_MAS_1_UMBRAL", "5"))
+MUESTREO = float(os.getenv("PERFILADO_MUESTREO", "0.1"))
+
+# Longitud máxima del SQL y parámetros en los mensajes de log
+_MAX_LOG = 2000
+
+
+class _PerfilPeticion:
+    """Formas de consulta vistas durante la petición actual."""
+
+    __slots__ = ("ruta", "formas")
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.formas: Counter = Counter()
+
+
+_perfil_peticion: ContextVar[Optional[_PerfilPeticion]] = ContextVar(
+    "voces_perfil_peticion", default=None
+)
+_ruta_peticion: ContextVar[str] = ContextVar("voces_ruta_peticion", default="-")
+
+
+def iniciar_peticion(ruta: str):
+    """
+    Marca el inicio de una petición. Retorna el token para `finalizar_peticion`.
+    La ruta aquí es la URL; la plantilla de ruta se conoce al finalizar.
+    """
+    perfil = _PerfilPeticion(ruta) if random.random() < MUESTREO else None
+    return _perfil_peticion.set(perfil), _ruta_peticion.set(ruta)
+
+
+def finalizar_peticion(tokens, ruta: Optional[str] = None) -> None:
+    """Evalúa el patrón N+1 de la petición y limpia el contexto."""
+    token_perfil, token_ruta = tokens
+    perfil = _perfil_peticion.get()
+    _perfil_peticion.reset(token_perfil)
+    _ruta_peticion.reset(token_ruta)
+    if perfil is None:
+        return
+
+    for forma, repeticiones in perfil.formas.items():
+        if repeticiones >= UMBRAL_N_MAS_1:
+            logger.warning(
+                "Posible N+1 en %s: %d consultas con la misma forma: %s",
+                ruta or perfil.ruta,
+                repeticiones,
+                _recortar(forma),
+            )
+
+
+def _recortar(texto) -> str:
+    texto = " ".join(str(texto).split())
+    return texto if len(texto) <= _MAX_LOG else texto[:_MAX_LOG] + "…"
+
+
+def _capturar_plan(conn, statement: str, parameters) -> Optional[str]:
+    """
+    Plan estimado de un SELECT lento (sin ejecutarlo). Nunca lanza excepciones.
+
+    Corre dentro de un SAVEPOINT: en PostgreSQL un EXPLAIN fallido dejaría
+    abortada la transacción de la petición, y sus siguientes consultas y el
+    commit fallarían.
+    """
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    try:
+        # Los listeners de perfilado y métricas ignoran esta consulta (y el SAVEPOINT)
+        conn.info[EN_EXPLAIN] = True
+        with conn.begin_nested():
+            filas = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+        return "\n".join(str(fila[0]) for fila in filas)
+    except Exception as e:
+        return f"(no se pudo obtener el plan: {e})"
+    finally:
+        conn.info[EN_EXPLAIN] = False
+
+
+def instrumentar_engine(engine) -> None:
+    """Registra los eventos de perfilado en el engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(EN_EXPLAIN):
+            return
+        conn.info.setdefault("voces_perfilado_inicio", []).append(time.perf_counter())
+        perfil = _perfil_peticion.get()
+        if perfil is not None:
+            perfil.formas[statement] += 1
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(EN_EXPLAIN):
+            return
+        pila = conn.info.get("voces_perfilado_inicio")
+        if not pila:
+            return
+        duracion_ms = (time.perf_counter() - pila.pop()) * 1000
+        if duracion_ms < UMBRAL_LENTA_MS:
+            return
+
+        plan = _capturar_plan(conn, statement, parameters) if CAPTURAR_EXPLAIN else None
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s | parámetros: %s%s",
+            duracion_ms,
+            _ruta_peticion.get(),
+            _recortar(statement),
+            _recortar(parameters),
+            f"\n{plan}" if plan else "",
+        )
@@ -0,0 +1,117 @@
+"""
+Purga en segundo plano de usuarios eliminados (soft delete).
+
+`eliminar_usuario` solo marca la cuenta como `EstadoCuenta.Eliminado` y
+encola, en la misma transacción, el trabajo `purgar_usuario` (ver
+app/core/trabajos.py). El trabajo borra después los datos reales en
+lotes pequeños, cada uno en su propia transacción corta y con pausas
+entre lotes, para no mantener bloqueos largos sin importar cuánta
+actividad tenga la cuenta:
+
+1. Anonimiza los `LogActividad` del usuario (usuario_id = NULL) por lotes.
+2. Borra el perfil demográfico y finalmente la fila de `Usuario`.
+
+Las operaciones son idempotentes: si dos workers purgan la misma cuenta
+a la vez, el resultado es el mismo. Como respaldo, el trabajo periódico
+`purgar_eliminados` (`PURGA_CRON`) encola la purga de las cuentas
+eliminadas que no tengan una pendiente.
+"""
+
+import asyncio
+import os
+
+from sqlalchemy import delete, select, update
+
+from app.core.database import async_session_maker
+from app.core import invalidacion
+from app.core.trabajos import encolar, periodico, trabajo
+from app.models import Usuario, PerfilDemografico, LogActividad, EstadoCuenta
+
+# Filas de auditoría anonimizadas por transacción
+TAMANO_LOTE = int(os.getenv("PURGA_TAMANO_LOTE", "500"))
+
+# Pausa entre lotes para ceder capacidad a las peticiones (segundos)
+PAUSA_ENTRE_LOTES = float(os.getenv("PURGA_PAUSA_SEGUNDOS", "0.05"))
+
+# Expresión cron de la revisión de respaldo de cuentas eliminadas
+CRON_REVISION = os.getenv("PURGA_CRON", "*/5 * * * *")
+
+
+async def encolar_purga(session, usuario_id: str) -> bool:
+    """Encola la purga del usuario en la transacción de `session` (una sola pendiente por usuario)."""
+    return await encolar(
+        session, "purgar_usuario", {"usuario_id": usuario_id}, clave_unica=f"purga:{usuario_id}"
+    )
+
+
+async def _anonimizar_lote(usuario_id: str) -> int:
+    """Desvincula un lote de logs del usuario. Retorna las filas afectadas."""
+    lote = (
+        select(LogActividad.id)
+        .where(LogActividad.usuario_id == usuario_id)
+        .limit(TAMANO_LOTE)
+        .scalar_subquery()
+    )
+    async with async_session_maker() as session:
+        result = await session.execute(
+            update(LogActividad)
+            .where(LogActividad.id.in_(lote))
+            .values(usuario_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+@trabajo("purgar_usuario")
+async def purgar_usuario(usuario_id: str) -> int:
+    """
+    Purga definitivamente un usuario marcado como eliminado.
+    Retorna el número de logs anonimizados.
+    """
+    anonimizados = 0
+    while True:
+        filas = await _anonimizar_lote(usuario_id)
+        anonimizados += filas
+        if filas < TAMANO_LOTE:
+            break
+        await asyncio.sleep(PAUSA_ENTRE_LOTES)
+
+    async with async_session_maker() as session:
+        await session.execute(
+            delete(PerfilDemografico).where(PerfilDemografico.usuario_id == usuario_id)
+        )
+        result = await session.execute(
+            delete(Usuario)
+            .where(
+                Usuario.id == usuario_id,
+                Usuario.estado_cuenta == EstadoCuenta.Eliminado,
+            )
+            .returning(Usuario.username, Usuario.email)
+        )
+        borrado = result.first()
+        if borrado:
+            # Al confirmar se actualizan los filtros de disponibilidad de todos los workers
+            await invalidacion.publicar(
+                session, invalidacion.TEMA_BAJA_USUARIO, borrado.username, borrado.email
+            )
+        await session.commit()
+
+    return anonimizados
+
+
+@trabajo("purgar_eliminados")
+async def purgar_eliminados() -> int:
+    """Encola la purga de todas las cuentas marcadas como eliminadas. Retorna cuántas encontró."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(Usuario.id).where(Usuario.estado_cuenta == EstadoCuenta.Eliminado)
+        )
+        pendientes = result.scalars().all()
+        for usuario_id in pendientes:
+            await encolar_purga(session, usuario_id)
+        await session.commit()
+    return len(pendientes)
+
+
+periodico("purgar_eliminados", CRON_REVISION)
@@ -0,0 +1,170 @@
+"""
+Enrutamiento de lecturas a una réplica de Postgres.
+
+Si se configura `DATABASE_REPLICA_URL`, las rutas de solo lectura
+(`get_session_lectura`) usan la réplica y todo lo demás la primaria:
+
+- Lectura tras escritura: cuando una petición escribe en la primaria,
+  la respuesta fija la cookie `voces_primaria` durante
+  `REPLICA_PEGAJOSIDAD_SEGUNDOS`. Mientras exista, ese navegador lee de
+  la primaria, así que la redirección tras editar un perfil muestra los
+  datos nuevos aunque la réplica aún no los tenga.
+- Retraso: `tarea_vigilar_replica()` mide el retraso de replicación cada
+  `REPLICA_INTERVALO_VERIFICACION` segundos. Si supera
+  `REPLICA_RETRASO_MAXIMO` o la réplica no responde, las lecturas vuelven
+  a la primaria hasta la siguiente medición correcta.
+
+- Peticiones de escritura: las lecturas de un POST (u otro método que no
+  sea GET o HEAD) van a la primaria y comparten su sesión con
+  `get_session`, así la petición ocupa una sola conexión.
+
+Sin réplica configurada, `get_session_lectura` equivale a `get_session`.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import Select, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metricas
+from app.core.database import async_session_maker, async_session_maker_replica, engine, engine_replica
+from app.core.sesion_peticion import sesion_compartida
+
+logger = logging.getLogger("voces.replica")
+
+RETRASO_MAXIMO = float(os.getenv("REPLICA_RETRASO_MAXIMO", "2"))
+PEGAJOSIDAD_SEGUNDOS = int(os.getenv("REPLICA_PEGAJOSIDAD_SEGUNDOS", "10"))
+INTERVALO_VERIFICACION = float(os.getenv("REPLICA_INTERVALO_VERIFICACION", "5"))
+
+COOKIE_PRIMARIA = "voces_primaria"
+
+# 0 si la réplica ya aplicó todo lo recibido; si no, antigüedad de lo último aplicado
+_CONSULTA_RETRASO = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Hasta la primera medición correcta, las lecturas van a la primaria
+_replica_disponible = False
+
+# Marca de escritura de la petición actual (lista mutable, ver iniciar_peticion)
+_escritura_peticion: ContextVar[Optional[list]] = ContextVar(
+    "voces_escritura_peticion", default=None
+)
+
+
+def replica_disponible() -> bool:
+    return engine_replica is not None and _replica_disponible
+
+
+METODOS_LECTURA = frozenset({"GET", "HEAD"})
+
+
+def usar_replica(request: Request) -> bool:
+    """Indica si las lecturas de esta petición pueden ir a la réplica."""
+    return (
+        replica_disponible()
+        and request.method in METODOS_LECTURA
+        and COOKIE_PRIMARIA not in request.cookies
+    )
+
+
+def fabrica_lectura(request: Request):
+    """Factory de sesiones para lecturas: réplica o primaria según la petición."""
+    if usar_replica(request):
+        metricas.sesiones_lectura_total.incrementar(destino="replica")
+        return async_session_maker_replica
+    metricas.sesiones_lectura_total.incrementar(destino="primaria")
+    return async_session_maker
+
+
+async def get_session_lectura(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia para rutas de solo lectura. Nunca debe usarse para escribir:
+    la sesión puede apuntar a una réplica.
+    """
+    async with sesion_compartida(fabrica_lectura(request)) as session:
+        yield session
+
+
+def iniciar_peticion():
+    """Empieza a registrar si la petición actual escribe en la primaria."""
+    return _escritura_peticion.set([])
+
+
+def finalizar_peticion(token) -> bool:
+    """Limpia el contexto. Retorna True si la petición escribió en la primaria."""
+    marca = _escritura_peticion.get()
+    _escritura_peticion.reset(token)
+    return bool(marca)
+
+
+def fijar_cookie_primaria(response) -> None:
+    """Hace que el navegador lea de la primaria durante la ventana de pegajosidad."""
+    response.set_cookie(
+        COOKIE_PRIMARIA,
+        "1",
+        max_age=PEGAJOSIDAD_SEGUNDOS,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _es_escritura(context) -> bool:
+    """
+    INSERT, UPDATE o DELETE (también dentro de un `WITH`), o SELECT con
+    `FOR UPDATE`/`FOR SHARE`, según la sentencia compilada y no el texto.
+    El SQL textual (`text()`) no cuenta: las escrituras usan construcciones.
+    """
+    if context is None:
+        return False
+    if context.isinsert or context.isupdate or context.isdelete:
+        return True
+    sentencia = getattr(context.compiled, "statement", None)
+    return isinstance(sentencia, Select) and sentencia._for_update_arg is not None
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _marcar_escritura(conn, cursor, statement, parameters, context, executemany):
+    marca = _escritura_peticion.get()
+    if marca is not None and not marca and _es_escritura(context):
+        marca.append(True)
+
+
+async def medir_retraso() -> float:
+    """Retraso de replicación en segundos."""
+    async with engine_replica.connect() as conn:
+        return float((await conn.execute(text(_CONSULTA_RETRASO))).scalar_one())
+
+
+async def tarea_vigilar_replica() -> None:
+    """
+    Tarea de fondo iniciada en el `lifespan`: mide el retraso de la réplica
+    y la retira de la rotación si se atrasa o deja de responder.
+    """
+    global _replica_disponible
+    if engine_replica is None:
+        return
+
+    while True:
+        try:
+            retraso = await medir_retraso()
+            metricas.retraso_replica.fijar(retraso)
+            disponible = retraso <= RETRASO_MAXIMO
+            if not disponible:
+                logger.warning("Réplica atrasada %.1f s: lecturas a la primaria", retraso)
+        except Exception as e:
+            logger.warning("Réplica no disponible: %s", e)
+            disponible = False
+        if disponible != _replica_disponible:
+            logger.info("Lecturas %s", "a la réplica" if disponible else "a la primaria")
+        _replica_disponible = disponible
+        await asyncio.sleep(INTERVALO_VERIFICACION)
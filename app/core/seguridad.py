@@ -8,6 +8,8 @@ from typing import Optional
 import jwt
 from dotenv import load_dotenv
 
+from app.core.metricas import cronometrar, duracion_bcrypt
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -35,7 +37,8 @@ def hashear_password(password: str) -> str:
     password_segura = _pre_hash_password(password)
     # Generamos salt y hasheamos
     # bcrypt.hashpw devuelve bytes, decodificamos a str para guardar en DB
-    hashed = bcrypt.hashpw(password_segura, bcrypt.gensalt())
+    with cronometrar(duracion_bcrypt, operacion="hash"):
+        hashed = bcrypt.hashpw(password_segura, bcrypt.gensalt())
     return hashed.decode("utf-8")
 
 
@@ -46,7 +49,8 @@ def verificar_password(password_plano: str, password_hasheado: str) -> bool:
     try:
         password_segura = _pre_hash_password(password_plano)
         # bcrypt.checkpw espera bytes en ambos argumentos
-        return bcrypt.checkpw(password_segura, password_hasheado.encode("utf-8"))
+        with cronometrar(duracion_bcrypt, operacion="verificar"):
+            return bcrypt.checkpw(password_segura, password_hasheado.encode("utf-8"))
     except Exception:
         return False
 
@@ -0,0 +1,78 @@
+"""
+Sesión de base de datos compartida por toda la petición (unidad de trabajo).
+
+Sin esto, una página autenticada abría una sesión en `inject_current_user`
+y otra en la dependencia `get_session` de la ruta: con `NullPool` son dos
+conexiones a Postgres por petición.
+
+El middleware `sesion_por_peticion` abre un ámbito con `iniciar_peticion()`.
+Dentro de él, `sesion_compartida(fabrica)` entrega siempre la misma sesión
+para cada factory (primaria o réplica), creada de forma perezosa en el
+primer uso; la conexión solo se abre con la primera consulta. Al terminar
+la respuesta, `finalizar_peticion()` cierra todas las sesiones una vez.
+
+Fuera de una petición (tareas de fondo, scripts), `sesion_compartida`
+abre y cierra una sesión propia como antes.
+
+La sesión compartida no debe usarse desde tareas concurrentes dentro de
+la misma petición (por ejemplo con `asyncio.gather`).
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger("voces.sesion")
+
+
+class _SesionesPeticion:
+    """Sesiones abiertas por la petición actual, una por factory."""
+
+    __slots__ = ("sesiones",)
+
+    def __init__(self):
+        self.sesiones: dict = {}
+
+    def obtener(self, fabrica):
+        sesion = self.sesiones.get(fabrica)
+        if sesion is None:
+            sesion = self.sesiones[fabrica] = fabrica()
+        return sesion
+
+
+_sesiones_peticion: ContextVar[Optional[_SesionesPeticion]] = ContextVar(
+    "voces_sesiones_peticion", default=None
+)
+
+
+def iniciar_peticion():
+    """Abre el ámbito de sesiones de la petición. Retorna el token para cerrarlo."""
+    return _sesiones_peticion.set(_SesionesPeticion())
+
+
+async def finalizar_peticion(token) -> None:
+    """Cierra las sesiones de la petición (revierte lo no confirmado)."""
+    sesiones = _sesiones_peticion.get()
+    _sesiones_peticion.reset(token)
+    if sesiones is None:
+        return
+    for sesion in sesiones.sesiones.values():
+        try:
+            await sesion.close()
+        except Exception:
+            logger.exception("Error al cerrar la sesión de la petición")
+
+
+@asynccontextmanager
+async def sesion_compartida(fabrica):
+    """
+    Sesión de `fabrica` para el código actual: la de la petición si hay
+    un ámbito abierto, o una propia que se cierra al salir.
+    """
+    sesiones = _sesiones_peticion.get()
+    if sesiones is not None:
+        yield sesiones.obtener(fabrica)
+        return
+    async with fabrica() as sesion:
+        yield sesion
@@ -1,6 +1,29 @@
+import logging
+import time
+from collections.abc import AsyncIterator
+
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import Template
+
+from app.core.metricas import cronometrar, duracion_plantilla
+
+logger = logging.getLogger("voces.templates")
+
+# Tamaño aproximado de cada bloque enviado al navegador en el modo streaming
+TAMANO_BLOQUE = 16 * 1024
+
+
+class PlantillaMedida(Template):
+    """Plantilla que registra su tiempo de renderizado en las métricas."""
+
+    def render(self, *args, **kwargs) -> str:
+        with cronometrar(duracion_plantilla, plantilla=self.name or "<string>"):
+            return super().render(*args, **kwargs)
+
 
 templates = Jinja2Templates(directory="app/templates")
+templates.env.template_class = PlantillaMedida
 
 
 def user_initials(user) -> str:
@@ -20,3 +43,67 @@ def user_initials(user) -> str:
         return "?"
 
 templates.env.globals["user_initials"] = user_initials
+
+# Entorno con renderizado asíncrono para `respuesta_streaming`: comparte
+# cargador, filtros y globales con `templates.env`, pero compila las
+# plantillas aparte (caché propia) para que se generen con `generate_async`
+entorno_streaming = templates.env.overlay(enable_async=True, cache_size=400)
+
+
+async def _generar_en_bloques(plantilla: Template, contexto: dict) -> AsyncIterator[bytes]:
+    """
+    Renderiza `plantilla` (de `entorno_streaming`) por partes: envía todo
+    lo anterior a `</head>` apenas se genera y luego bloques de unos
+    `TAMANO_BLOQUE` caracteres. Usa `generate_async`, así el event loop
+    queda libre entre partes.
+    """
+    generador = plantilla.generate_async(contexto)
+    partes: list[str] = []
+    tamano = 0
+    cabecera_enviada = False
+    duracion = 0.0
+    try:
+        while True:
+            inicio = time.perf_counter()
+            parte = await anext(generador, None)
+            duracion += time.perf_counter() - inicio
+            if parte is None:
+                break
+            partes.append(parte)
+            tamano += len(parte)
+            if tamano >= TAMANO_BLOQUE or (not cabecera_enviada and "</head>" in parte):
+                cabecera_enviada = True
+                yield "".join(partes).encode()
+                partes, tamano = [], 0
+        if partes:
+            yield "".join(partes).encode()
+    except Exception:
+        # El estado y las cabeceras ya se enviaron: solo queda cortar la página
+        logger.exception("Error al renderizar %s en streaming", plantilla.name)
+    finally:
+        await generador.aclose()
+        duracion_plantilla.observar(duracion, plantilla=plantilla.name or "<string>")
+
+
+def respuesta_streaming(
+    nombre: str, contexto: dict, status_code: int = 200, headers: dict | None = None
+) -> StreamingResponse:
+    """
+    Alternativa a `templates.TemplateResponse` para páginas grandes: envía
+    el `<head>` de `layout/base.html` en cuanto se genera, para que el
+    navegador empiece a descargar CSS y fuentes, y el resto en bloques en
+    lugar de armar la página completa en memoria.
+
+    El contexto debe incluir `request`. La plantilla se renderiza después
+    de que la ruta retorna (y de que se cierra la sesión de la petición):
+    todo lo que use debe estar ya cargado. Un error durante el renderizado
+    ya no puede cambiar el estado de la respuesta; se registra en el log y
+    la página queda cortada.
+    """
+    plantilla = entorno_streaming.get_template(nombre)
+    return StreamingResponse(
+        _generar_en_bloques(plantilla, contexto),
+        status_code=status_code,
+        headers=headers,
+        media_type="text/html; charset=utf-8",
+    )
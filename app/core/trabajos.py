@@ -0,0 +1,439 @@
+"""
+Cola de trabajos en Postgres y programador de trabajos periódicos.
+
+Sin broker externo: los trabajos son filas de la tabla `trabajo`.
+
+- Encolar: `encolar(session, "tipo", {...})` inserta el trabajo en la
+  transacción de quien lo pide; si esa transacción se revierte, el
+  trabajo nunca existió. Al confirmar se avisa a los workers por el bus
+  de invalidación (tema `trabajos`) para que no esperen al sondeo.
+- Tomar: cada worker reclama solo los trabajos que puede empezar ya
+  (los cupos libres de `TRABAJOS_CONCURRENCIA`, hasta
+  `TRABAJOS_TAMANO_LOTE`) con un único `UPDATE ... FOR UPDATE SKIP
+  LOCKED`, así varios workers nunca toman el mismo trabajo ni se
+  bloquean entre sí, y ningún trabajo espera en memoria mientras corre
+  su bloqueo.
+- Ejecutar: cada trabajo se finaliza en cuanto termina, sin esperar al
+  resto. Los completados se borran; los fallidos se reintentan con
+  espera exponencial hasta agotar `max_intentos` y quedan como
+  `Fallido` para revisión.
+- Recuperar: si un worker muere, sus trabajos vuelven a la cola cuando
+  vence `bloqueado_hasta` (`TRABAJOS_DURACION_BLOQUEO`).
+- Periódicos: `periodico(nombre, "*/5 * * * *")` encola el trabajo en
+  cada coincidencia de la expresión cron. La tabla `ejecucion_periodica`
+  guarda la última ejecución encolada de cada uno: solo el programador
+  que la avanza encola el trabajo, así que aunque corran varios (uno por
+  worker) cada ejecución se encola una sola vez.
+
+La entrega es "al menos una vez": los manejadores deben ser idempotentes.
+
+Las tareas `tarea_trabajos()` y `tarea_programador()` se inician en el
+`lifespan` de `main.py` (salvo con `TRABAJOS_EN_PROCESO=0`) o en un
+proceso aparte con `python -m scripts.trabajador`.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from sqlalchemy import BigInteger, any_, bindparam, case, delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import invalidacion, metricas
+from app.core.cron import Cron
+from app.core.database import async_session_maker
+from app.models import EjecucionPeriodica, EstadoTrabajo, Trabajo
+
+logger = logging.getLogger("voces.trabajos")
+
+# Máximo de trabajos reclamados por consulta
+TAMANO_LOTE = int(os.getenv("TRABAJOS_TAMANO_LOTE", "100"))
+
+# Manejadores ejecutándose a la vez en cada worker
+CONCURRENCIA = int(os.getenv("TRABAJOS_CONCURRENCIA", "20"))
+
+# Espera máxima sin avisos antes de volver a mirar la cola (segundos)
+INTERVALO_SONDEO = float(os.getenv("TRABAJOS_INTERVALO_SONDEO", "1"))
+
+# Tiempo máximo de un trabajo; pasado este plazo se da al worker por caído (segundos)
+DURACION_BLOQUEO = float(os.getenv("TRABAJOS_DURACION_BLOQUEO", "300"))
+
+# Espera antes del primer reintento; se duplica en cada intento (segundos)
+ESPERA_BASE = float(os.getenv("TRABAJOS_ESPERA_BASE", "5"))
+ESPERA_MAXIMA = 3600.0
+
+# Con "0", el servidor web no ejecuta trabajos (se usa scripts/trabajador.py)
+EN_PROCESO = os.getenv("TRABAJOS_EN_PROCESO", "1") != "0"
+
+# Módulos que registran manejadores al importarse
+MODULOS_MANEJADORES = ("app.core.purga", "app.core.contadores_actividad")
+
+_manejadores: dict[str, Callable[..., Awaitable]] = {}
+
+
+class Periodico(NamedTuple):
+    nombre: str
+    cron: Cron
+    tipo: str
+    argumentos: dict
+
+
+_periodicos: list[Periodico] = []
+
+_hay_trabajo = asyncio.Event()
+
+
+def trabajo(tipo: str):
+    """Registra la función decorada como manejador de los trabajos `tipo`."""
+
+    def registrar(funcion):
+        _manejadores[tipo] = funcion
+        return funcion
+
+    return registrar
+
+
+def periodico(nombre: str, expresion: str, tipo: Optional[str] = None, argumentos: Optional[dict] = None) -> None:
+    """Encola `tipo` (por defecto, `nombre`) en cada coincidencia de la expresión cron."""
+    _periodicos.append(Periodico(nombre, Cron(expresion), tipo or nombre, argumentos or {}))
+
+
+def cargar_manejadores() -> None:
+    """Importa los módulos que registran manejadores y trabajos periódicos."""
+    for modulo in MODULOS_MANEJADORES:
+        importlib.import_module(modulo)
+
+
+def _despertar() -> None:
+    _hay_trabajo.set()
+
+
+invalidacion.suscribir(invalidacion.TEMA_TRABAJOS, _despertar)
+
+
+async def _avisar(session: AsyncSession) -> None:
+    """Publica un único aviso de trabajos nuevos por transacción."""
+    pendientes = getattr(session, "sync_session", session).info.get("voces_invalidaciones", ())
+    if not any(tema == invalidacion.TEMA_TRABAJOS for tema, _ in pendientes):
+        await invalidacion.publicar(session, invalidacion.TEMA_TRABAJOS)
+
+
+async def encolar_muchos(
+    session: AsyncSession,
+    tipo: str,
+    lista_argumentos: list[dict],
+    *,
+    retraso: float = 0,
+    max_intentos: Optional[int] = None,
+) -> None:
+    """Encola un trabajo `tipo` por cada elemento de `lista_argumentos` en un solo INSERT."""
+    if tipo not in _manejadores:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    if not lista_argumentos:
+        return
+    comunes = {"tipo": tipo, "disponible_en": func.now() + timedelta(seconds=retraso)}
+    if max_intentos is not None:
+        comunes["max_intentos"] = max_intentos
+    await session.execute(
+        insert(Trabajo).values([{**comunes, "argumentos": a} for a in lista_argumentos])
+    )
+    await _avisar(session)
+
+
+async def encolar(
+    session: AsyncSession,
+    tipo: str,
+    argumentos: Optional[dict] = None,
+    *,
+    retraso: float = 0,
+    clave_unica: Optional[str] = None,
+    max_intentos: Optional[int] = None,
+) -> bool:
+    """
+    Encola un trabajo en la transacción de `session` (se confirma con ella).
+    Con `clave_unica`, no hace nada si ya existe un trabajo pendiente o en
+    curso con esa clave (los `Fallido` no cuentan). Retorna True si el
+    trabajo se encoló.
+    """
+    if tipo not in _manejadores:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    valores = {
+        "tipo": tipo,
+        "argumentos": argumentos or {},
+        "disponible_en": func.now() + timedelta(seconds=retraso),
+        "clave_unica": clave_unica,
+    }
+    if max_intentos is not None:
+        valores["max_intentos"] = max_intentos
+    sentencia = insert(Trabajo).values(**valores)
+    if clave_unica is not None:
+        # Inferencia del índice único parcial ux_trabajo_clave_unica
+        sentencia = sentencia.on_conflict_do_nothing(
+            index_elements=["clave_unica"], index_where=text("estado <> 'Fallido'")
+        )
+    result = await session.execute(sentencia.returning(Trabajo.id))
+    if result.first() is None:
+        return False
+    await _avisar(session)
+    return True
+
+
+class _Tomado(NamedTuple):
+    id: int
+    tipo: str
+    argumentos: dict
+    intentos: int
+    max_intentos: int
+
+
+def _sentencia_tomar(limite: int):
+    """UPDATE que reclama hasta `limite` trabajos disponibles sin esperar bloqueos."""
+    disponibles = (
+        select(Trabajo.id)
+        .where(Trabajo.estado == EstadoTrabajo.Pendiente, Trabajo.disponible_en <= func.now())
+        .order_by(Trabajo.disponible_en, Trabajo.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+        .cte("disponibles")
+    )
+    return (
+        update(Trabajo)
+        .where(Trabajo.id == disponibles.c.id)
+        .values(
+            estado=EstadoTrabajo.EnCurso,
+            intentos=Trabajo.intentos + 1,
+            bloqueado_hasta=func.now() + timedelta(seconds=DURACION_BLOQUEO),
+        )
+        .returning(
+            Trabajo.id, Trabajo.tipo, Trabajo.argumentos, Trabajo.intentos, Trabajo.max_intentos
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def calcular_espera(intentos: int) -> float:
+    """Espera antes del siguiente reintento: exponencial, con ±20 % de variación."""
+    espera = min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA)
+    return espera * random.uniform(0.8, 1.2)
+
+
+async def _ejecutar(tomado: _Tomado) -> Optional[str]:
+    """Ejecuta el manejador. Retorna None si terminó bien o el mensaje de error."""
+    manejador = _manejadores.get(tomado.tipo)
+    if manejador is None:
+        return f"Manejador desconocido: {tomado.tipo}"
+    inicio = time.perf_counter()
+    try:
+        # Margen para finalizar antes de que venza el bloqueo
+        await asyncio.wait_for(manejador(**tomado.argumentos), timeout=DURACION_BLOQUEO * 0.8)
+        return None
+    except Exception as e:
+        logger.warning("Trabajo %s (%s) falló: %r", tomado.id, tomado.tipo, e)
+        return repr(e)[:1000]
+    finally:
+        metricas.duracion_trabajo.observar(time.perf_counter() - inicio, tipo=tomado.tipo)
+
+
+async def _finalizar(tomado: _Tomado, error: Optional[str]) -> None:
+    """Borra el trabajo si se completó; si no, lo reprograma o lo marca como fallido."""
+    async with async_session_maker() as session:
+        if error is None:
+            await session.execute(
+                delete(Trabajo)
+                .where(Trabajo.id == tomado.id, Trabajo.estado == EstadoTrabajo.EnCurso)
+                .execution_options(synchronize_session=False)
+            )
+            resultado = "completado"
+        else:
+            agotado = tomado.intentos >= tomado.max_intentos
+            valores = {"bloqueado_hasta": None, "ultimo_error": error}
+            if agotado:
+                valores["estado"] = EstadoTrabajo.Fallido
+            else:
+                valores["estado"] = EstadoTrabajo.Pendiente
+                valores["disponible_en"] = func.now() + timedelta(
+                    seconds=calcular_espera(tomado.intentos)
+                )
+            await session.execute(
+                update(Trabajo)
+                .where(Trabajo.id == tomado.id)
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            resultado = "fallido" if agotado else "reintento"
+        await session.commit()
+    metricas.trabajos_total.incrementar(tipo=tomado.tipo, resultado=resultado)
+
+
+async def reclamar(limite: int) -> list[_Tomado]:
+    """Reclama hasta `limite` trabajos disponibles y los marca en curso."""
+    async with async_session_maker() as session:
+        result = await session.execute(_sentencia_tomar(limite))
+        tomados = [_Tomado(*fila) for fila in result]
+        await session.commit()
+    return tomados
+
+
+async def _procesar(tomado: _Tomado) -> None:
+    """Ejecuta un trabajo reclamado y lo finaliza en cuanto termina."""
+    try:
+        error = await _ejecutar(tomado)
+    except asyncio.CancelledError:
+        # Apagado: devolver el trabajo a la cola sin esperar a que venza el bloqueo
+        await _liberar([tomado.id])
+        raise
+    try:
+        await _finalizar(tomado, error)
+    except Exception as e:
+        # Vuelve a la cola cuando vence su bloqueo
+        logger.warning("No se pudo finalizar el trabajo %s (%s): %s", tomado.id, tomado.tipo, e)
+
+
+async def _liberar(ids: list[int]) -> None:
+    """Devuelve trabajos tomados a la cola sin contar el intento."""
+    try:
+        async with async_session_maker() as session:
+            await session.execute(
+                update(Trabajo)
+                .where(
+                    Trabajo.id == any_(bindparam("ids", ids, type_=ARRAY(BigInteger))),
+                    Trabajo.estado == EstadoTrabajo.EnCurso,
+                )
+                .values(
+                    estado=EstadoTrabajo.Pendiente,
+                    bloqueado_hasta=None,
+                    intentos=Trabajo.intentos - 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+    except Exception as e:
+        logger.warning("No se pudieron liberar %s trabajos: %s", len(ids), e)
+
+
+async def recuperar_abandonados() -> int:
+    """Devuelve a la cola los trabajos de workers caídos. Retorna cuántos recuperó."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            update(Trabajo)
+            .where(Trabajo.estado == EstadoTrabajo.EnCurso, Trabajo.bloqueado_hasta < func.now())
+            .values(
+                estado=case(
+                    (Trabajo.intentos >= Trabajo.max_intentos, EstadoTrabajo.Fallido),
+                    else_=EstadoTrabajo.Pendiente,
+                ),
+                bloqueado_hasta=None,
+                ultimo_error="Se agotó el tiempo de bloqueo (worker caído o trabajo demasiado lento)",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def tarea_trabajos() -> None:
+    """
+    Tarea de fondo: mantiene hasta `CONCURRENCIA` trabajos en ejecución.
+    Reclama solo cuando hay cupos libres; si no los hay, espera a que
+    termine algún trabajo, y si la cola está vacía, a un aviso o a
+    `INTERVALO_SONDEO` segundos.
+    """
+    cargar_manejadores()
+    en_curso: set[asyncio.Task] = set()
+    try:
+        while True:
+            _hay_trabajo.clear()
+            libres = CONCURRENCIA - len(en_curso)
+            pedidos = min(libres, TAMANO_LOTE)
+            tomados = []
+            if pedidos > 0:
+                try:
+                    tomados = await reclamar(pedidos)
+                except Exception as e:
+                    logger.warning("Error al procesar la cola de trabajos: %s", e)
+            for tomado in tomados:
+                tarea = asyncio.create_task(_procesar(tomado))
+                en_curso.add(tarea)
+                tarea.add_done_callback(en_curso.discard)
+            if tomados and len(tomados) == pedidos and len(en_curso) < CONCURRENCIA:
+                # Puede quedar más trabajo y hay cupo: mirar otra vez
+                continue
+
+            esperas = set(en_curso)
+            aviso = None
+            if len(en_curso) < CONCURRENCIA:
+                aviso = asyncio.create_task(_hay_trabajo.wait())
+                esperas.add(aviso)
+            try:
+                await asyncio.wait(
+                    esperas,
+                    timeout=INTERVALO_SONDEO if aviso else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                if aviso:
+                    aviso.cancel()
+    finally:
+        for tarea in list(en_curso):
+            tarea.cancel()
+        await asyncio.gather(*en_curso, return_exceptions=True)
+
+
+def _sentencia_reclamar_ejecucion(nombre: str, momento: datetime):
+    """
+    Avanza la última ejecución de `nombre` a `momento` si es posterior.
+    Retorna una fila solo si la avanzó: ningún otro programador encoló
+    esa ejecución, ni antes ni después de que el trabajo se completara.
+    """
+    sentencia = insert(EjecucionPeriodica).values(nombre=nombre, ultima_ejecucion=momento)
+    return sentencia.on_conflict_do_update(
+        index_elements=["nombre"],
+        set_={"ultima_ejecucion": sentencia.excluded.ultima_ejecucion},
+        where=EjecucionPeriodica.ultima_ejecucion < sentencia.excluded.ultima_ejecucion,
+    ).returning(EjecucionPeriodica.nombre)
+
+
+async def encolar_periodicos(proximas: dict[str, datetime], ahora: datetime) -> None:
+    """Encola los trabajos periódicos que ya tocan y calcula su siguiente ejecución."""
+    for periodico in _periodicos:
+        momento = proximas.get(periodico.nombre)
+        if momento is None or ahora < momento:
+            continue
+        async with async_session_maker() as session:
+            # Marca y trabajo en la misma transacción
+            result = await session.execute(_sentencia_reclamar_ejecucion(periodico.nombre, momento))
+            if result.first() is not None:
+                await encolar(session, periodico.tipo, periodico.argumentos)
+            await session.commit()
+        # Las ejecuciones perdidas mientras el proceso estuvo detenido no se recuperan
+        proximas[periodico.nombre] = periodico.cron.siguiente(ahora)
+
+
+async def tarea_programador() -> None:
+    """
+    Tarea de fondo: encola los trabajos periódicos y, cada minuto,
+    recupera los trabajos abandonados por workers caídos.
+    """
+    cargar_manejadores()
+    ahora = datetime.now()
+    proximas = {p.nombre: p.cron.siguiente(ahora) for p in _periodicos}
+    ultima_recuperacion = 0.0
+    while True:
+        try:
+            await encolar_periodicos(proximas, datetime.now())
+            if time.monotonic() - ultima_recuperacion >= 60:
+                ultima_recuperacion = time.monotonic()
+                recuperados = await recuperar_abandonados()
+                if recuperados:
+                    logger.warning("%s trabajos abandonados volvieron a la cola", recuperados)
+        except Exception as e:
+            logger.warning("Error en el programador de trabajos: %s", e)
+        proxima = min(proximas.values(), default=None)
+        espera = 30.0 if proxima is None else (proxima - datetime.now()).total_seconds()
+        await asyncio.sleep(min(max(espera, 1.0), 30.0))
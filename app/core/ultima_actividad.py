@@ -0,0 +1,150 @@
+"""
+Registro diferido (write-behind) de `Usuario.ultima_actividad`.
+
+Escribir la columna en cada petición convertiría cada vista de página en
+un UPDATE. En su lugar, `inject_current_user` anota la actividad del
+usuario en un mapa en memoria con `registrar()` (una operación de
+diccionario) y `tarea_ultima_actividad()` la persiste cada
+`ULTIMA_ACTIVIDAD_INTERVALO` segundos con un único UPDATE por lotes.
+
+Cada usuario se escribe como mucho una vez por `ULTIMA_ACTIVIDAD_VENTANA`
+segundos y worker: un usuario que navega sin parar genera una escritura
+por ventana, no una por página. Por eso `ultima_actividad` puede quedar
+atrasada hasta ventana + intervalo; `EN_LINEA_MINUTOS` debe ser bastante
+mayor que eso.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, String, column, func, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metricas
+from app.core.database import async_session_maker
+from app.models import EstadoCuenta, Usuario
+
+logger = logging.getLogger("voces.ultima_actividad")
+
+# Mínimo de segundos entre dos escrituras del mismo usuario
+VENTANA = float(os.getenv("ULTIMA_ACTIVIDAD_VENTANA", "60"))
+
+# Cada cuánto se persisten las actividades pendientes (segundos)
+INTERVALO = float(os.getenv("ULTIMA_ACTIVIDAD_INTERVALO", "15"))
+
+# Un usuario está "en línea" si tuvo actividad en estos últimos minutos
+EN_LINEA_MINUTOS = int(os.getenv("EN_LINEA_MINUTOS", "5"))
+
+# id -> momento de la última actividad aún no persistida
+_pendientes: dict[str, datetime] = {}
+
+# id -> time.monotonic() de la última actividad aceptada para escribir
+_aceptados: dict[str, float] = {}
+
+
+def registrar(usuario_id: str, ahora: Optional[datetime] = None) -> None:
+    """Anota la actividad del usuario; se ignora si ya se anotó dentro de la ventana."""
+    instante = time.monotonic()
+    if instante - _aceptados.get(usuario_id, -VENTANA) < VENTANA:
+        return
+    _aceptados[usuario_id] = instante
+    _pendientes[usuario_id] = ahora or datetime.now()
+
+
+def ultima_actividad_local(usuario_id: str) -> Optional[datetime]:
+    """Actividad anotada en este worker que aún no se escribió."""
+    return _pendientes.get(usuario_id)
+
+
+def esta_en_linea(usuario, ahora: Optional[datetime] = None) -> bool:
+    """
+    Indica si el usuario tuvo actividad en los últimos `EN_LINEA_MINUTOS`.
+    Acepta un `Usuario` o un modelo de lectura con `id` y `ultima_actividad`.
+    """
+    ultima = ultima_actividad_local(usuario.id) or usuario.ultima_actividad
+    if ultima is None:
+        return False
+    return (ahora or datetime.now()) - ultima <= timedelta(minutes=EN_LINEA_MINUTOS)
+
+
+async def contar_en_linea(session: AsyncSession) -> int:
+    """Usuarios con actividad en los últimos `EN_LINEA_MINUTOS` (todos los workers)."""
+    limite = datetime.now() - timedelta(minutes=EN_LINEA_MINUTOS)
+    result = await session.execute(
+        select(func.count())
+        .select_from(Usuario)
+        .where(
+            Usuario.ultima_actividad >= limite,
+            Usuario.estado_cuenta != EstadoCuenta.Eliminado,
+        )
+    )
+    return result.scalar_one()
+
+
+def _sentencia_lote(filas: list[tuple[str, datetime]]):
+    """UPDATE ... FROM (VALUES ...) que nunca retrocede `ultima_actividad`."""
+    lote = values(
+        column("id", String), column("momento", DateTime), name="lote"
+    ).data(filas)
+    return (
+        update(Usuario)
+        .where(
+            Usuario.id == lote.c.id,
+            (Usuario.ultima_actividad.is_(None)) | (Usuario.ultima_actividad < lote.c.momento),
+        )
+        # Registrar actividad no es modificar el usuario: conservar actualizado_en
+        .values(ultima_actividad=lote.c.momento, actualizado_en=Usuario.actualizado_en)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def volcar_actividad() -> int:
+    """Persiste las actividades pendientes. Retorna cuántos usuarios escribió."""
+    global _pendientes
+    pendientes, _pendientes = _pendientes, {}
+    if not pendientes:
+        return 0
+    try:
+        async with async_session_maker() as session:
+            await session.execute(_sentencia_lote(list(pendientes.items())))
+            await session.commit()
+    except Exception:
+        # Reintentar en el próximo volcado sin pisar actividades más nuevas
+        for usuario_id, momento in pendientes.items():
+            _pendientes.setdefault(usuario_id, momento)
+        raise
+    return len(pendientes)
+
+
+def _olvidar_antiguos() -> None:
+    """Descarta del mapa de ventanas a los usuarios que ya salieron de ella."""
+    limite = time.monotonic() - VENTANA
+    for usuario_id in [u for u, instante in _aceptados.items() if instante < limite]:
+        del _aceptados[usuario_id]
+
+
+async def tarea_ultima_actividad() -> None:
+    """
+    Tarea de fondo iniciada en el `lifespan`: persiste la actividad cada
+    `INTERVALO` segundos y actualiza la métrica de usuarios en línea.
+    Al cancelarse hace un último volcado.
+    """
+    try:
+        while True:
+            await asyncio.sleep(INTERVALO)
+            try:
+                await volcar_actividad()
+                _olvidar_antiguos()
+                async with async_session_maker() as session:
+                    metricas.usuarios_en_linea.fijar(await contar_en_linea(session))
+            except Exception as e:
+                logger.warning("Error al persistir ultima_actividad: %s", e)
+    finally:
+        try:
+            await volcar_actividad()
+        except Exception:
+            pass
@@ -0,0 +1,192 @@
+"""
+Usuario actual construido a partir del JWT, sin consultar la base de datos.
+
+El token de sesión incluye solo los datos que necesitan las plantillas
+(id, username, nombres, apellidos, avatar y rol) además de la
+`version_token` del usuario. El email no va en el token: el JWT se puede
+leer sin la clave y no debe llevar datos personales innecesarios. `inject_current_user` construye un
+`UsuarioActual` solo con el token y lo valida contra un mapa en memoria
+id -> versión vigente:
+
+- Si la versión del token es la vigente, no se toca la base de datos.
+- Si es anterior (el usuario editó su perfil, cambió de rol, fue baneado
+  o eliminado), se carga el usuario desde la primaria y se emite un token
+  nuevo; si la cuenta ya no es válida, la petición queda sin usuario.
+
+El mapa solo guarda usuarios con versión mayor que 0. Se carga al
+iniciar la aplicación y se mantiene al día con el bus de invalidación
+(tema `usuario.token`) en todos los workers.
+"""
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core import invalidacion
+from app.core.seguridad import ACCESS_TOKEN_EXPIRE_MINUTES, crear_access_token, verificar_token
+from app.models import EstadoCuenta, RolUsuario, Usuario
+
+# Estados de cuenta que no pueden usar una sesión
+ESTADOS_SIN_SESION = (EstadoCuenta.Eliminado, EstadoCuenta.Baneado, EstadoCuenta.Suspendido)
+
+# Duración de la cookie de sesión (segundos): la misma que el `exp` del JWT
+DURACION_COOKIE = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# id -> versión vigente del token (ausente = 0)
+_versiones: dict[str, int] = {}
+
+
+class UsuarioActual:
+    """Datos del usuario autenticado disponibles en `request.state.usuario_actual`."""
+
+    __slots__ = ("id", "username", "nombres", "apellidos", "avatar_url", "rol", "version_token")
+
+    # Columnas de `Usuario` en el orden del constructor
+    columnas = (
+        Usuario.id,
+        Usuario.username,
+        Usuario.nombres,
+        Usuario.apellidos,
+        Usuario.avatar_url,
+        Usuario.rol,
+        Usuario.version_token,
+    )
+
+    def __init__(self, id, username, nombres, apellidos, avatar_url, rol, version_token):
+        self.id = id
+        self.username = username
+        self.nombres = nombres
+        self.apellidos = apellidos
+        self.avatar_url = avatar_url
+        self.rol = rol
+        self.version_token = version_token
+
+    @classmethod
+    def desde_usuario(cls, usuario: Usuario) -> "UsuarioActual":
+        return cls(
+            usuario.id,
+            usuario.username,
+            usuario.nombres,
+            usuario.apellidos,
+            usuario.avatar_url,
+            RolUsuario(usuario.rol),
+            usuario.version_token or 0,
+        )
+
+    @classmethod
+    def desde_claims(cls, claims: dict) -> Optional["UsuarioActual"]:
+        """Retorna None si el token no trae los claims necesarios (tokens antiguos)."""
+        try:
+            return cls(
+                claims["uid"],
+                claims["sub"],
+                claims["nom"],
+                claims["ape"],
+                claims.get("av"),
+                RolUsuario(claims["rol"]),
+                int(claims["ver"]),
+            )
+        except (KeyError, ValueError, TypeError):
+            return None
+
+    def claims(self) -> dict:
+        return {
+            "sub": self.username,
+            "uid": self.id,
+            "nom": self.nombres,
+            "ape": self.apellidos,
+            "av": self.avatar_url,
+            "rol": self.rol.value,
+            "ver": self.version_token,
+        }
+
+
+def crear_token_usuario(usuario) -> str:
+    """Token de sesión con los claims del usuario (`Usuario` o `UsuarioActual`)."""
+    if not isinstance(usuario, UsuarioActual):
+        usuario = UsuarioActual.desde_usuario(usuario)
+    return crear_access_token(usuario.claims())
+
+
+def fijar_cookie_sesion(response, token: str) -> None:
+    response.set_cookie(
+        key="access_token",
+        value=f"Bearer {token}",
+        httponly=True,
+        max_age=DURACION_COOKIE,
+        expires=DURACION_COOKIE,
+    )
+
+
+def version_vigente(usuario_id: str) -> int:
+    return _versiones.get(usuario_id, 0)
+
+
+def registrar_version(usuario_id: str, version: int) -> None:
+    """Actualiza la versión vigente de un usuario (nunca la reduce)."""
+    if version > _versiones.get(usuario_id, 0):
+        _versiones[usuario_id] = version
+
+
+async def reconstruir_versiones(session: AsyncSession) -> int:
+    """Carga las versiones vigentes al iniciar. Retorna cuántos usuarios cargó."""
+    result = await session.execute(
+        select(Usuario.id, Usuario.version_token).where(Usuario.version_token > 0)
+    )
+    filas = result.all()
+    _versiones.clear()
+    _versiones.update({usuario_id: version for usuario_id, version in filas})
+    return len(filas)
+
+
+async def _recargar_versiones() -> None:
+    """Recarga el mapa tras una reconexión del bus (pudo perder mensajes)."""
+    from app.core.database import async_session_maker
+
+    async with async_session_maker() as session:
+        await reconstruir_versiones(session)
+
+
+invalidacion.suscribir(invalidacion.TEMA_VERSION_TOKEN, registrar_version)
+invalidacion.al_reconectar(_recargar_versiones)
+
+
+async def publicar_version(session: AsyncSession, usuario_id: str, version: int) -> None:
+    """Publica la nueva versión del token; se aplica en todos los workers al confirmar."""
+    await invalidacion.publicar(session, invalidacion.TEMA_VERSION_TOKEN, usuario_id, version)
+
+
+async def cargar_usuario_actual(session: AsyncSession, username: str) -> Optional[UsuarioActual]:
+    """
+    Carga el usuario desde la base de datos, si su cuenta puede tener sesión.
+    Consulta solo las columnas de `UsuarioActual`, sin hidratar la entidad.
+    """
+    result = await session.execute(
+        select(*UsuarioActual.columnas).where(
+            Usuario.username == username,
+            Usuario.estado_cuenta.not_in(ESTADOS_SIN_SESION),
+        )
+    )
+    fila = result.first()
+    if fila is None:
+        return None
+    usuario = UsuarioActual(*fila)
+    usuario.version_token = usuario.version_token or 0
+    registrar_version(usuario.id, usuario.version_token)
+    return usuario
+
+
+def usuario_desde_token(token: str) -> tuple[Optional[UsuarioActual], Optional[dict]]:
+    """
+    Valida el token sin base de datos.
+    Retorna (usuario, None) si el token es vigente, o (None, claims) si es
+    válido pero anterior a la versión vigente y hay que recargar al usuario.
+    """
+    claims = verificar_token(token)
+    if not claims or "sub" not in claims:
+        return None, None
+    usuario = UsuarioActual.desde_claims(claims)
+    if usuario is not None and usuario.version_token >= version_vigente(usuario.id):
+        return usuario, None
+    return None, claims
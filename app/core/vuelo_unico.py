@@ -0,0 +1,54 @@
+"""
+Deduplicación de lecturas concurrentes idénticas (single-flight).
+
+Cuando un perfil se comparte, decenas de peticiones a
+`/usuarios/{username}` llegan a la vez y cada una ejecuta la misma
+consulta. Con `compartir()`, la primera petición lanza la lectura y las
+que llegan mientras está en curso esperan ese mismo resultado en lugar
+de consultar otra vez:
+
+    usuario = await compartir("perfil", (fabrica, username), cargar)
+
+- La lectura corre en su propia tarea y con su propia sesión (`cargar`
+  debe abrirla): si la petición que la lanzó se cancela, las demás
+  siguen esperando el resultado.
+- Solo se comparten lecturas en curso; no es una caché. Al terminar, la
+  siguiente petición vuelve a consultar.
+- El resultado es el mismo objeto para todas las peticiones: debe
+  tratarse como solo lectura.
+- La clave debe incluir todo lo que cambia el resultado, incluida la
+  factory de sesiones (réplica o primaria).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.core import metricas
+
+# (operación, clave) -> tarea en curso
+_en_curso: dict[tuple, asyncio.Task] = {}
+
+
+async def compartir(operacion: str, clave: Hashable, cargar: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Ejecuta `cargar()` o se une a una ejecución en curso con la misma
+    operación y clave. `operacion` es un nombre fijo (etiqueta de métricas).
+    """
+    llave = (operacion, clave)
+    tarea = _en_curso.get(llave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(cargar())
+        _en_curso[llave] = tarea
+        tarea.add_done_callback(lambda t: _olvidar(llave, t))
+    else:
+        metricas.lecturas_compartidas_total.incrementar(operacion=operacion)
+    # shield: cancelar a quien espera no cancela la lectura de los demás
+    return await asyncio.shield(tarea)
+
+
+def _olvidar(llave: tuple, tarea: asyncio.Task) -> None:
+    if _en_curso.get(llave) is tarea:
+        del _en_curso[llave]
+    if not tarea.cancelled():
+        # Marca la excepción como recuperada si nadie quedó esperando
+        tarea.exception()
@@ -5,12 +5,15 @@ Este paquete contiene todos los modelos de base de datos:
 - Usuario: Autenticación y perfil público
 - PerfilDemografico: Datos demográficos para encuestas
 - LogActividad: Auditoría y registro de acciones
-- Enums: RolUsuario, EstadoCuenta, Sexo, TipoAccion
+- ContadorActividad: Contadores de actividad por minuto y worker
+- FilaUsuario, FilaPerfil, FilaLog, AutorLog, PerfilPublico: Modelos de lectura para vistas de listado
+- Trabajo, EjecucionPeriodica: Cola de trabajos en segundo plano y trabajos periódicos
+- Enums: RolUsuario, EstadoCuenta, Sexo, TipoAccion, EstadoTrabajo
 - Mixins: TimestampMixin, EstadisticasMixin
 """
 
 # Importar enums
-from app.models.enums import RolUsuario, EstadoCuenta, Sexo, TipoAccion
+from app.models.enums import RolUsuario, EstadoCuenta, Sexo, TipoAccion, EstadoTrabajo
 
 # Importar mixins
 from app.models.base import TimestampMixin, EstadisticasMixin
@@ -19,6 +22,9 @@ from app.models.base import TimestampMixin, EstadisticasMixin
 from app.models.usuario import Usuario, generar_uuid_personalizado
 from app.models.perfil_demografico import PerfilDemografico
 from app.models.log_actividad import LogActividad
+from app.models.contador_actividad import ContadorActividad
+from app.models.trabajo import Trabajo, EjecucionPeriodica
+from app.models.vistas import FilaUsuario, FilaPerfil, FilaLog, AutorLog, PerfilPublico
 # Redes sociales eliminadas del proyecto
 
 # Importar eventos (esto registra los listeners automáticamente)
@@ -30,6 +36,7 @@ __all__ = [
     "EstadoCuenta",
     "Sexo",
     "TipoAccion",
+    "EstadoTrabajo",
     # Mixins
     "TimestampMixin",
     "EstadisticasMixin",
@@ -37,6 +44,15 @@ __all__ = [
     "Usuario",
     "PerfilDemografico",
     "LogActividad",
+    "ContadorActividad",
+    "Trabajo",
+    "EjecucionPeriodica",
+    # Modelos de lectura
+    "FilaUsuario",
+    "FilaPerfil",
+    "FilaLog",
+    "AutorLog",
+    "PerfilPublico",
     # Utilidades
     "generar_uuid_personalizado",
 ]
@@ -4,6 +4,7 @@ Mixins base reutilizables para los modelos.
 
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import func
 from sqlmodel import Field, SQLModel
 
 
@@ -33,7 +34,7 @@ class TimestampMixin(CreacionMixin):
         nullable=False,
         sa_column_kwargs={
             "server_default": "now()",
-            "onupdate": "now()",
+            "onupdate": func.now(),
         },  # Actualiza automáticamente en la DB
     )
     ultima_actividad: Optional[datetime] = Field(
@@ -0,0 +1,24 @@
+"""
+Modelo de instantáneas de los contadores de actividad por worker.
+"""
+
+from sqlalchemy import BigInteger, Column
+from sqlmodel import Field, SQLModel
+
+
+class ContadorActividad(SQLModel, table=True):
+    """
+    Total de eventos de auditoría de un worker en un minuto, por tipo de
+    acción y resultado. Cada worker vuelca aquí sus contadores en memoria
+    para que el panel de actividad pueda combinarlos sin leer LogActividad
+    (ver app/core/contadores_actividad.py). Se conservan unas 25 horas.
+    """
+
+    __tablename__ = "contador_actividad"
+
+    worker: str = Field(primary_key=True, max_length=40)
+    # Minuto como entero (segundos Unix // 60)
+    minuto: int = Field(sa_column=Column(BigInteger, primary_key=True, index=True))
+    tipo_accion: str = Field(primary_key=True, max_length=50)
+    exitoso: bool = Field(primary_key=True)
+    total: int = Field(default=0, nullable=False)
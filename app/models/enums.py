@@ -77,3 +77,11 @@ class TipoAccion(str, Enum):
     # Sistema
     ErrorSistema = "ErrorSistema"
     AccesoNoAutorizado = "AccesoNoAutorizado"
+
+
+class EstadoTrabajo(str, Enum):
+    """Estado de un trabajo de la cola (los completados se borran)"""
+
+    Pendiente = "Pendiente"  # Esperando `disponible_en` o un worker libre
+    EnCurso = "EnCurso"  # Tomado por un worker hasta `bloqueado_hasta`
+    Fallido = "Fallido"  # Agotó sus intentos; se conserva para revisión
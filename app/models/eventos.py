@@ -2,28 +2,52 @@
 Eventos de SQLAlchemy para mantener sincronizados los timestamps.
 """
 
-from datetime import datetime, timezone
-from sqlalchemy import event
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
 from app.models.perfil_demografico import PerfilDemografico
+from app.models.usuario import Usuario
 
 
-@event.listens_for(PerfilDemografico, "before_update")
-def actualizar_timestamp_usuario(mapper, connection, target):
+@event.listens_for(Session, "after_flush")
+def actualizar_timestamp_usuario(session, flush_context):
     """
-    Cuando se actualiza el PerfilDemografico, también actualizar
+    Cuando se crea o actualiza un PerfilDemografico, también actualizar
     el timestamp del Usuario relacionado.
 
     Esto mantiene usuario.actualizado_en sincronizado con cualquier
     cambio en los datos del usuario, incluyendo su perfil demográfico.
+
+    Se emite un único UPDATE para todos los perfiles del flush, usando
+    solo `usuario_id` (sin cargar la relación `usuario`). Los usuarios que
+    ya se actualizan o se crean en el mismo flush se omiten, porque su
+    propio INSERT/UPDATE ya fija `actualizado_en`.
     """
-    if target.usuario:
-        target.usuario.actualizado_en = datetime.now(timezone.utc)
+    perfiles = [
+        obj for obj in session.new if isinstance(obj, PerfilDemografico)
+    ] + [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, PerfilDemografico)
+        and session.is_modified(obj, include_collections=False)
+    ]
+    if not perfiles:
+        return
 
+    ya_actualizados = {
+        obj.id for obj in session.new if isinstance(obj, Usuario)
+    } | {
+        obj.id
+        for obj in session.dirty
+        if isinstance(obj, Usuario)
+        and session.is_modified(obj, include_collections=False)
+    }
+    usuario_ids = {p.usuario_id for p in perfiles if p.usuario_id} - ya_actualizados
+    if not usuario_ids:
+        return
 
-@event.listens_for(PerfilDemografico, "after_insert")
-def actualizar_timestamp_usuario_insert(mapper, connection, target):
-    """
-    Cuando se crea un PerfilDemografico, actualizar el timestamp del Usuario.
-    """
-    if target.usuario:
-        target.usuario.actualizado_en = datetime.now(timezone.utc)
+    session.connection().execute(
+        update(Usuario)
+        .where(Usuario.id.in_(usuario_ids))
+        .values(actualizado_en=func.now())
+    )
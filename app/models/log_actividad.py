@@ -3,6 +3,7 @@ Modelo de Auditoría para registrar todas las acciones del usuario.
 """
 
 from typing import Optional
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, Column, JSON
 
 from app.models.base import CreacionMixin
@@ -17,11 +18,11 @@ class LogActividad(CreacionMixin, table=True):
 
     id: Optional[int] = Field(default=None, primary_key=True)
 
-    # Relación con Usuario
+    # Relación con Usuario (indexado junto con creado_en por
+    # ix_logactividad_usuario_creado, ver app/core/database.py)
     usuario_id: Optional[str] = Field(
         default=None,
         foreign_key="usuario.id",
-        index=True,
         description="ID del usuario que realizó la acción (null para acciones anónimas)",
     )
 
@@ -37,10 +38,11 @@ class LogActividad(CreacionMixin, table=True):
         description="Descripción legible de la acción",
     )
 
-    # Datos adicionales en formato JSON
+    # Datos adicionales en formato JSON (JSONB en PostgreSQL, con índice GIN
+    # para búsquedas por contención; ver app/core/auditoria.py)
     detalles: Optional[dict] = Field(
         default=None,
-        sa_column=Column(JSON),
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql")),
         description="Datos adicionales de la acción en formato JSON",
     )
 
@@ -0,0 +1,66 @@
+"""
+Modelo de la cola de trabajos en segundo plano.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+from app.models.base import CreacionMixin
+from app.models.enums import EstadoTrabajo
+
+
+class Trabajo(CreacionMixin, table=True):
+    """
+    Trabajo diferido de la cola en Postgres (ver app/core/trabajos.py).
+    Los workers lo toman con `FOR UPDATE SKIP LOCKED`; al completarse se
+    borra y, si falla, se reintenta con espera exponencial.
+    """
+
+    id: Optional[int] = Field(default=None, sa_column=Column(BigInteger, primary_key=True))
+
+    # Nombre del manejador registrado con @trabajo
+    tipo: str = Field(max_length=100)
+
+    # Argumentos con nombre del manejador
+    argumentos: dict = Field(
+        default_factory=dict,
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False),
+    )
+
+    estado: EstadoTrabajo = Field(default=EstadoTrabajo.Pendiente)
+
+    # No se ejecuta antes de este momento (programación y espera entre reintentos)
+    disponible_en: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        sa_column_kwargs={"server_default": "now()"},
+    )
+
+    # Mientras está EnCurso: si pasa este momento, el worker se da por caído
+    bloqueado_hasta: Optional[datetime] = Field(default=None)
+
+    intentos: int = Field(default=0, nullable=False)
+    max_intentos: int = Field(default=5, nullable=False)
+
+    ultimo_error: Optional[str] = Field(default=None, max_length=1000)
+
+    # Evita encolar dos veces lo mismo mientras el trabajo siga vivo: el índice
+    # único parcial ux_trabajo_clave_unica excluye los Fallido (ver SENTENCIAS_DDL)
+    clave_unica: Optional[str] = Field(default=None, max_length=200)
+
+
+class EjecucionPeriodica(SQLModel, table=True):
+    """
+    Última ejecución encolada de cada trabajo periódico. Sobrevive al
+    borrado del trabajo completado, así varios programadores nunca
+    encolan dos veces la misma ejecución (ver `encolar_periodicos`).
+    """
+
+    __tablename__ = "ejecucion_periodica"
+
+    nombre: str = Field(primary_key=True, max_length=100)
+    ultima_ejecucion: datetime = Field(nullable=False)
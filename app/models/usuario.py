@@ -93,6 +93,15 @@ class Usuario(TimestampMixin, EstadisticasMixin, table=True):
         max_length=255,
     )
 
+    # Versión de los tokens de sesión: se incrementa al cambiar los datos que
+    # viajan en el JWT o el estado de la cuenta (ver app/core/usuario_actual.py)
+    version_token: int = Field(
+        default=0,
+        sa_column_kwargs={"server_default": "0"},
+        exclude=True,
+        nullable=False,
+    )
+
     # Relación con perfil demográfico (1:1)
     perfil_demografico: Optional["PerfilDemografico"] = Relationship(
         back_populates="usuario",
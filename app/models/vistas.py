@@ -0,0 +1,117 @@
+"""
+Modelos de lectura para vistas de listado.
+
+Las páginas de listado solo muestran unos pocos campos, pero cargar
+entidades ORM completas trae todas las columnas (hash de contraseña,
+biografía, estadísticas...) y registra cada objeto en el identity map
+de la sesión. Estas tuplas con nombre se construyen a partir de una
+consulta que proyecta solo las columnas necesarias:
+
+    result = await session.execute(select(*FilaUsuario.columnas))
+    usuarios = [FilaUsuario(*fila) for fila in result]
+
+Son inmutables y no quedan asociadas a la sesión.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.models.enums import EstadoCuenta, RolUsuario, TipoAccion
+from app.models.log_actividad import LogActividad
+from app.models.usuario import Usuario
+
+
+class FilaUsuario(NamedTuple):
+    """Usuario en el listado de usuarios."""
+
+    id: str
+    username: str
+    nombres: str
+    apellidos: str
+    email: str
+    rol: RolUsuario
+    estado_cuenta: EstadoCuenta
+    creado_en: Optional[datetime]
+
+    columnas = (
+        Usuario.id,
+        Usuario.username,
+        Usuario.nombres,
+        Usuario.apellidos,
+        Usuario.email,
+        Usuario.rol,
+        Usuario.estado_cuenta,
+        Usuario.creado_en,
+    )
+
+
+class PerfilPublico(NamedTuple):
+    """Datos públicos de un usuario (ver app/core/cargador_usuarios.py)."""
+
+    id: str
+    username: str
+    nombres: str
+    apellidos: str
+    avatar_url: Optional[str]
+
+    columnas = (
+        Usuario.id,
+        Usuario.username,
+        Usuario.nombres,
+        Usuario.apellidos,
+        Usuario.avatar_url,
+    )
+
+
+class FilaPerfil(NamedTuple):
+    """Usuario en la página de perfil (se comparte entre visitas simultáneas)."""
+
+    id: str
+    username: str
+    nombres: str
+    apellidos: str
+    avatar_url: Optional[str]
+    creado_en: Optional[datetime]
+    ultima_actividad: Optional[datetime]
+    total_publicaciones: int
+    total_comentarios: int
+
+    columnas = (
+        Usuario.id,
+        Usuario.username,
+        Usuario.nombres,
+        Usuario.apellidos,
+        Usuario.avatar_url,
+        Usuario.creado_en,
+        Usuario.ultima_actividad,
+        Usuario.total_publicaciones,
+        Usuario.total_comentarios,
+    )
+
+
+class AutorLog(NamedTuple):
+    """Usuario que realizó una acción, en el listado de auditoría."""
+
+    username: str
+    nombres: str
+    apellidos: str
+
+    columnas = (Usuario.username, Usuario.nombres, Usuario.apellidos)
+
+
+class FilaLog(NamedTuple):
+    """Entrada del listado de auditoría y del historial de un usuario."""
+
+    id: int
+    tipo_accion: TipoAccion
+    descripcion: str
+    exitoso: bool
+    creado_en: datetime
+
+    columnas = (
+        LogActividad.id,
+        LogActividad.tipo_accion,
+        LogActividad.descripcion,
+        LogActividad.exitoso,
+        LogActividad.creado_en,
+    )
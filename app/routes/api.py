@@ -0,0 +1,105 @@
+"""
+Rutas JSON consumidas por el frontend (autocompletado, validaciones en vivo).
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import get_session_lectura
+from app.core.busqueda import buscar_usuarios, LIMITE_MAXIMO
+from app.core.cargador_usuarios import obtener_cargador
+from app.core.contadores_actividad import resumen_actividad
+from app.core.disponibilidad import verificar_disponibilidad
+
+router = APIRouter(prefix="/api", tags=["API"])
+
+# Máximo de perfiles por llamada a /api/usuarios/perfiles
+MAXIMO_PERFILES = 100
+
+
+@router.get("/usuarios/autocompletar")
+async def autocompletar_usuarios(
+    q: str = Query(default="", max_length=100),
+    limite: int = Query(default=8, ge=1, le=LIMITE_MAXIMO),
+    session: AsyncSession = Depends(get_session_lectura),
+):
+    """
+    Sugerencias de usuarios para la búsqueda mientras se escribe.
+    """
+    filas = await buscar_usuarios(session, q, limite=limite)
+    return {
+        "resultados": [
+            {
+                "username": fila.username,
+                "nombre": f"{fila.nombres} {fila.apellidos}",
+                "avatar_url": fila.avatar_url,
+                "url": f"/usuarios/{fila.username}",
+            }
+            for fila in filas
+        ]
+    }
+
+
+@router.get("/usuarios/perfiles")
+async def perfiles_usuarios(
+    id: list[str] = Query(default=[]),
+    username: list[str] = Query(default=[]),
+    session: AsyncSession = Depends(get_session_lectura),
+):
+    """
+    Perfiles públicos de varios usuarios en una sola consulta.
+    Acepta `id` y `username` repetibles; los que no existen se listan
+    en `no_encontrados`.
+    """
+    ids = list(dict.fromkeys(id))
+    usernames = list(dict.fromkeys(username))
+    if len(ids) + len(usernames) > MAXIMO_PERFILES:
+        raise HTTPException(
+            status_code=400, detail=f"Máximo {MAXIMO_PERFILES} perfiles por consulta"
+        )
+
+    perfiles = await obtener_cargador(session).muchos(ids=ids, usernames=usernames)
+    encontrados = {}
+    no_encontrados = []
+    for clave, perfil in zip(ids + usernames, perfiles):
+        if perfil is None:
+            no_encontrados.append(clave)
+        else:
+            encontrados.setdefault(perfil.id, perfil)
+    return {
+        "perfiles": [
+            {
+                "id": perfil.id,
+                "username": perfil.username,
+                "nombre": f"{perfil.nombres} {perfil.apellidos}",
+                "avatar_url": perfil.avatar_url,
+                "url": f"/usuarios/{perfil.username}",
+            }
+            for perfil in encontrados.values()
+        ],
+        "no_encontrados": no_encontrados,
+    }
+
+
+@router.get("/disponibilidad")
+async def disponibilidad(
+    username: Optional[str] = Query(default=None, max_length=50),
+    email: Optional[str] = Query(default=None, max_length=255),
+    session: AsyncSession = Depends(get_session_lectura),
+):
+    """
+    Indica si un username y/o email están disponibles para registrarse.
+    Responde desde memoria salvo cuando hay una posible coincidencia.
+    """
+    return await verificar_disponibilidad(session, username=username, email=email)
+
+
+@router.get("/actividad/contadores")
+async def contadores_actividad(session: AsyncSession = Depends(get_session_lectura)):
+    """
+    Eventos de auditoría por tipo de acción y resultado en el último
+    minuto, hora y día, combinando todos los workers.
+    """
+    return await resumen_actividad(session)
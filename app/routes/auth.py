@@ -7,6 +7,7 @@ from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, status, Request, Form, Response
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -16,8 +17,11 @@ from app.core import (
     verificar_password,
     registrar_actividad,
     templates,
-    crear_access_token,
 )
+from app.core import invalidacion
+from app.core.disponibilidad import normalizar_email
+from app.core.usuario_actual import ESTADOS_SIN_SESION, crear_token_usuario, fijar_cookie_sesion
+from app.core.limite_intentos import limitador_login
 from app.models import Usuario, PerfilDemografico, TipoAccion
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
@@ -61,7 +65,8 @@ async def registrar_usuario(
     """
     # 1. Verificar si el usuario o email ya existen
     statement = select(Usuario).where(
-        (Usuario.username == username) | (Usuario.email == email)
+        (Usuario.username == username)
+        | (func.lower(Usuario.email) == normalizar_email(email))
     )
     result = await session.execute(statement)
     existing_user = result.scalars().first()
@@ -102,6 +107,10 @@ async def registrar_usuario(
     # 3. Guardar en DB
     try:
         session.add(nuevo_usuario)
+        # Los filtros de disponibilidad de todos los workers se actualizan al confirmar
+        await invalidacion.publicar(
+            session, invalidacion.TEMA_ALTA_USUARIO, username, email
+        )
         await session.commit()
         await session.refresh(nuevo_usuario)
 
@@ -169,53 +178,63 @@ async def login(
     """
     Procesa el login y establece cookie de sesión.
     """
-    # 1. Buscar usuario
-    statement = select(Usuario).where(Usuario.username == form_data.username)
+    ip_address = request.client.host if request.client else None
+    user_agent = request.headers.get("User-Agent")
+
+    # 1. Rechazar ráfagas antes de consultar la DB o ejecutar bcrypt
+    if not limitador_login.permitido(ip_address, form_data.username):
+        limitador_login.registrar_fallo(
+            ip_address, form_data.username, user_agent, bloqueado=True
+        )
+        return templates.TemplateResponse(
+            "auth/login.html",
+            {
+                "request": request,
+                "error": "Demasiados intentos. Espera un momento e inténtalo de nuevo.",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(limitador_login.segundos_para_reintentar())},
+        )
+
+    # 2. Buscar usuario
+    statement = select(Usuario).where(
+        Usuario.username == form_data.username,
+        Usuario.estado_cuenta.not_in(ESTADOS_SIN_SESION),
+    )
     result = await session.execute(statement)
     usuario = result.scalars().first()
 
-    # 2. Verificar credenciales
+    # 3. Verificar credenciales
+    # Los fallos se agregan por IP y se auditan una vez por ventana
     if not usuario or not verificar_password(form_data.password, usuario.password):
-        await registrar_actividad(
-            session=session,
-            tipo_accion=TipoAccion.IntentoLoginFallido,
-            descripcion="Credenciales inválidas",
-            exitoso=False,
-            detalles={"username_intentado": form_data.username},
-            ip_address=(request.client.host if request.client else None),
-            user_agent=request.headers.get("User-Agent"),
-        )
+        limitador_login.registrar_fallo(ip_address, form_data.username, user_agent)
         return templates.TemplateResponse(
             "auth/login.html",
             {"request": request, "error": "Usuario o contraseña incorrectos"},
             status_code=status.HTTP_401_UNAUTHORIZED,
         )
 
-    # 3. Registrar login exitoso
+    limitador_login.registrar_exito(form_data.username)
+
+    # 4. Registrar login exitoso
     await registrar_actividad(
         session=session,
         tipo_accion=TipoAccion.Login,
         descripcion="Inicio de sesión exitoso",
         usuario_id=usuario.id,
-        ip_address=(request.client.host if request.client else None),
-        user_agent=request.headers.get("User-Agent"),
+        ip_address=ip_address,
+        user_agent=user_agent,
     )
 
-    # 4. Crear respuesta con redirección y cookie
-    # Generar token JWT real
-    token = crear_access_token({"sub": usuario.username})
+    # 5. Crear respuesta con redirección y cookie
+    # El token incluye los datos del usuario para no consultar la DB en cada página
+    token = crear_token_usuario(usuario)
 
     redirect_url = "/"
     response = RedirectResponse(url=redirect_url, status_code=status.HTTP_303_SEE_OTHER)
 
-    # Establecer cookie segura
-    response.set_cookie(
-        key="access_token",
-        value=f"Bearer {token}",
-        httponly=True,
-        max_age=1800,  # 30 minutos
-        expires=1800,
-    )
+    # Establecer cookie segura (30 minutos)
+    fijar_cookie_sesion(response, token)
 
     return response
 
@@ -2,43 +2,104 @@
 Rutas para la gestión y visualización de logs de actividad.
 """
 
-from fastapi import APIRouter, Request, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from fastapi.responses import HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from sqlalchemy.orm import selectinload
 
-from app.core import templates, get_session
-from app.models import LogActividad, Usuario
+from app.core import templates, get_session_lectura, respuesta_streaming
+from app.core.auditoria import filtrar_por_detalles, parsear_filtro_detalle
+from app.core.contadores_actividad import resumen_actividad
+from app.models import AutorLog, FilaLog, LogActividad, Usuario, TipoAccion
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
 
 @router.get("/", response_class=HTMLResponse)
-async def listar_logs(request: Request, session: AsyncSession = Depends(get_session)):
+async def listar_logs(
+    request: Request,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    detalle: list[str] = Query(default=[]),
+    session: AsyncSession = Depends(get_session_lectura),
+):
     """
     Endpoint que lista los logs de actividad recientes.
+
+    Filtros opcionales:
+    - `tipo`: valor de `TipoAccion`.
+    - `estado`: `exitoso` o `fallido`.
+    - `detalle` (repetible): `clave:valor` buscado por contención en
+      `detalles`, por ejemplo `detalle=email:ana@example.com`.
     """
-    # Consultar logs ordenados por fecha descendente
-    # Cargamos la relación con usuario para mostrar quién hizo la acción
+    # Consultar logs ordenados por fecha descendente, junto con quién hizo
+    # la acción; solo las columnas que muestra la plantilla (ver app/models/vistas.py)
     statement = (
-        select(LogActividad, Usuario)
+        select(*FilaLog.columnas, *AutorLog.columnas)
+        .select_from(LogActividad)
         .outerjoin(Usuario, LogActividad.usuario_id == Usuario.id)
         .order_by(LogActividad.creado_en.desc())
         .limit(50)
     )
 
-    result = await session.execute(statement)
-    logs_con_usuario = result.all()  # Retorna lista de tuplas (LogActividad, Usuario)
+    error = None
+    tipos_validos = {t.value for t in TipoAccion}
+    if tipo:
+        if tipo in tipos_validos:
+            statement = statement.where(LogActividad.tipo_accion == TipoAccion(tipo))
+        else:
+            error = f"Tipo de acción desconocido: {tipo}"
+    if estado in ("exitoso", "fallido"):
+        statement = statement.where(LogActividad.exitoso == (estado == "exitoso"))
+
+    detalles = [d for d in (texto.strip() for texto in detalle) if d]
+    filtros = [parsear_filtro_detalle(d) for d in detalles]
+    if None in filtros:
+        error = "Los filtros de detalles deben tener el formato clave:valor"
+    else:
+        statement = filtrar_por_detalles(statement, filtros)
 
+    logs_con_usuario = []
+    if not error:
+        result = await session.execute(statement)
+        # Lista de tuplas (FilaLog, AutorLog o None si la acción fue anónima)
+        n = len(FilaLog._fields)
+        logs_con_usuario = [
+            (FilaLog(*fila[:n]), AutorLog(*fila[n:]) if fila[n] is not None else None)
+            for fila in result
+        ]
+
+    # Página grande: se envía en bloques (ver app/core/templates.py)
+    return respuesta_streaming(
+        "auditoria/listar.html",
+        {
+            "request": request,
+            "logs": logs_con_usuario,
+            "tipos": [t.value for t in TipoAccion],
+            "filtros": {"tipo": tipo or "", "estado": estado or "", "detalles": detalles},
+            "filtrado": bool(tipo or estado in ("exitoso", "fallido") or detalles),
+            "error": error,
+        },
+    )
+
+
+@router.get("/panel", response_class=HTMLResponse)
+async def panel_actividad(request: Request, session: AsyncSession = Depends(get_session_lectura)):
+    """
+    Panel de actividad en vivo: eventos por tipo en el último minuto, hora y día.
+    Usa los contadores en memoria de los workers, nunca la tabla de logs.
+    """
+    resumen = await resumen_actividad(session)
     return templates.TemplateResponse(
-        "auditoria/listar.html", {"request": request, "logs": logs_con_usuario}
+        "auditoria/panel.html", {"request": request, "resumen": resumen}
     )
 
 
 @router.get("/{log_id}", response_class=HTMLResponse)
 async def ver_log(
-    log_id: int, request: Request, session: AsyncSession = Depends(get_session)
+    log_id: int, request: Request, session: AsyncSession = Depends(get_session_lectura)
 ):
     """
     Endpoint que muestra el detalle de un log específico.
@@ -0,0 +1,20 @@
+"""
+Ruta de exposición de métricas en formato Prometheus.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metricas import renderizar
+
+router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metricas():
+    """
+    Métricas del proceso en formato de texto de Prometheus.
+    """
+    return PlainTextResponse(
+        renderizar(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
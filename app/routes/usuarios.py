@@ -4,61 +4,157 @@
 Rutas para la gestión de usuarios.
 """
 
-from fastapi import APIRouter, Request, Depends, HTTPException
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import func, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from datetime import datetime
 
-from app.core import templates, get_session, registrar_actividad
-from app.models import Usuario
+from app.core import (
+    templates,
+    get_session,
+    registrar_actividad,
+    invalidacion,
+    respuesta_streaming,
+)
+from app.core.auditoria import decodificar_cursor, obtener_actividad_usuario
+from app.core.busqueda import normalizar_texto, filtrar_por_termino
+from app.core.cambios import calcular_cambios
+from app.core.purga import encolar_purga
+from app.core.replica import fabrica_lectura
+from app.core.vuelo_unico import compartir
+from app.core.ultima_actividad import contar_en_linea, esta_en_linea
+from app.core.usuario_actual import publicar_version
+from app.models import FilaLog, FilaPerfil, FilaUsuario, Usuario
 from app.models.perfil_demografico import PerfilDemografico
-from app.models.enums import Sexo, TipoAccion
+from app.models.enums import EstadoCuenta, Sexo, TipoAccion
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
 
+async def _consultar_usuarios(session: AsyncSession, termino: str) -> tuple[list[FilaUsuario], int]:
+    """Usuarios del listado (filtrados por `termino` si no está vacío) y cuántos están en línea."""
+    # Solo las columnas que muestra la plantilla (ver app/models/vistas.py)
+    statement = select(*FilaUsuario.columnas).where(
+        Usuario.estado_cuenta != EstadoCuenta.Eliminado
+    )
+    if termino:
+        statement = filtrar_por_termino(statement, termino)
+    else:
+        statement = statement.order_by(Usuario.creado_en.desc())
+
+    result = await session.execute(statement)
+    usuarios = [FilaUsuario(*fila) for fila in result]
+    return usuarios, await contar_en_linea(session)
+
+
+async def _consultar_perfil(
+    session: AsyncSession, username: str, tipos: tuple[TipoAccion, ...], cursor
+) -> Optional[tuple[FilaPerfil, tuple[FilaLog, ...], Optional[str]]]:
+    """
+    Usuario no eliminado y una página de su historial, en la misma sesión.
+    Solo tuplas inmutables: el resultado se comparte entre peticiones.
+    """
+    result = await session.execute(
+        select(*FilaPerfil.columnas).where(
+            Usuario.username == username,
+            Usuario.estado_cuenta != EstadoCuenta.Eliminado,
+        )
+    )
+    fila = result.first()
+    if fila is None:
+        return None
+    usuario = FilaPerfil(*fila)
+    actividad, siguiente = await obtener_actividad_usuario(
+        session, usuario.id, tipos=list(tipos), cursor=cursor
+    )
+    return usuario, tuple(actividad), siguiente
+
+
+async def _leer_compartido(request: Request, operacion: str, clave, consulta, *args):
+    """
+    Ejecuta `consulta(session, *args)` en una sesión de lectura propia,
+    compartiendo el resultado con las peticiones concurrentes que hagan
+    la misma lectura (ver app/core/vuelo_unico.py).
+    """
+    fabrica = fabrica_lectura(request)
+
+    async def cargar():
+        async with fabrica() as session:
+            return await consulta(session, *args)
+
+    return await compartir(operacion, (fabrica, clave), cargar)
+
+
 @router.get("/", response_class=HTMLResponse)
 async def listar_usuarios(
-    request: Request, session: AsyncSession = Depends(get_session)
+    request: Request,
+    q: Optional[str] = None,
 ):
     """
-    Endpoint que lista todos los usuarios registrados.
+    Endpoint que lista los usuarios registrados.
+    Si se recibe `q`, filtra por username, nombres o apellidos.
     """
-    # Consultar todos los usuarios
-    statement = select(Usuario).order_by(Usuario.creado_en.desc())
-    result = await session.execute(statement)
-    usuarios = result.scalars().all()
+    termino = normalizar_texto(q)
+    usuarios, en_linea = await _leer_compartido(
+        request, "listar_usuarios", termino, _consultar_usuarios, termino
+    )
 
-    return templates.TemplateResponse(
-        "usuarios/listar.html", {"request": request, "usuarios": usuarios}
+    # Página grande: se envía en bloques (ver app/core/templates.py)
+    return respuesta_streaming(
+        "usuarios/listar.html",
+        {"request": request, "usuarios": usuarios, "q": q or "", "en_linea": en_linea},
     )
 
 
 @router.get("/{username}", response_class=HTMLResponse)
 async def ver_perfil(
-    username: str, request: Request, session: AsyncSession = Depends(get_session)
+    username: str,
+    request: Request,
+    tipo: list[str] = Query(default=[]),
+    cursor: Optional[str] = None,
 ):
     """
-    Endpoint que muestra el perfil completo de un usuario.
+    Endpoint que muestra el perfil completo de un usuario con su historial
+    de actividad paginado.
+
+    Parámetros opcionales del historial:
+    - `tipo` (repetible): valores de `TipoAccion` a mostrar.
+    - `cursor`: página siguiente, tal como la entrega la página anterior.
     """
-    # Consultar usuario con su perfil demográfico
-    statement = (
-        select(Usuario)
-        .where(Usuario.username == username)
-        .options(
-            selectinload(Usuario.perfil_demografico),
-        )
+    tipos_validos = {t.value for t in TipoAccion}
+    tipos = [t for t in dict.fromkeys(tipo) if t in tipos_validos]
+    posicion = decodificar_cursor(cursor) if cursor else None
+
+    # Usuario e historial en una sola sesión (una conexión por visita); las
+    # visitas simultáneas a la misma página del perfil comparten la lectura
+    filtros = tuple(TipoAccion(t) for t in tipos)
+    clave = (username, filtros, posicion)
+    perfil = await _leer_compartido(
+        request, "ver_perfil", clave, _consultar_perfil, username, filtros, posicion
     )
-    result = await session.execute(statement)
-    usuario = result.scalars().first()
-
-    if not usuario:
+    if perfil is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    usuario, actividad, siguiente = perfil
 
     return templates.TemplateResponse(
-        "usuarios/perfil.html", {"request": request, "usuario": usuario}
+        "usuarios/perfil.html",
+        {
+            "request": request,
+            "usuario": usuario,
+            "en_linea": esta_en_linea(usuario),
+            "actividad": actividad,
+            "cursor_siguiente": siguiente,
+            "paginado": posicion is not None,
+            "tipos": [t.value for t in TipoAccion],
+            "tipos_seleccionados": tipos,
+            "consulta_tipos": urlencode([("tipo", t) for t in tipos]),
+        },
     )
 
 
@@ -71,7 +167,10 @@ async def editar_perfil_form(
     """
     statement = (
         select(Usuario)
-        .where(Usuario.username == username)
+        .where(
+            Usuario.username == username,
+            Usuario.estado_cuenta != EstadoCuenta.Eliminado,
+        )
         .options(selectinload(Usuario.perfil_demografico))
     )
     result = await session.execute(statement)
@@ -85,17 +184,60 @@ async def editar_perfil_form(
     )
 
 
+def _datos_usuario(form, usuario: Usuario) -> dict:
+    """Valores de `Usuario` enviados en el formulario de edición."""
+    return {
+        "nombres": form.get("nombres", usuario.nombres),
+        "apellidos": form.get("apellidos", usuario.apellidos),
+        "biografia": form.get("biografia", usuario.biografia) or None,
+    }
+
+
+def _datos_perfil(form, perfil: Optional[PerfilDemografico]) -> dict:
+    """Valores de `PerfilDemografico` enviados en el formulario de edición."""
+    datos = {
+        "telefono": form.get("telefono") or None,
+        "ciudad": form.get("ciudad") or None,
+        "departamento": form.get("departamento") or None,
+        "pais": form.get("pais", "CO"),
+        "nivel_educativo": form.get("nivel_educativo") or None,
+        "ocupacion": form.get("ocupacion") or None,
+    }
+
+    # Sexo (Enum)
+    sexo_val = form.get("sexo")
+    try:
+        datos["sexo"] = Sexo(sexo_val) if sexo_val else None
+    except ValueError:
+        datos["sexo"] = None
+
+    # Fecha Nacimiento (una fecha inválida conserva la actual)
+    fecha_nac_str = form.get("fecha_nacimiento")
+    if fecha_nac_str:
+        try:
+            datos["fecha_nacimiento"] = datetime.strptime(fecha_nac_str, "%Y-%m-%d")
+        except ValueError:
+            if perfil:
+                datos["fecha_nacimiento"] = perfil.fecha_nacimiento
+
+    return datos
+
+
 @router.post("/{username}/editar", response_class=HTMLResponse)
 async def editar_perfil_submit(
     username: str, request: Request, session: AsyncSession = Depends(get_session)
 ):
     """
     Procesa la actualización del perfil.
+    Solo escribe los campos modificados y no hace nada si no hubo cambios.
     """
     # Obtener usuario
     statement = (
         select(Usuario)
-        .where(Usuario.username == username)
+        .where(
+            Usuario.username == username,
+            Usuario.estado_cuenta != EstadoCuenta.Eliminado,
+        )
         .options(selectinload(Usuario.perfil_demografico))
     )
     result = await session.execute(statement)
@@ -104,57 +246,66 @@ async def editar_perfil_submit(
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    # Procesar formulario
+    # Procesar formulario y calcular solo los campos que cambiaron
     form = await request.form()
-
-    # Actualizar datos básicos de Usuario
-    usuario.nombres = form.get("nombres", usuario.nombres)
-    usuario.apellidos = form.get("apellidos", usuario.apellidos)
-    usuario.biografia = form.get("biografia", usuario.biografia)
-    usuario.actualizado_en = datetime.now()
-
-    # Actualizar o crear Perfil Demográfico
-    if not usuario.perfil_demografico:
-        usuario.perfil_demografico = PerfilDemografico(usuario_id=usuario.id)
-
     perfil = usuario.perfil_demografico
 
-    perfil.telefono = form.get("telefono") or None
-    perfil.ciudad = form.get("ciudad") or None
-    perfil.departamento = form.get("departamento") or None
-    perfil.pais = form.get("pais", "CO")
-    perfil.nivel_educativo = form.get("nivel_educativo") or None
-    perfil.ocupacion = form.get("ocupacion") or None
-
-    # Sexo (Enum)
-    sexo_val = form.get("sexo")
-    if sexo_val:
-        try:
-            perfil.sexo = Sexo(sexo_val)
-        except ValueError:
-            perfil.sexo = None
-    else:
-        perfil.sexo = None
+    cambios_usuario = calcular_cambios(usuario, _datos_usuario(form, usuario))
+    cambios_perfil = calcular_cambios(
+        perfil or PerfilDemografico(usuario_id=usuario.id),
+        _datos_perfil(form, perfil),
+    )
 
-    # Fecha Nacimiento
-    fecha_nac_str = form.get("fecha_nacimiento")
-    if fecha_nac_str:
-        try:
-            perfil.fecha_nacimiento = datetime.strptime(fecha_nac_str, "%Y-%m-%d")
-        except ValueError:
-            pass
+    # Formulario sin cambios: no se escribe nada
+    if not cambios_usuario and not cambios_perfil:
+        return RedirectResponse(url=f"/usuarios/{usuario.username}", status_code=303)
+
+    if cambios_perfil:
+        if perfil:
+            await session.execute(
+                update(PerfilDemografico)
+                .where(PerfilDemografico.id == perfil.id)
+                .values(**cambios_perfil)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            await session.execute(
+                insert(PerfilDemografico).values(
+                    usuario_id=usuario.id, **_datos_perfil(form, None)
+                )
+            )
+
+    # El UPDATE de usuario también refleja los cambios del perfil en actualizado_en.
+    # Si cambian datos del usuario, se invalidan sus tokens de sesión (llevan
+    # nombres y avatar); el siguiente request recibe un token nuevo.
+    valores = {**cambios_usuario, "actualizado_en": func.now()}
+    if cambios_usuario:
+        valores["version_token"] = Usuario.version_token + 1
+    result = await session.execute(
+        update(Usuario)
+        .where(Usuario.id == usuario.id)
+        .values(**valores)
+        .returning(Usuario.version_token)
+        .execution_options(synchronize_session=False)
+    )
+    if cambios_usuario:
+        await publicar_version(session, usuario.id, result.scalar_one())
 
-    session.add(usuario)
-    session.add(perfil)
-    await session.commit()
-    await session.refresh(usuario)
+    # Invalidar cachés de este usuario en todos los workers al confirmar
+    await invalidacion.publicar(
+        session, invalidacion.TEMA_USUARIO, usuario.id, usuario.username
+    )
 
+    # registrar_actividad confirma la transacción junto con los UPDATE
     await registrar_actividad(
         session=session,
         tipo_accion=TipoAccion.ActualizacionPerfil,
         descripcion="Actualización de perfil",
         usuario_id=usuario.id,
-        detalles={"username": usuario.username},
+        detalles={
+            "username": usuario.username,
+            "campos": sorted([*cambios_usuario, *cambios_perfil]),
+        },
         ip_address=(request.client.host if request.client else None),
         user_agent=request.headers.get("User-Agent"),
     )
@@ -168,25 +319,42 @@ async def eliminar_usuario(
 ):
     """
     Endpoint para eliminar un usuario.
+    Marca la cuenta como eliminada y encola el borrado real (trabajo `purgar_usuario`).
     """
-    # Buscar el usuario
-    statement = select(Usuario).where(Usuario.username == username)
-    result = await session.execute(statement)
-    usuario = result.scalars().first()
+    result = await session.execute(
+        update(Usuario)
+        .where(
+            Usuario.username == username,
+            Usuario.estado_cuenta != EstadoCuenta.Eliminado,
+        )
+        .values(
+            estado_cuenta=EstadoCuenta.Eliminado,
+            actualizado_en=func.now(),
+            version_token=Usuario.version_token + 1,
+        )
+        .returning(Usuario.id, Usuario.version_token)
+        .execution_options(synchronize_session=False)
+    )
+    fila = result.first()
 
-    if not usuario:
+    if not fila:
+        await session.rollback()
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    # Eliminar el usuario (esto también eliminará el perfil demográfico por cascada)
-    await session.delete(usuario)
-    await session.commit()
+    usuario_id = fila.id
+    await invalidacion.publicar(session, invalidacion.TEMA_USUARIO, usuario_id, username)
+    # Cierra las sesiones abiertas del usuario en todos los workers
+    await publicar_version(session, usuario_id, fila.version_token)
+    # El borrado real lo hace un trabajo en segundo plano
+    await encolar_purga(session, usuario_id)
 
+    # registrar_actividad confirma la transacción junto con el cambio de estado
     await registrar_actividad(
         session=session,
         tipo_accion=TipoAccion.EliminacionUsuario,
         descripcion="Usuario eliminado",
         exitoso=True,
-        detalles={"username": username},
+        detalles={"username": username, "usuario_id": usuario_id},
         ip_address=(request.client.host if request.client else None),
         user_agent=request.headers.get("User-Agent"),
     )
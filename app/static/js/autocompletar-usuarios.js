@@ -0,0 +1,76 @@
+document.addEventListener('DOMContentLoaded', function () {
+  var input = document.getElementById('busqueda-usuarios');
+  var lista = document.getElementById('sugerencias-usuarios');
+  if (!input || !lista) return;
+
+  var ESPERA_MS = 200;
+  var temporizador = null;
+  var controlador = null;
+
+  function ocultar() {
+    lista.classList.add('hidden');
+    lista.innerHTML = '';
+  }
+
+  function mostrar(resultados) {
+    lista.innerHTML = '';
+    if (!resultados.length) {
+      ocultar();
+      return;
+    }
+    resultados.forEach(function (r) {
+      var li = document.createElement('li');
+      li.setAttribute('role', 'option');
+      var a = document.createElement('a');
+      a.href = r.url;
+      a.className = 'block px-4 py-2 text-sm hover:bg-accent hover:text-accent-foreground';
+      var nombre = document.createElement('span');
+      nombre.className = 'font-medium text-foreground';
+      nombre.textContent = r.nombre;
+      var usuario = document.createElement('span');
+      usuario.className = 'ml-2 text-muted-foreground';
+      usuario.textContent = '@' + r.username;
+      a.appendChild(nombre);
+      a.appendChild(usuario);
+      li.appendChild(a);
+      lista.appendChild(li);
+    });
+    lista.classList.remove('hidden');
+  }
+
+  function buscar() {
+    var q = (input.value || '').trim();
+    if (controlador) controlador.abort();
+    if (!q) {
+      ocultar();
+      return;
+    }
+    controlador = new AbortController();
+    fetch('/api/usuarios/autocompletar?q=' + encodeURIComponent(q), {
+      signal: controlador.signal,
+      headers: { Accept: 'application/json' },
+    })
+      .then(function (resp) {
+        return resp.ok ? resp.json() : { resultados: [] };
+      })
+      .then(function (data) {
+        mostrar(data.resultados || []);
+      })
+      .catch(function (err) {
+        if (err.name !== 'AbortError') ocultar();
+      });
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(temporizador);
+    temporizador = setTimeout(buscar, ESPERA_MS);
+  });
+
+  input.addEventListener('keydown', function (e) {
+    if (e.key === 'Escape') ocultar();
+  });
+
+  document.addEventListener('click', function (e) {
+    if (!lista.contains(e.target) && e.target !== input) ocultar();
+  });
+});
@@ -0,0 +1,58 @@
+document.addEventListener('DOMContentLoaded', function () {
+  var ESPERA_MS = 300;
+  var campos = [
+    { input: 'username', estado: 'username-disponibilidad', etiqueta: 'El usuario' },
+    { input: 'email', estado: 'email-disponibilidad', etiqueta: 'El correo' },
+  ];
+
+  campos.forEach(function (campo) {
+    var input = document.getElementById(campo.input);
+    var estado = document.getElementById(campo.estado);
+    if (!input || !estado) return;
+
+    var temporizador = null;
+    var controlador = null;
+
+    function limpiar() {
+      estado.textContent = '';
+      estado.classList.remove('text-destructive', 'text-green-600');
+    }
+
+    function consultar() {
+      var valor = (input.value || '').trim();
+      if (controlador) controlador.abort();
+      if (!valor || !input.checkValidity()) {
+        limpiar();
+        return;
+      }
+      controlador = new AbortController();
+      fetch('/api/disponibilidad?' + campo.input + '=' + encodeURIComponent(valor), {
+        signal: controlador.signal,
+        headers: { Accept: 'application/json' },
+      })
+        .then(function (resp) {
+          return resp.ok ? resp.json() : {};
+        })
+        .then(function (data) {
+          var r = data[campo.input];
+          if (!r || r.valor !== (input.value || '').trim()) return;
+          limpiar();
+          if (r.disponible) {
+            estado.textContent = campo.etiqueta + ' está disponible.';
+            estado.classList.add('text-green-600');
+          } else {
+            estado.textContent = campo.etiqueta + ' ya está registrado.';
+            estado.classList.add('text-destructive');
+          }
+        })
+        .catch(function (err) {
+          if (err.name !== 'AbortError') limpiar();
+        });
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(temporizador);
+      temporizador = setTimeout(consultar, ESPERA_MS);
+    });
+  });
+});
@@ -2,15 +2,34 @@
 Punto de entrada principal de la aplicación VOCES.
 """
 
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.database import init_db, async_session_maker
-from app.core.seguridad import verificar_token
-from sqlmodel import select
-from app.models import Usuario
-from app.routes import auth, main as main_routes, usuarios, logs
+from app.core.disponibilidad import reconstruir_filtros
+from app.core.limite_intentos import tarea_limpieza
+from app.core.invalidacion import tarea_escucha
+from app.core.contadores_actividad import tarea_volcado_contadores
+from app.core.ultima_actividad import tarea_ultima_actividad
+from app.core.usuario_actual import (
+    UsuarioActual,
+    cargar_usuario_actual,
+    crear_token_usuario,
+    fijar_cookie_sesion,
+    reconstruir_versiones,
+    usuario_desde_token,
+)
+from app.core import admision, metricas, perfilado, replica, sesion_peticion, trabajos, ultima_actividad
+from app.core.vuelo_unico import compartir
+from app.routes import auth, main as main_routes, usuarios, logs, api
+from app.routes import metricas as metricas_routes
+
+logger = logging.getLogger("voces.sesion")
 
 
 @asynccontextmanager
@@ -19,11 +38,32 @@ async def lifespan(app: FastAPI):
     Ciclo de vida de la aplicación.
     Se ejecuta al iniciar y detener el servidor.
     """
-    # Inicio: Crear tablas si no existen
-    await init_db()
-    print("✅ Base de datos inicializada")
+    # Inicio: Crear tablas solo si el esquema cambió
+    if await init_db():
+        print("✅ Esquema de base de datos aplicado")
+    else:
+        print("✅ Esquema de base de datos al día")
+    async with async_session_maker() as session:
+        total = await reconstruir_filtros(session)
+        versiones = await reconstruir_versiones(session)
+    print(f"✅ Filtros de disponibilidad cargados ({total} usuarios)")
+    print(f"✅ Versiones de token cargadas ({versiones} usuarios)")
+    tareas = [
+        asyncio.create_task(tarea_limpieza()),
+        asyncio.create_task(tarea_escucha()),
+        asyncio.create_task(replica.tarea_vigilar_replica()),
+        asyncio.create_task(tarea_volcado_contadores()),
+        asyncio.create_task(tarea_ultima_actividad()),
+    ]
+    if trabajos.EN_PROCESO:
+        # Cola de trabajos y periódicos (o aparte con scripts/trabajador.py)
+        tareas.append(asyncio.create_task(trabajos.tarea_trabajos()))
+        tareas.append(asyncio.create_task(trabajos.tarea_programador()))
     yield
-    # Fin: Limpieza (si fuera necesaria)
+    # Fin: Detener tareas de fondo
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
 
 
 app = FastAPI(
@@ -41,35 +81,151 @@ app.include_router(main_routes.router)
 app.include_router(auth.router)
 app.include_router(usuarios.router)
 app.include_router(logs.router)
+app.include_router(api.router)
+app.include_router(metricas_routes.router)
+
+
+async def _recargar_usuario(username: str):
+    # Sesión propia y no la de la petición: la recarga se comparte entre
+    # peticiones (ver app/core/vuelo_unico.py) y puede seguir en curso
+    # cuando la petición que la lanzó ya terminó y cerró su sesión.
+    async with async_session_maker() as session:
+        return await cargar_usuario_actual(session, username)
 
 
 @app.middleware("http")
 async def inject_current_user(request: Request, call_next):
     """
     Middleware que inyecta `request.state.usuario_actual` para uso en plantillas.
-    Valida el JWT desde la cookie `access_token` y consulta la base de datos.
+    Construye el usuario a partir de los claims del JWT de la cookie
+    `access_token`, sin consultar la base de datos. Solo si el token es
+    anterior a la versión vigente del usuario lo recarga desde la primaria
+    y emite un token nuevo (ver app/core/usuario_actual.py). También anota
+    la actividad del usuario, que se persiste en diferido
+    (ver app/core/ultima_actividad.py).
     """
     user = None
+    recargado = False
     token = request.cookies.get("access_token")
 
     if token and token.startswith("Bearer "):
         # Extraer el token JWT (remover "Bearer ")
         jwt_token = token.replace("Bearer ", "")
+        user, claims_desactualizados = usuario_desde_token(jwt_token)
 
-        # Verificar y decodificar el token
-        payload = verificar_token(jwt_token)
-
-        if payload and "sub" in payload:
-            username = payload["sub"]
+        if claims_desactualizados:
+            # Token anterior a un cambio del usuario: recargar desde la primaria.
+            # Las peticiones simultáneas del mismo usuario comparten la consulta.
+            username = claims_desactualizados["sub"]
             try:
-                async with async_session_maker() as session:
-                    result = await session.execute(
-                        select(Usuario).where(Usuario.username == username)
-                    )
-                    user = result.scalars().first()
+                user = await compartir("usuario_actual", username, lambda: _recargar_usuario(username))
+                recargado = True
             except Exception:
-                user = None
+                # Fallo transitorio de la base de datos: no es motivo para cerrar la
+                # sesión. Se atiende con los claims del token y la cookie no se toca.
+                logger.exception("No se pudo recargar al usuario %s", username)
+                user = UsuarioActual.desde_claims(claims_desactualizados)
 
     request.state.usuario_actual = user
+    if user:
+        ultima_actividad.registrar(user.id)
     response = await call_next(request)
+    if recargado:
+        if user:
+            fijar_cookie_sesion(response, crear_token_usuario(user))
+        else:
+            # La cuenta ya no puede tener sesión
+            response.delete_cookie("access_token")
     return response
+
+
+# Control de admisión: límites de peticiones simultáneas por clase de ruta,
+# con cola y rechazo 503 (ver app/core/admision.py). Es ASGI puro para
+# retener el cupo hasta terminar de enviar el cuerpo (streaming y estáticos).
+# Envuelve a `inject_current_user` para que una recarga del usuario también ocupe cupo.
+app.add_middleware(admision.ControlAdmision)
+
+
+@app.middleware("http")
+async def sesion_por_peticion(request: Request, call_next):
+    """
+    Middleware que comparte una única sesión de base de datos entre las
+    dependencias `get_session`/`get_session_lectura` y la ruta, y la cierra
+    una sola vez al terminar (ver app/core/sesion_peticion.py).
+    """
+    token = sesion_peticion.iniciar_peticion()
+    try:
+        return await call_next(request)
+    finally:
+        await sesion_peticion.finalizar_peticion(token)
+
+
+@app.middleware("http")
+async def leer_de_primaria_tras_escritura(request: Request, call_next):
+    """
+    Middleware que detecta si la petición escribió en la base de datos
+    principal y, en ese caso, fija la cookie que envía las lecturas de
+    este navegador a la primaria durante unos segundos (ver app/core/replica.py).
+    """
+    token = replica.iniciar_peticion()
+    try:
+        response = await call_next(request)
+    finally:
+        escribio = replica.finalizar_peticion(token)
+    if escribio and replica.engine_replica is not None:
+        replica.fijar_cookie_primaria(response)
+    return response
+
+
+class MedirPeticiones:
+    """
+    Middleware que registra latencia, estado, peticiones en curso y consumo
+    de base de datos por ruta, y activa el perfilado de consultas (lentas y
+    N+1). Envuelve a `inject_current_user` para incluir también su consulta.
+
+    Es ASGI puro, como `ControlAdmision`: la latencia se mide hasta enviar
+    el último fragmento del cuerpo, así incluye la generación de las
+    páginas en streaming (con `@app.middleware("http")`, `call_next`
+    retorna en cuanto están las cabeceras).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metodo = scope["method"]
+        inicio = time.perf_counter()
+        token = metricas.iniciar_peticion()
+        tokens_perfilado = perfilado.iniciar_peticion(f"{metodo} {scope['path']}")
+        metricas.peticiones_en_curso.sumar()
+        estado = 500
+        duracion = None
+
+        async def enviar(mensaje: Message) -> None:
+            nonlocal estado, duracion
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                duracion = time.perf_counter() - inicio
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if duracion is None:
+                # Error o cliente desconectado antes del último fragmento
+                duracion = time.perf_counter() - inicio
+            metricas.peticiones_en_curso.restar()
+            # Plantilla de la ruta (ej: /usuarios/{username}) para acotar la cardinalidad
+            route = scope.get("route")
+            ruta = getattr(route, "path", None) or "sin_ruta"
+            metricas.duracion_peticion.observar(duracion, metodo=metodo, ruta=ruta)
+            metricas.peticiones_total.incrementar(metodo=metodo, ruta=ruta, estado=str(estado))
+            metricas.finalizar_peticion(token, ruta)
+            perfilado.finalizar_peticion(tokens_perfilado, f"{metodo} {ruta}")
+
+
+app.add_middleware(MedirPeticiones)
@@ -0,0 +1,83 @@
+"""
+Utilidades compartidas por los scripts de benchmark: estadísticas,
+guardado de resultados y comparación con una ejecución anterior.
+"""
+
+import json
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+DIRECTORIO_RESULTADOS = Path(__file__).parent / "resultados"
+
+
+def percentil(valores_ordenados: list[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+def resumir(muestras: list[float]) -> dict:
+    """Resumen estadístico de una lista de duraciones (segundos)."""
+    ordenadas = sorted(muestras)
+    if not ordenadas:
+        return {"n": 0}
+    return {
+        "n": len(ordenadas),
+        "media": statistics.fmean(ordenadas),
+        "desviacion": statistics.pstdev(ordenadas),
+        "min": ordenadas[0],
+        "p50": percentil(ordenadas, 50),
+        "p95": percentil(ordenadas, 95),
+        "p99": percentil(ordenadas, 99),
+        "max": ordenadas[-1],
+    }
+
+
+def commit_actual() -> str:
+    """Hash corto del commit actual (o 'sin-git')."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "sin-git"
+
+
+def guardar_resultados(tipo: str, datos: dict, destino: Optional[Path] = None) -> Path:
+    """Guarda los resultados en JSON, identificados por fecha y commit."""
+    commit = commit_actual()
+    if destino is None:
+        DIRECTORIO_RESULTADOS.mkdir(parents=True, exist_ok=True)
+        marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+        destino = DIRECTORIO_RESULTADOS / f"{tipo}-{marca}-{commit}.json"
+    contenido = {
+        "tipo": tipo,
+        "commit": commit,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        **datos,
+    }
+    destino.write_text(json.dumps(contenido, indent=2, ensure_ascii=False))
+    return destino
+
+
+def cargar_resultados(ruta: Path) -> dict:
+    return json.loads(Path(ruta).read_text())
+
+
+def ms(segundos: float) -> str:
+    return f"{segundos * 1000:9.2f}"
+
+
+def variacion(actual: float, base: float) -> Optional[float]:
+    """Variación relativa de `actual` respecto a `base` (0.10 = 10% más lento)."""
+    if not base:
+        return None
+    return (actual - base) / base
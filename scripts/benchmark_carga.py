@@ -0,0 +1,398 @@
+"""
+Benchmark de carga de extremo a extremo contra una base de datos local.
+
+Arranca la aplicación FastAPI en el mismo proceso (sin servidor HTTP,
+llamando directamente a la interfaz ASGI), siembra la base de datos con
+un volumen configurable de usuarios, perfiles y logs, y ejecuta una
+mezcla realista de peticiones con varios clientes concurrentes.
+
+Reporta throughput y latencias p50/p95/p99 por ruta y guarda el resultado
+en `scripts/resultados/` para compararlo entre commits.
+
+Uso:
+    python -m scripts.benchmark_carga --usuarios 1000 --logs 50000 --duracion 30
+    python -m scripts.benchmark_carga --sin-sembrar --comparar scripts/resultados/carga-....json
+    python -m scripts.benchmark_carga --limpiar
+
+IMPORTANTE: usa la base de datos de `DATABASE_URL`. No ejecutar contra
+producción. Cada ejecución lleva una marca única (`bench_<8 hex>`) en los
+usernames, en los logs sembrados y en el nombre de worker de sus
+contadores de actividad; `--limpiar` elimina todo lo que escribieron las
+ejecuciones del benchmark (usuarios, perfiles, logs, trabajos y
+contadores). Los trabajos en segundo plano no se ejecutan en el proceso
+del benchmark salvo que se fije `TRABAJOS_EN_PROCESO=1`.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+from sqlalchemy import delete, insert, select
+
+from scripts._benchmark_comun import (
+    cargar_resultados,
+    guardar_resultados,
+    ms,
+    resumir,
+    variacion,
+)
+
+PREFIJO = "bench_"
+PASSWORD = "benchmark-password"
+DOMINIO_EMAIL = "benchmark.local"
+
+# Usernames sembrados: bench_<marca de 8 hex>_<n>
+PATRON_USERNAME = rf"^{PREFIJO}[0-9a-f]{{8}}_[0-9]+$"
+
+# Mezcla de escenarios: nombre -> peso relativo
+MEZCLA = {
+    "login": 5,
+    "perfil": 40,
+    "editar_perfil": 10,
+    "listar_usuarios": 20,
+    "listar_logs": 15,
+    "ver_log": 10,
+}
+
+TIPOS_ACCION = ["Login", "Logout", "ActualizacionPerfil", "IntentoLoginFallido"]
+
+
+class ClienteASGI:
+    """Cliente HTTP mínimo que invoca la aplicación ASGI en el mismo proceso."""
+
+    def __init__(self, app, ip: str = "127.0.0.1"):
+        self.app = app
+        self.ip = ip
+        self.username = ""
+        self.cookies: dict[str, str] = {}
+
+    async def solicitar(self, metodo: str, ruta: str, formulario: dict = None):
+        ruta_base, _, query = ruta.partition("?")
+        cuerpo = urlencode(formulario).encode() if formulario else b""
+        cabeceras = [(b"host", b"benchmark"), (b"user-agent", b"voces-benchmark")]
+        if formulario is not None:
+            cabeceras.append((b"content-type", b"application/x-www-form-urlencoded"))
+            cabeceras.append((b"content-length", str(len(cuerpo)).encode()))
+        if self.cookies:
+            cookie = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+            cabeceras.append((b"cookie", cookie.encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": metodo,
+            "scheme": "http",
+            "path": ruta_base,
+            "raw_path": ruta_base.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": cabeceras,
+            "client": (self.ip, 50000),
+            "server": ("benchmark", 80),
+        }
+        enviado = False
+
+        async def receive():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            await asyncio.Event().wait()
+
+        estado = 0
+
+        async def send(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                for nombre, valor in mensaje.get("headers", []):
+                    if nombre.lower() == b"set-cookie":
+                        par = valor.decode().split(";", 1)[0]
+                        clave, _, contenido = par.partition("=")
+                        self.cookies[clave.strip()] = contenido.strip()
+
+        await self.app(scope, receive, send)
+        return estado
+
+
+def nueva_marca() -> str:
+    """Marca única de una ejecución del benchmark."""
+    return f"{PREFIJO}{uuid.uuid4().hex[:8]}"
+
+
+def _es_del_benchmark(columna_username):
+    """Filtro de los usuarios sembrados por cualquier ejecución del benchmark."""
+    from app.models import Usuario
+
+    return columna_username.regexp_match(PATRON_USERNAME) & Usuario.email.like(
+        f"%@{DOMINIO_EMAIL}"
+    )
+
+
+async def _ids_libres(session, cantidad: int) -> list[str]:
+    """IDs LLLNNN aleatorios que no existen en la tabla de usuarios."""
+    from app.models import Usuario
+    from app.models.usuario import generar_uuid_personalizado
+
+    libres: set[str] = set()
+    while len(libres) < cantidad:
+        candidatos = {generar_uuid_personalizado() for _ in range(cantidad - len(libres))}
+        ocupados = await session.execute(select(Usuario.id).where(Usuario.id.in_(candidatos)))
+        libres |= candidatos - set(ocupados.scalars().all())
+    return list(libres)
+
+
+async def sembrar(marca: str, num_usuarios: int, num_logs: int) -> None:
+    """Inserta usuarios, perfiles y logs de prueba con la marca de la ejecución, en lotes."""
+    from app.core.database import async_session_maker
+    from app.core.seguridad import hashear_password
+    from app.models import EstadoCuenta, LogActividad, PerfilDemografico, Usuario
+
+    password = hashear_password(PASSWORD)
+    lote = 1000
+
+    async with async_session_maker() as session:
+        ids_usuarios = await _ids_libres(session, num_usuarios)
+        usuarios = []
+        for i, usuario_id in enumerate(ids_usuarios):
+            username = f"{marca}_{i}"
+            usuarios.append(
+                {
+                    "id": usuario_id,
+                    "username": username,
+                    "email": f"{username}@{DOMINIO_EMAIL}",
+                    "password": password,
+                    "nombres": random.choice(["Ana", "José", "María", "Andrés", "Lucía"]),
+                    "apellidos": random.choice(["Pérez", "Gómez", "Núñez", "Díaz", "Ruiz"]),
+                    "estado_cuenta": EstadoCuenta.Activo,
+                }
+            )
+        for inicio in range(0, len(usuarios), lote):
+            await session.execute(insert(Usuario), usuarios[inicio : inicio + lote])
+            await session.execute(
+                insert(PerfilDemografico),
+                [{"usuario_id": u["id"], "pais": "CO"} for u in usuarios[inicio : inicio + lote]],
+            )
+        await session.commit()
+
+        ids = [u["id"] for u in usuarios]
+        ahora = datetime.now()
+        for inicio in range(0, num_logs, lote):
+            filas = [
+                {
+                    "usuario_id": random.choice(ids) if ids else None,
+                    "tipo_accion": random.choice(TIPOS_ACCION),
+                    "descripcion": "Evento sembrado por el benchmark",
+                    "detalles": {"origen": "benchmark", "marca": marca},
+                    "exitoso": random.random() > 0.1,
+                    # Historial repartido en el último año
+                    "creado_en": ahora - timedelta(seconds=random.randint(0, 365 * 86400)),
+                }
+                for _ in range(min(lote, num_logs - inicio))
+            ]
+            await session.execute(insert(LogActividad), filas)
+        await session.commit()
+
+    print(f"✅ Sembrados {len(usuarios)} usuarios y {num_logs} logs (marca {marca})")
+
+
+async def limpiar() -> None:
+    """
+    Elimina todo lo que escribieron las ejecuciones del benchmark: usuarios
+    y perfiles sembrados, sus logs (sembrados o generados por las
+    peticiones), trabajos que los referencian y contadores de actividad
+    de los workers del benchmark.
+    """
+    from app.core.database import async_session_maker
+    from app.models import ContadorActividad, LogActividad, PerfilDemografico, Trabajo, Usuario
+
+    async with async_session_maker() as session:
+        ids = select(Usuario.id).where(_es_del_benchmark(Usuario.username))
+        await session.execute(
+            delete(LogActividad).where(
+                LogActividad.usuario_id.in_(ids)
+                | (LogActividad.detalles["origen"].as_string() == "benchmark")
+            )
+        )
+        await session.execute(
+            delete(Trabajo).where(Trabajo.argumentos["usuario_id"].as_string().in_(ids))
+        )
+        await session.execute(
+            delete(ContadorActividad).where(ContadorActividad.worker.like(f"{PREFIJO}%"))
+        )
+        await session.execute(
+            delete(PerfilDemografico).where(PerfilDemografico.usuario_id.in_(ids))
+        )
+        await session.execute(delete(Usuario).where(_es_del_benchmark(Usuario.username)))
+        await session.commit()
+    print("✅ Datos del benchmark eliminados")
+
+
+async def _usernames_y_logs() -> tuple[list[str], list[int]]:
+    from app.core.database import async_session_maker
+    from app.models import LogActividad, Usuario
+
+    async with async_session_maker() as session:
+        usernames = (
+            await session.execute(
+                select(Usuario.username).where(_es_del_benchmark(Usuario.username))
+            )
+        ).scalars().all()
+        logs = (
+            await session.execute(
+                select(LogActividad.id).order_by(LogActividad.id.desc()).limit(1000)
+            )
+        ).scalars().all()
+    return list(usernames), list(logs)
+
+
+async def _escenario(cliente: ClienteASGI, nombre: str, usernames, logs) -> tuple[str, int]:
+    """Ejecuta un escenario y retorna (ruta, estado)."""
+    username = cliente.username
+    if nombre == "login":
+        estado = await cliente.solicitar(
+            "POST", "/auth/login", {"username": username, "password": PASSWORD}
+        )
+        return "POST /auth/login", estado
+    if nombre == "perfil":
+        otro = random.choice(usernames)
+        return "GET /usuarios/{username}", await cliente.solicitar("GET", f"/usuarios/{otro}")
+    if nombre == "editar_perfil":
+        estado = await cliente.solicitar(
+            "POST",
+            f"/usuarios/{username}/editar",
+            {
+                "nombres": "Benchmark",
+                "apellidos": "Carga",
+                "ciudad": random.choice(["Montería", "Cereté", "Lorica"]),
+                "pais": "CO",
+            },
+        )
+        return "POST /usuarios/{username}/editar", estado
+    if nombre == "listar_usuarios":
+        return "GET /usuarios/", await cliente.solicitar("GET", "/usuarios/")
+    if nombre == "listar_logs":
+        return "GET /logs/", await cliente.solicitar("GET", "/logs/")
+    log_id = random.choice(logs) if logs else 1
+    return "GET /logs/{log_id}", await cliente.solicitar("GET", f"/logs/{log_id}")
+
+
+async def ejecutar_carga(concurrencia: int, duracion: float) -> dict:
+    """Lanza `concurrencia` clientes durante `duracion` segundos."""
+    import main
+
+    usernames, logs = await _usernames_y_logs()
+    if not usernames:
+        raise SystemExit("No hay usuarios sembrados: ejecuta sin --sin-sembrar primero")
+
+    latencias: dict[str, list[float]] = defaultdict(list)
+    errores: dict[str, int] = defaultdict(int)
+    escenarios = list(MEZCLA)
+    pesos = list(MEZCLA.values())
+    fin = time.perf_counter() + duracion
+
+    async def cliente_virtual(indice: int):
+        # Cada cliente usa una IP distinta para no activar el limitador de login
+        cliente = ClienteASGI(main.app, ip=f"10.0.{indice // 250}.{indice % 250 + 1}")
+        cliente.username = usernames[indice % len(usernames)]
+        await cliente.solicitar(
+            "POST", "/auth/login", {"username": cliente.username, "password": PASSWORD}
+        )
+        while time.perf_counter() < fin:
+            nombre = random.choices(escenarios, pesos)[0]
+            inicio = time.perf_counter()
+            ruta, estado = await _escenario(cliente, nombre, usernames, logs)
+            latencias[ruta].append(time.perf_counter() - inicio)
+            if estado >= 400:
+                errores[ruta] += 1
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*(cliente_virtual(i) for i in range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio_total
+
+    rutas = {}
+    for ruta, muestras in sorted(latencias.items()):
+        rutas[ruta] = {
+            **resumir(muestras),
+            "rps": len(muestras) / transcurrido,
+            "errores": errores[ruta],
+        }
+    total = sum(len(m) for m in latencias.values())
+    return {
+        "concurrencia": concurrencia,
+        "duracion": transcurrido,
+        "total_peticiones": total,
+        "rps_total": total / transcurrido,
+        "rutas": rutas,
+    }
+
+
+def imprimir(resultado: dict, base: dict = None) -> None:
+    print(
+        f"\nTotal: {resultado['total_peticiones']} peticiones en "
+        f"{resultado['duracion']:.1f}s ({resultado['rps_total']:.1f} req/s), "
+        f"concurrencia {resultado['concurrencia']}\n"
+    )
+    print(f"{'Ruta':36} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>5}  vs base p95")
+    for ruta, r in resultado["rutas"].items():
+        comparacion = ""
+        if base and ruta in base.get("rutas", {}):
+            delta = variacion(r["p95"], base["rutas"][ruta]["p95"])
+            if delta is not None:
+                comparacion = f"{delta:+.1%}"
+        print(
+            f"{ruta:36} {r['rps']:8.1f} {ms(r['p50'])} {ms(r['p95'])} {ms(r['p99'])} "
+            f"{r['errores']:5d}  {comparacion}"
+        )
+
+
+async def principal(args) -> None:
+    if args.limpiar:
+        await limpiar()
+        return
+
+    marca = nueva_marca()
+    # Sin cola de trabajos en el proceso (se lee al importar main): la carga
+    # no toma trabajos reales ni encola periódicos
+    os.environ.setdefault("TRABAJOS_EN_PROCESO", "0")
+    import main
+    from app.core import contadores_actividad
+
+    # Los contadores de actividad se vuelcan con este nombre de worker, así
+    # `--limpiar` los reconoce
+    contadores_actividad.ORIGEN = f"{marca}-{os.getpid()}"
+
+    async with main.lifespan(main.app):
+        if not args.sin_sembrar:
+            await sembrar(marca, args.usuarios, args.logs)
+        resultado = await ejecutar_carga(args.concurrencia, args.duracion)
+
+    base = cargar_resultados(args.comparar) if args.comparar else None
+    imprimir(resultado, base)
+    destino = guardar_resultados("carga", resultado, Path(args.salida) if args.salida else None)
+    print(f"\n📄 Resultados guardados en {destino}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de VOCES")
+    parser.add_argument("--usuarios", type=int, default=500, help="Usuarios a sembrar")
+    parser.add_argument("--logs", type=int, default=20_000, help="Logs a sembrar")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Clientes simultáneos")
+    parser.add_argument("--duracion", type=float, default=20.0, help="Segundos de carga")
+    parser.add_argument("--sin-sembrar", action="store_true", help="Reutilizar datos existentes")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    parser.add_argument("--salida", help="Ruta del JSON de resultados")
+    parser.add_argument("--limpiar", action="store_true", help="Eliminar datos sembrados y salir")
+    asyncio.run(principal(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,302 @@
+"""
+Micro-benchmarks de las primitivas de seguridad, auditoría y renderizado.
+
+Mide cada primitiva de forma aislada con calentamiento, repeticiones y
+resumen estadístico, para saber qué capa se volvió más lenta cuando el
+benchmark de carga cambia:
+
+- `hashear_password` con distintos costos de bcrypt y `verificar_password`.
+- `crear_access_token` / `verificar_token`.
+- `generar_uuid_personalizado` y `user_initials`.
+- Renderizado de cada plantilla de `app/templates`.
+- `registrar_actividad` (INSERT de auditoría), solo con `--db`.
+
+Uso:
+    python -m scripts.benchmark_micro
+    python -m scripts.benchmark_micro --filtro plantilla --repeticiones 50
+    python -m scripts.benchmark_micro --base scripts/resultados/micro-....json --umbral 0.15
+
+Con `--base`, el proceso termina con código 1 si la mediana de alguna
+primitiva empeora más que `--umbral` (relativo) respecto a la base.
+"""
+
+import argparse
+import asyncio
+import inspect
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import bcrypt
+
+from scripts._benchmark_comun import (
+    cargar_resultados,
+    guardar_resultados,
+    ms,
+    resumir,
+    variacion,
+)
+
+# Duración mínima de cada muestra; las primitivas rápidas se repiten en lote
+DURACION_MINIMA_MUESTRA = 0.002
+
+COSTOS_BCRYPT = (4, 8, 10, 12)
+
+
+async def _medir(funcion, repeticiones: int, calentamiento: int) -> list[float]:
+    """
+    Retorna `repeticiones` muestras del tiempo por llamada (segundos).
+    Calibra un tamaño de lote para que cada muestra dure al menos
+    `DURACION_MINIMA_MUESTRA` y así reducir el ruido del reloj.
+    """
+    es_async = inspect.iscoroutinefunction(funcion)
+
+    async def lote(n: int) -> float:
+        inicio = time.perf_counter()
+        for _ in range(n):
+            if es_async:
+                await funcion()
+            else:
+                funcion()
+        return time.perf_counter() - inicio
+
+    for _ in range(calentamiento):
+        await lote(1)
+
+    tamano = 1
+    while (duracion := await lote(tamano)) < DURACION_MINIMA_MUESTRA and tamano < 1_000_000:
+        tamano *= 2 if duracion == 0 else max(2, int(DURACION_MINIMA_MUESTRA / duracion) + 1)
+
+    return [await lote(tamano) / tamano for _ in range(repeticiones)]
+
+
+def _primitivas_seguridad() -> dict:
+    from app.core.seguridad import (
+        _pre_hash_password,
+        crear_access_token,
+        hashear_password,
+        verificar_password,
+        verificar_token,
+    )
+
+    password = "contraseña-de-prueba"
+    pre_hash = _pre_hash_password(password)
+    hash_guardado = hashear_password(password)
+    token = crear_access_token({"sub": "benchmark"})
+
+    primitivas = {
+        f"bcrypt.hash costo={costo}": (
+            lambda costo=costo: bcrypt.hashpw(pre_hash, bcrypt.gensalt(costo))
+        )
+        for costo in COSTOS_BCRYPT
+    }
+    primitivas["hashear_password"] = lambda: hashear_password(password)
+    primitivas["verificar_password"] = lambda: verificar_password(password, hash_guardado)
+    primitivas["crear_access_token"] = lambda: crear_access_token({"sub": "benchmark"})
+    primitivas["verificar_token"] = lambda: verificar_token(token)
+    return primitivas
+
+
+def _primitivas_modelos() -> dict:
+    from types import SimpleNamespace
+
+    from app.core.templates import user_initials
+    from app.models import generar_uuid_personalizado
+
+    usuario = SimpleNamespace(nombres="José Luis", apellidos="Pérez Gómez", username="jose")
+    return {
+        "generar_uuid_personalizado": generar_uuid_personalizado,
+        "user_initials": lambda: user_initials(usuario),
+    }
+
+
+def _contexto_plantillas() -> dict:
+    """Contexto representativo con todas las variables que usan las plantillas."""
+    from starlette.requests import Request
+
+    import main
+    from app.models import LogActividad, PerfilDemografico, TipoAccion, Usuario
+
+    ahora = datetime.now()
+    usuarios = []
+    for i in range(50):
+        usuario = Usuario(
+            username=f"usuario_{i}",
+            email=f"usuario_{i}@example.com",
+            password="x" * 60,
+            nombres="María José",
+            apellidos="Núñez Díaz",
+            biografia="Biografía de prueba para el benchmark.",
+            creado_en=ahora,
+        )
+        usuario.perfil_demografico = PerfilDemografico(
+            usuario_id=usuario.id, ciudad="Montería", departamento="Córdoba"
+        )
+        usuarios.append(usuario)
+
+    logs = [
+        (
+            LogActividad(
+                id=i,
+                usuario_id=usuarios[i % 50].id,
+                tipo_accion=TipoAccion.Login,
+                descripcion="Inicio de sesión exitoso",
+                detalles={"username": usuarios[i % 50].username},
+                ip_address="127.0.0.1",
+                user_agent="benchmark",
+                creado_en=ahora,
+            ),
+            usuarios[i % 50],
+        )
+        for i in range(50)
+    ]
+
+    request = Request(
+        {
+            "type": "http",
+            "app": main.app,
+            "router": main.app.router,
+            "method": "GET",
+            "scheme": "http",
+            "server": ("benchmark", 80),
+            "path": "/",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"benchmark")],
+            "state": {"usuario_actual": usuarios[0]},
+        }
+    )
+
+    return {
+        "request": request,
+        "usuario": usuarios[0],
+        "usuarios": usuarios,
+        "logs": logs,
+        "log": logs[0][0],
+        "error": None,
+        "mensaje": None,
+        "q": "",
+        "tipos": [t.value for t in TipoAccion],
+        "filtros": {"tipo": "", "estado": "", "detalles": []},
+        "filtrado": False,
+        "actividad": [log for log, _ in logs[:20]],
+        "cursor_siguiente": "cursor",
+        "paginado": False,
+        "en_linea": 3,
+        "tipos_seleccionados": [],
+        "consulta_tipos": "",
+        "resumen": {
+            "ventanas": {
+                ventana: [
+                    {"tipo_accion": t.value, "exitosos": 12, "fallidos": 3} for t in TipoAccion
+                ]
+                for ventana in ("minuto", "hora", "dia")
+            },
+            "todos_los_workers": True,
+            "generado_en": 0,
+        },
+        "nombres": "",
+        "apellidos": "",
+        "username": "",
+        "email": "",
+    }
+
+
+def _primitivas_plantillas() -> dict:
+    from app.core.templates import templates
+
+    contexto = _contexto_plantillas()
+    primitivas = {}
+    for nombre in templates.env.list_templates(extensions=["html"]):
+        plantilla = templates.env.get_template(nombre)
+        primitivas[f"plantilla {nombre}"] = (
+            lambda plantilla=plantilla: plantilla.render(contexto)
+        )
+    return primitivas
+
+
+def _primitivas_db() -> dict:
+    from app.core.auditoria import registrar_actividad
+    from app.core.database import async_session_maker
+    from app.models import TipoAccion
+
+    async def insertar_log():
+        async with async_session_maker() as session:
+            await registrar_actividad(
+                session=session,
+                tipo_accion=TipoAccion.ErrorSistema,
+                descripcion="Evento de benchmark",
+                exitoso=False,
+                detalles={"origen": "benchmark_micro"},
+            )
+
+    return {"registrar_actividad": insertar_log}
+
+
+async def principal(args) -> int:
+    primitivas = {
+        **_primitivas_seguridad(),
+        **_primitivas_modelos(),
+        **_primitivas_plantillas(),
+    }
+    if args.db:
+        primitivas.update(_primitivas_db())
+    if args.filtro:
+        primitivas = {k: v for k, v in primitivas.items() if args.filtro in k}
+
+    base = cargar_resultados(args.base)["primitivas"] if args.base else {}
+    resultados = {}
+    regresiones = []
+
+    print(f"{'Primitiva':52} {'mediana ms':>10} {'p95 ms':>9} {'desv ms':>9}  vs base")
+    for nombre, funcion in primitivas.items():
+        # bcrypt con costo alto es lento: menos repeticiones
+        repeticiones = min(args.repeticiones, 10) if "costo=12" in nombre else args.repeticiones
+        resumen = resumir(await _medir(funcion, repeticiones, args.calentamiento))
+        resultados[nombre] = resumen
+
+        comparacion = ""
+        if nombre in base:
+            delta = variacion(resumen["p50"], base[nombre]["p50"])
+            if delta is not None:
+                comparacion = f"{delta:+.1%}"
+                if delta > args.umbral:
+                    regresiones.append((nombre, delta))
+                    comparacion += "  ⚠️ REGRESIÓN"
+        print(
+            f"{nombre:52} {ms(resumen['p50']):>10} {ms(resumen['p95'])} "
+            f"{ms(resumen['desviacion'])}  {comparacion}"
+        )
+
+    destino = guardar_resultados(
+        "micro",
+        {"primitivas": resultados},
+        Path(args.salida) if args.salida else None,
+    )
+    print(f"\n📄 Resultados guardados en {destino}")
+
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} primitiva(s) empeoraron más de {args.umbral:.0%}:")
+        for nombre, delta in regresiones:
+            print(f"   - {nombre}: {delta:+.1%}")
+        return 1
+    return 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de VOCES")
+    parser.add_argument("--repeticiones", type=int, default=30, help="Muestras por primitiva")
+    parser.add_argument("--calentamiento", type=int, default=3, help="Llamadas de calentamiento")
+    parser.add_argument("--filtro", help="Solo primitivas cuyo nombre contenga este texto")
+    parser.add_argument("--db", action="store_true", help="Incluir primitivas que usan la DB")
+    parser.add_argument("--base", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument(
+        "--umbral", type=float, default=0.15, help="Regresión máxima tolerada (0.15 = 15%%)"
+    )
+    parser.add_argument("--salida", help="Ruta del JSON de resultados")
+    sys.exit(asyncio.run(principal(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main_cli()
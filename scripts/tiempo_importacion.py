@@ -0,0 +1,105 @@
+"""
+Mide el tiempo de importación de la aplicación y lo compara con un presupuesto.
+
+Ejecuta `python -X importtime -c "import main"` en un proceso limpio (sin
+caché de módulos del proceso actual), repite varias veces y toma la
+mediana. Muestra los módulos más costosos para saber qué optimizar.
+
+Uso:
+    python -m scripts.tiempo_importacion
+    python -m scripts.tiempo_importacion --presupuesto-ms 1200 --top 20
+
+Termina con código 1 si la mediana supera el presupuesto.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from scripts._benchmark_comun import guardar_resultados
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Presupuesto por defecto del tiempo de importación de `main` (milisegundos)
+PRESUPUESTO_MS = float(os.getenv("PRESUPUESTO_IMPORTACION_MS", "1500"))
+
+_LINEA = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir_una_vez(modulo: str) -> dict[str, tuple[int, int]]:
+    """
+    Importa `modulo` en un proceso nuevo y retorna, por módulo importado,
+    (tiempo propio, tiempo acumulado) en microsegundos.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    tiempos = {}
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if coincidencia:
+            propio, acumulado, _, nombre = coincidencia.groups()
+            tiempos[nombre] = (int(propio), int(acumulado))
+    return tiempos
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación")
+    parser.add_argument("--modulo", default="main", help="Módulo a importar")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float, default=PRESUPUESTO_MS)
+    parser.add_argument("--top", type=int, default=15, help="Módulos más costosos a mostrar")
+    parser.add_argument("--salida", help="Ruta del JSON de resultados")
+    args = parser.parse_args()
+
+    mediciones = [medir_una_vez(args.modulo) for _ in range(args.repeticiones)]
+    totales_ms = [m[args.modulo][1] / 1000 for m in mediciones]
+    mediana_ms = statistics.median(totales_ms)
+
+    # Módulos ordenados por tiempo acumulado (mediana entre repeticiones)
+    nombres = set().union(*mediciones)
+    acumulados = {
+        nombre: statistics.median(m[nombre][1] for m in mediciones if nombre in m) / 1000
+        for nombre in nombres
+    }
+    propios = {
+        nombre: statistics.median(m[nombre][0] for m in mediciones if nombre in m) / 1000
+        for nombre in nombres
+    }
+
+    print(f"{'Módulo':50} {'propio ms':>10} {'acumulado ms':>13}")
+    for nombre in sorted(nombres, key=acumulados.get, reverse=True)[: args.top]:
+        print(f"{nombre:50} {propios[nombre]:10.1f} {acumulados[nombre]:13.1f}")
+
+    destino = guardar_resultados(
+        "importacion",
+        {
+            "modulo": args.modulo,
+            "mediana_ms": mediana_ms,
+            "muestras_ms": totales_ms,
+            "presupuesto_ms": args.presupuesto_ms,
+            "modulos_ms": {n: acumulados[n] for n in nombres if n.startswith("app")},
+        },
+        Path(args.salida) if args.salida else None,
+    )
+    print(f"\n📄 Resultados guardados en {destino}")
+
+    print(f"\nImportar {args.modulo}: {mediana_ms:.0f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+    if mediana_ms > args.presupuesto_ms:
+        print("❌ Se superó el presupuesto de importación")
+        sys.exit(1)
+    print("✅ Dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main_cli()
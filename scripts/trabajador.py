@@ -0,0 +1,80 @@
+"""
+Ejecuta la cola de trabajos en un proceso aparte del servidor web.
+
+Útil para escalar los trabajos por separado o para que las peticiones no
+compartan CPU con ellos: se arranca el servidor con `TRABAJOS_EN_PROCESO=0`
+y uno o más procesos con este script. Varios trabajadores pueden correr a
+la vez: se reparten los trabajos con `FOR UPDATE SKIP LOCKED` y los
+periódicos no se duplican.
+
+Uso:
+    python -m scripts.trabajador
+    python -m scripts.trabajador --concurrencia 50 --sin-programador
+
+Se detiene con Ctrl+C o SIGTERM, devolviendo a la cola el lote en curso.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core import trabajos
+from app.core.database import init_db
+from app.core.invalidacion import tarea_escucha
+
+
+async def ejecutar(programador: bool) -> None:
+    await init_db()
+    trabajos.cargar_manejadores()
+    print(f"✅ Trabajador iniciado ({len(trabajos._manejadores)} tipos de trabajo)")
+
+    tareas = [
+        # Recibe los avisos de trabajos nuevos sin esperar al sondeo
+        asyncio.create_task(tarea_escucha()),
+        asyncio.create_task(trabajos.tarea_trabajos()),
+    ]
+    if programador:
+        tareas.append(asyncio.create_task(trabajos.tarea_programador()))
+
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, detener.set)
+    await detener.wait()
+
+    print("⏹️ Deteniendo trabajador...")
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Trabajador de la cola de trabajos de VOCES")
+    parser.add_argument(
+        "--concurrencia",
+        type=int,
+        default=trabajos.CONCURRENCIA,
+        help="Trabajos ejecutándose a la vez (TRABAJOS_CONCURRENCIA)",
+    )
+    parser.add_argument(
+        "--lote",
+        type=int,
+        default=trabajos.TAMANO_LOTE,
+        help="Máximo de trabajos reclamados por consulta (TRABAJOS_TAMANO_LOTE)",
+    )
+    parser.add_argument(
+        "--sin-programador",
+        action="store_true",
+        help="No encolar trabajos periódicos (si ya los encola otro proceso)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    trabajos.CONCURRENCIA = args.concurrencia
+    trabajos.TAMANO_LOTE = args.lote
+    asyncio.run(ejecutar(programador=not args.sin_programador))
+
+
+if __name__ == "__main__":
+    main_cli()
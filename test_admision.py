@@ -0,0 +1,147 @@
+"""
+Pruebas del control de admisión por clase de ruta.
+"""
+
+import asyncio
+import json
+
+from app.core import admision, metricas
+from app.core.admision import Limitador, clasificar
+
+
+def test_clasificar_rutas():
+    assert clasificar("GET", "/static/css/app.css") == "estatico"
+    assert clasificar("GET", "/usuarios") == "lectura"
+    assert clasificar("GET", "/auth/login") == "lectura"
+    assert clasificar("POST", "/auth/login") == "auth"
+    assert clasificar("POST", "/usuarios/ana/eliminar") == "escritura"
+    assert clasificar("GET", "/metrics") is None
+
+
+def test_admite_hasta_el_limite_y_entrega_en_orden():
+    async def escenario():
+        limitador = Limitador("prueba_orden", limite=1, cola=5, espera=1.0)
+        assert await limitador.adquirir()
+        orden = []
+
+        async def pedir(nombre):
+            assert await limitador.adquirir()
+            orden.append(nombre)
+
+        tareas = [asyncio.ensure_future(pedir(n)) for n in ("a", "b")]
+        await asyncio.sleep(0)
+        assert limitador.en_cola == 2 and limitador.en_curso == 1
+
+        limitador.liberar()
+        await asyncio.sleep(0.01)
+        assert orden == ["a"] and limitador.en_curso == 1
+        # Una petición nueva no se adelanta a la que espera
+        nueva = asyncio.ensure_future(pedir("c"))
+        await asyncio.sleep(0.01)
+        assert limitador.en_cola == 2
+
+        limitador.liberar()
+        limitador.liberar()
+        await asyncio.gather(*tareas, nueva)
+        assert orden == ["a", "b", "c"]
+        limitador.liberar()
+        assert limitador.en_curso == 0 and limitador.en_cola == 0
+
+    asyncio.run(escenario())
+
+
+def test_rechaza_con_cola_llena_o_plazo_vencido():
+    async def escenario():
+        limitador = Limitador("prueba_rechazo", limite=1, cola=1, espera=0.05)
+        assert await limitador.adquirir()
+        esperando = asyncio.ensure_future(limitador.adquirir())
+        await asyncio.sleep(0)
+        assert not await limitador.adquirir()  # cola llena
+        assert not await esperando  # plazo vencido
+        assert limitador.en_cola == 0 and limitador.en_curso == 1
+        limitador.liberar()
+        assert limitador.en_curso == 0
+
+    asyncio.run(escenario())
+    rechazadas = metricas.peticiones_rechazadas_total
+    assert rechazadas.valor(clase="prueba_rechazo", motivo="cola_llena") == 1
+    assert rechazadas.valor(clase="prueba_rechazo", motivo="plazo") == 1
+
+
+def test_cancelar_en_cola_no_pierde_cupos():
+    async def escenario():
+        limitador = Limitador("prueba_cancelar", limite=1, cola=5, espera=1.0)
+        assert await limitador.adquirir()
+        cancelada = asyncio.ensure_future(limitador.adquirir())
+        await asyncio.sleep(0)
+        cancelada.cancel()
+        await asyncio.gather(cancelada, return_exceptions=True)
+        assert limitador.en_cola == 0
+
+        # Cupo entregado justo cuando la petición se cancela: se devuelve
+        entregada = asyncio.ensure_future(limitador.adquirir())
+        await asyncio.sleep(0)
+        limitador.liberar()
+        entregada.cancel()
+        await asyncio.gather(entregada, return_exceptions=True)
+        assert limitador.en_curso == 0 and limitador.en_cola == 0
+
+    asyncio.run(escenario())
+
+
+def test_respuesta_rechazo():
+    api = admision.respuesta_rechazo("/api/usuarios/perfiles")
+    assert api.status_code == 503
+    assert api.headers["Retry-After"] == str(admision.REINTENTAR_EN)
+    assert json.loads(api.body)["detail"] == admision.MENSAJE_RECHAZO
+
+    pagina = admision.respuesta_rechazo("/usuarios")
+    assert pagina.status_code == 503
+    assert pagina.headers["content-type"].startswith("text/html")
+    assert "Retry-After" in pagina.headers
+
+
+def test_middleware_retiene_el_cupo_hasta_enviar_el_cuerpo(monkeypatch):
+    limitador = Limitador("lectura", limite=1, cola=0, espera=0)
+    monkeypatch.setitem(admision.limitadores, "lectura", limitador)
+    ocupado_al_enviar = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for parte in (b"<html>", b"</html>"):
+            await send({"type": "http.response.body", "body": parte, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.body":
+            ocupado_al_enviar.append(limitador.en_curso)
+
+    async def escenario():
+        middleware = admision.ControlAdmision(app)
+        scope = {"type": "http", "method": "GET", "path": "/usuarios/"}
+        await middleware(scope, None, enviar)
+        assert ocupado_al_enviar == [1, 1, 1]
+        assert limitador.en_curso == 0
+
+        # Sin cupo: 503 sin llegar a la aplicación
+        assert await limitador.adquirir()
+        mensajes = []
+
+        async def recoger(mensaje):
+            mensajes.append(mensaje)
+
+        await middleware(scope, None, recoger)
+        assert mensajes[0]["status"] == 503
+        assert (b"retry-after", str(admision.REINTENTAR_EN).encode()) in mensajes[0]["headers"]
+        limitador.liberar()
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_clasificar_rutas()
+    test_admite_hasta_el_limite_y_entrega_en_orden()
+    test_rechaza_con_cola_llena_o_plazo_vencido()
+    test_cancelar_en_cola_no_pierde_cupos()
+    test_respuesta_rechazo()
+    print("✓ Pruebas de control de admisión ejecutadas correctamente")
@@ -0,0 +1,111 @@
+"""
+Pruebas de los filtros estructurados y del historial por usuario de la auditoría.
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from app.core.auditoria import (
+    codificar_cursor,
+    decodificar_cursor,
+    filtrar_por_detalles,
+    obtener_actividad_usuario,
+    parsear_filtro_detalle,
+)
+from app.core.database import SENTENCIAS_DDL
+from app.models import FilaLog, LogActividad, TipoAccion
+
+
+def test_parsear_filtro_detalle():
+    assert parsear_filtro_detalle("email:ana@example.com") == {"email": "ana@example.com"}
+    # Solo el primer ":" separa clave y valor
+    assert parsear_filtro_detalle("user_agent:Mozilla/5.0 (X11: Linux)") == {
+        "user_agent": "Mozilla/5.0 (X11: Linux)"
+    }
+    assert parsear_filtro_detalle("origen.ip: 10.0.0.1 ") == {"origen": {"ip": "10.0.0.1"}}
+    # Escalares JSON con su tipo; entre comillas, texto
+    assert parsear_filtro_detalle("intentos:5") == {"intentos": 5}
+    assert parsear_filtro_detalle("exitoso:true") == {"exitoso": True}
+    assert parsear_filtro_detalle("ventana:1.5") == {"ventana": 1.5}
+    assert parsear_filtro_detalle('codigo:"5"') == {"codigo": "5"}
+    assert parsear_filtro_detalle("lista:[1]") == {"lista": "[1]"}
+    assert parsear_filtro_detalle("valor:NaN") == {"valor": "NaN"}
+    for invalido in ("sin-separador", ":valor", "clave:", "a..b:valor"):
+        assert parsear_filtro_detalle(invalido) is None
+
+
+def test_filtro_usa_contencion_jsonb():
+    statement = filtrar_por_detalles(
+        select(LogActividad.id), [{"email": "ana@example.com"}, {"username": "ana"}]
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.count("logactividad.detalles @>") == 2
+    assert "::JSONB" in sql
+
+
+def test_cursor_ida_y_vuelta():
+    fecha = datetime(2025, 3, 1, 12, 30, 5, 123456)
+    cursor = codificar_cursor(fecha, 42)
+    assert "=" not in cursor and "|" not in cursor
+    assert decodificar_cursor(cursor) == (fecha, 42)
+    for invalido in ("", "no-es-un-cursor", codificar_cursor(fecha, 1)[:-3]):
+        assert decodificar_cursor(invalido) is None
+
+
+class _SesionFalsa:
+    """Captura la consulta y devuelve filas simuladas."""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        filas = self.filas
+
+        class _Resultado:
+            def __iter__(self):
+                return iter(filas)
+
+        return _Resultado()
+
+
+def test_actividad_usuario_pagina_por_cursor():
+    fecha = datetime(2025, 3, 1, 12, 0)
+    filas = [(10 - i, TipoAccion.Login, "x", True, fecha) for i in range(3)]
+    session = _SesionFalsa(filas)
+
+    pagina, siguiente = asyncio.run(
+        obtener_actividad_usuario(
+            session, "u1", limite=2, tipos=[TipoAccion.Login], cursor=(fecha, 11)
+        )
+    )
+    assert pagina == [FilaLog(10, TipoAccion.Login, "x", True, fecha), FilaLog(9, TipoAccion.Login, "x", True, fecha)]
+    assert decodificar_cursor(siguiente) == (fecha, 9)
+
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "(logactividad.creado_en, logactividad.id) <" in sql
+    assert "ORDER BY logactividad.creado_en DESC, logactividad.id DESC" in sql
+    # Solo columnas del índice cubriente
+    assert "detalles" not in sql and "user_agent" not in sql
+
+    # Última página: sin cursor siguiente
+    pagina, siguiente = asyncio.run(obtener_actividad_usuario(_SesionFalsa(filas[:1]), "u1"))
+    assert len(pagina) == 1 and siguiente is None
+
+
+def test_indice_cubriente_del_historial():
+    ddl = " ".join(" ".join(SENTENCIAS_DDL).split())
+    assert "ON logactividad (usuario_id, creado_en DESC, id DESC) INCLUDE" in ddl
+
+
+if __name__ == "__main__":
+    test_parsear_filtro_detalle()
+    test_filtro_usa_contencion_jsonb()
+    test_cursor_ida_y_vuelta()
+    test_actividad_usuario_pagina_por_cursor()
+    test_indice_cubriente_del_historial()
+    print("✓ Pruebas de auditoría ejecutadas correctamente")
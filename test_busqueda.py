@@ -0,0 +1,43 @@
+"""
+Pruebas unitarias para la normalización de términos de búsqueda de usuarios.
+"""
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from app.core.busqueda import filtrar_por_termino, normalizar_texto, _escapar_like
+from app.models import Usuario
+
+
+def test_normalizar_quita_tildes_y_mayusculas():
+    assert normalizar_texto("José PÉREZ") == "jose perez"
+    assert normalizar_texto("Núñez") == "nunez"
+
+
+def test_normalizar_espacios_redundantes():
+    assert normalizar_texto("  maria   del  mar ") == "maria del mar"
+
+
+def test_normalizar_vacio():
+    assert normalizar_texto(None) == ""
+    assert normalizar_texto("   ") == ""
+
+
+def test_escapar_comodines_like():
+    assert _escapar_like("50%_off!") == "50!%!_off!!"
+
+
+def test_prefijo_corto_busca_en_cada_campo():
+    sql = str(filtrar_por_termino(select(Usuario.id), "an").compile(dialect=postgresql.dialect()))
+    for campo in ("username", "nombres", "apellidos"):
+        assert f"voces_normalizar(usuario.{campo}) LIKE" in sql
+    assert "voces_texto_busqueda" not in sql
+
+
+if __name__ == "__main__":
+    test_normalizar_quita_tildes_y_mayusculas()
+    test_normalizar_espacios_redundantes()
+    test_normalizar_vacio()
+    test_escapar_comodines_like()
+    test_prefijo_corto_busca_en_cada_campo()
+    print("✓ Pruebas de búsqueda ejecutadas correctamente")
@@ -0,0 +1,33 @@
+"""
+Pruebas unitarias para la detección de cambios en la edición de perfil.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.core.cambios import calcular_cambios
+from app.models.enums import Sexo
+
+
+def test_sin_cambios():
+    actual = SimpleNamespace(
+        ciudad="Montería", sexo=Sexo.Femenino, fecha_nacimiento=datetime(1990, 5, 1)
+    )
+    nuevos = {
+        "ciudad": "Montería",
+        "sexo": Sexo("F"),
+        "fecha_nacimiento": datetime.strptime("1990-05-01", "%Y-%m-%d"),
+    }
+    assert calcular_cambios(actual, nuevos) == {}
+
+
+def test_solo_campos_modificados():
+    actual = SimpleNamespace(nombres="Juan", apellidos="Pérez", biografia=None)
+    nuevos = {"nombres": "Juan", "apellidos": "Gómez", "biografia": None}
+    assert calcular_cambios(actual, nuevos) == {"apellidos": "Gómez"}
+
+
+if __name__ == "__main__":
+    test_sin_cambios()
+    test_solo_campos_modificados()
+    print("✓ Pruebas de detección de cambios ejecutadas correctamente")
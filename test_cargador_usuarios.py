@@ -0,0 +1,76 @@
+"""
+Pruebas de la carga por lotes de perfiles públicos.
+"""
+
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.cargador_usuarios import CargadorUsuarios, obtener_cargador
+
+PERFILES = {
+    "U1": ("U1", "ana", "Ana", "Díaz", None),
+    "U2": ("U2", "juan", "Juan", "Pérez", "/static/juan.png"),
+    "U3": ("U3", "luz", "Luz", "Mora", None),
+}
+
+
+class _SesionFalsa:
+    """Responde con los perfiles cuyo id o username está en los parámetros."""
+
+    def __init__(self):
+        self.info = {}
+        self.sentencias = []
+
+    async def execute(self, statement):
+        self.sentencias.append(statement)
+        parametros = statement.compile().params
+        ids = set(parametros.get("ids") or [])
+        usernames = set(parametros.get("usernames") or [])
+        await asyncio.sleep(0)
+        return [p for p in PERFILES.values() if p[0] in ids or p[1] in usernames]
+
+
+def test_busquedas_del_mismo_ciclo_usan_una_consulta():
+    async def escenario():
+        session = _SesionFalsa()
+        cargador = obtener_cargador(session)
+        assert obtener_cargador(session) is cargador
+
+        resultados = await asyncio.gather(
+            cargador.por_id("U1"),
+            cargador.por_id("U2"),
+            cargador.por_username("luz"),
+            cargador.por_id("U1"),
+            cargador.por_id("NOEXISTE"),
+        )
+        assert [r.username if r else None for r in resultados] == ["ana", "juan", "luz", "ana", None]
+        assert cargador.consultas == 1
+
+        sql = str(session.sentencias[0].compile(dialect=postgresql.dialect()))
+        assert "usuario.id = ANY (%(ids)s::VARCHAR[])" in sql
+        assert "usuario.username = ANY (%(usernames)s::VARCHAR[])" in sql
+        assert "password" not in sql
+
+        # Lo ya cargado (por id o por username) sale de la caché
+        assert (await cargador.por_username("ana")).id == "U1"
+        assert await cargador.por_id("NOEXISTE") is None
+        assert cargador.consultas == 1
+
+    asyncio.run(escenario())
+
+
+def test_muchos_conserva_el_orden():
+    async def escenario():
+        cargador = CargadorUsuarios(_SesionFalsa())
+        perfiles = await cargador.muchos(ids=["U3", "X"], usernames=["ana"])
+        assert [p.id if p else None for p in perfiles] == ["U3", None, "U1"]
+        assert cargador.consultas == 1
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_busquedas_del_mismo_ciclo_usan_una_consulta()
+    test_muchos_conserva_el_orden()
+    print("✓ Pruebas del cargador de usuarios ejecutadas correctamente")
@@ -0,0 +1,88 @@
+"""
+Pruebas de los contadores de actividad en memoria.
+"""
+
+import asyncio
+
+from app.core import contadores_actividad
+from app.core.contadores_actividad import ContadoresActividad, resumen_actividad
+from app.models import TipoAccion
+
+# Inicio de un minuto cualquiera (en segundos)
+BASE = 29_000_000 * 60
+
+
+def test_sumar_por_ventana():
+    contadores = ContadoresActividad(cubetas=60)
+    contadores.registrar(TipoAccion.Login, True, ahora=BASE)
+    contadores.registrar(TipoAccion.Login, True, ahora=BASE + 30)
+    contadores.registrar(TipoAccion.IntentoLoginFallido, False, cantidad=5, ahora=BASE + 60)
+
+    minuto = BASE // 60
+    assert contadores.sumar(minuto, minuto) == {("Login", True): 2}
+    assert contadores.sumar(minuto, minuto + 1) == {
+        ("Login", True): 2,
+        ("IntentoLoginFallido", False): 5,
+    }
+
+
+def test_buffer_circular_descarta_minutos_viejos():
+    contadores = ContadoresActividad(cubetas=60)
+    contadores.registrar(TipoAccion.Login, True, ahora=BASE)
+    # 60 minutos después se reutiliza la misma cubeta
+    contadores.registrar(TipoAccion.Logout, True, ahora=BASE + 60 * 60)
+
+    minuto = BASE // 60
+    assert contadores.sumar(minuto, minuto) == {}
+    assert contadores.sumar(minuto + 60, minuto + 60) == {("Logout", True): 1}
+    # La ventana nunca abarca más cubetas de las que hay
+    assert contadores.sumar(minuto - 100, minuto + 60) == {("Logout", True): 1}
+
+
+def test_tomar_modificados():
+    contadores = ContadoresActividad(cubetas=60)
+    contadores.registrar(TipoAccion.Login, True, ahora=BASE)
+    modificados = contadores.tomar_modificados()
+    assert modificados == {BASE // 60: {("Login", True): 1}}
+    assert contadores.tomar_modificados() == {}
+
+    # Un volcado fallido devuelve las cubetas para reintentarlas
+    contadores.devolver_modificados(modificados)
+    assert contadores.tomar_modificados() == modificados
+
+
+def test_resumen_sin_sesion_usa_el_worker_actual():
+    original = contadores_actividad.contadores
+    contadores_actividad.contadores = ContadoresActividad()
+    try:
+        contadores_actividad.contadores.registrar(
+            TipoAccion.IntentoLoginFallido, False, cantidad=4, ahora=BASE
+        )
+        contadores_actividad.contadores.registrar(TipoAccion.Login, True, ahora=BASE + 60)
+        contadores_actividad.contadores.registrar(TipoAccion.Logout, True, ahora=BASE - 3 * 3600)
+
+        # A mitad del minuto siguiente: el anterior cuenta la mitad
+        resumen = asyncio.run(resumen_actividad(ahora=BASE + 90))
+    finally:
+        contadores_actividad.contadores = original
+
+    ventanas = resumen["ventanas"]
+    assert resumen["todos_los_workers"] is False
+    assert ventanas["minuto"] == [
+        {"tipo_accion": "IntentoLoginFallido", "exitosos": 0, "fallidos": 2.0},
+        {"tipo_accion": "Login", "exitosos": 1, "fallidos": 0},
+    ]
+    assert [fila["tipo_accion"] for fila in ventanas["hora"]] == ["IntentoLoginFallido", "Login"]
+    assert [fila["tipo_accion"] for fila in ventanas["dia"]] == [
+        "IntentoLoginFallido",
+        "Login",
+        "Logout",
+    ]
+
+
+if __name__ == "__main__":
+    test_sumar_por_ventana()
+    test_buffer_circular_descarta_minutos_viejos()
+    test_tomar_modificados()
+    test_resumen_sin_sesion_usa_el_worker_actual()
+    print("✓ Pruebas de contadores de actividad ejecutadas correctamente")
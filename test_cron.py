@@ -0,0 +1,48 @@
+"""
+Pruebas de las expresiones cron de los trabajos periódicos.
+"""
+
+from datetime import datetime
+
+from app.core.cron import Cron
+
+
+def test_siguiente_ejecucion():
+    desde = datetime(2025, 3, 1, 12, 3, 30)  # sábado
+    assert Cron("*/5 * * * *").siguiente(desde) == datetime(2025, 3, 1, 12, 5)
+    assert Cron("0 * * * *").siguiente(desde) == datetime(2025, 3, 1, 13, 0)
+    assert Cron("0 3 * * 0").siguiente(desde) == datetime(2025, 3, 2, 3, 0)
+    assert Cron("0 3 * * 7").siguiente(desde) == datetime(2025, 3, 2, 3, 0)
+    assert Cron("15 8-18/2 * * 1-5").siguiente(desde) == datetime(2025, 3, 3, 8, 15)
+    # Cambio de año y 29 de febrero
+    assert Cron("0 0 1 1 *").siguiente(desde) == datetime(2026, 1, 1, 0, 0)
+    assert Cron("0 0 29 2 *").siguiente(desde) == datetime(2028, 2, 29, 0, 0)
+
+
+def test_siguiente_es_estrictamente_posterior():
+    momento = datetime(2025, 3, 1, 12, 5)
+    assert Cron("*/5 * * * *").siguiente(momento) == datetime(2025, 3, 1, 12, 10)
+
+
+def test_dia_del_mes_o_de_la_semana():
+    # Con ambos restringidos basta con que coincida uno (1 de marzo es sábado)
+    cron = Cron("0 0 1 * 1")
+    assert cron.siguiente(datetime(2025, 2, 28, 12, 0)) == datetime(2025, 3, 1, 0, 0)
+    assert cron.siguiente(datetime(2025, 3, 1, 12, 0)) == datetime(2025, 3, 3, 0, 0)
+
+
+def test_expresiones_invalidas():
+    for invalida in ("* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "a * * * *", "5-1 * * * *"):
+        try:
+            Cron(invalida)
+        except ValueError:
+            continue
+        raise AssertionError(f"Se aceptó {invalida!r}")
+
+
+if __name__ == "__main__":
+    test_siguiente_ejecucion()
+    test_siguiente_es_estrictamente_posterior()
+    test_dia_del_mes_o_de_la_semana()
+    test_expresiones_invalidas()
+    print("✓ Pruebas de expresiones cron ejecutadas correctamente")
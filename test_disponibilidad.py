@@ -0,0 +1,75 @@
+"""
+Pruebas unitarias para el filtro de Bloom usado en la disponibilidad de usuarios.
+"""
+
+import asyncio
+
+from app.core import disponibilidad
+from app.core.disponibilidad import FiltroBloomContador, normalizar_email
+
+
+def test_sin_falsos_negativos():
+    filtro = FiltroBloomContador(capacidad=1000)
+    valores = [f"usuario_{i}" for i in range(1000)]
+    for valor in valores:
+        filtro.agregar(valor)
+    assert all(valor in filtro for valor in valores)
+
+
+def test_tasa_falsos_positivos_acotada():
+    filtro = FiltroBloomContador(capacidad=1000, tasa_falsos_positivos=0.01)
+    for i in range(1000):
+        filtro.agregar(f"usuario_{i}")
+    falsos = sum(f"otro_{i}" in filtro for i in range(10_000))
+    assert falsos / 10_000 < 0.03, f"Tasa de falsos positivos demasiado alta: {falsos}"
+
+
+def test_quitar_elemento():
+    filtro = FiltroBloomContador(capacidad=100)
+    filtro.agregar("juan")
+    filtro.agregar("maria")
+    filtro.quitar("juan")
+    assert "juan" not in filtro
+    assert "maria" in filtro
+    assert filtro.total == 1
+
+
+class _SesionSinFilas:
+    """Sesión que registra las consultas y no encuentra ninguna fila."""
+
+    def __init__(self):
+        self.consultas = []
+
+    async def execute(self, statement):
+        self.consultas.append(str(statement))
+
+        class _Resultado:
+            def first(self):
+                return None
+
+        return _Resultado()
+
+
+def test_email_sin_distinguir_mayusculas(monkeypatch):
+    filtros = disponibilidad._FiltrosDisponibilidad()
+    filtros.listo = True
+    monkeypatch.setattr(disponibilidad, "_filtros", filtros)
+    assert normalizar_email("  Ana@X.com ") == "ana@x.com"
+
+    disponibilidad.registrar_alta("ana", "ana@x.com")
+    session = _SesionSinFilas()
+    resultado = asyncio.run(disponibilidad.verificar_disponibilidad(session, email="Ana@X.com"))
+    # El filtro reconoce el email y la confirmación compara con lower(email)
+    assert len(session.consultas) == 1
+    assert "lower(usuario.email)" in session.consultas[0]
+    assert resultado["email"]["valor"] == "Ana@X.com"
+
+    disponibilidad.registrar_baja("ana", "ANA@x.com")
+    assert "ana@x.com" not in filtros.emails
+
+
+if __name__ == "__main__":
+    test_sin_falsos_negativos()
+    test_tasa_falsos_positivos_acotada()
+    test_quitar_elemento()
+    print("✓ Pruebas de disponibilidad ejecutadas correctamente")
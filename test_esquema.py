@@ -0,0 +1,34 @@
+"""
+Pruebas de la huella de esquema usada para omitir el DDL al arrancar.
+"""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+from app.core.esquema import calcular_huella
+
+
+def _metadata(con_columna_extra: bool = False) -> MetaData:
+    metadata = MetaData()
+    columnas = [Column("id", Integer, primary_key=True), Column("nombre", String(50), index=True)]
+    if con_columna_extra:
+        columnas.append(Column("email", String(100)))
+    Table("prueba", metadata, *columnas)
+    return metadata
+
+
+def test_huella_estable():
+    assert calcular_huella(_metadata(), ["SELECT 1"]) == calcular_huella(_metadata(), ["SELECT 1"])
+    # Los espacios en blanco no alteran la huella
+    assert calcular_huella(_metadata(), ["SELECT 1"]) == calcular_huella(_metadata(), ["  SELECT\n 1 "])
+
+
+def test_huella_cambia_con_el_esquema():
+    base = calcular_huella(_metadata(), ["SELECT 1"])
+    assert calcular_huella(_metadata(con_columna_extra=True), ["SELECT 1"]) != base
+    assert calcular_huella(_metadata(), ["SELECT 1", "SELECT 2"]) != base
+
+
+if __name__ == "__main__":
+    test_huella_estable()
+    test_huella_cambia_con_el_esquema()
+    print("✓ Pruebas de huella de esquema ejecutadas correctamente")
@@ -0,0 +1,82 @@
+"""
+Pruebas de la propagación de `actualizado_en` desde PerfilDemografico a Usuario.
+
+Usa SQLite en memoria solo con las tablas involucradas.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models import Usuario, PerfilDemografico
+
+
+def _crear_engine():
+    engine = create_engine("sqlite://")
+    Usuario.metadata.create_all(
+        engine, tables=[Usuario.__table__, PerfilDemografico.__table__]
+    )
+    return engine
+
+
+def _capturar_sentencias(engine) -> list[str]:
+    sentencias = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement.split()[0].upper())
+
+    return sentencias
+
+
+def _crear_usuario(session: Session) -> Usuario:
+    usuario = Usuario(
+        username="juan",
+        email="juan@example.com",
+        password="x" * 60,
+        nombres="Juan",
+        apellidos="Pérez",
+        actualizado_en=datetime(2000, 1, 1),
+    )
+    session.add(usuario)
+    session.add(PerfilDemografico(usuario_id=usuario.id))
+    session.commit()
+    return usuario
+
+
+def test_actualizar_perfil_emite_un_solo_update_de_usuario():
+    engine = _crear_engine()
+    with Session(engine, expire_on_commit=False) as session:
+        usuario = _crear_usuario(session)
+        perfil = session.query(PerfilDemografico).one()
+
+        sentencias = _capturar_sentencias(engine)
+        perfil.ciudad = "Montería"
+        session.commit()
+
+        # Un UPDATE del perfil y uno del usuario, sin SELECT de la relación
+        assert sentencias.count("UPDATE") == 2
+        assert "SELECT" not in sentencias
+
+        session.refresh(usuario)
+        assert usuario.actualizado_en > datetime(2000, 1, 1)
+
+
+def test_perfil_sin_cambios_no_actualiza_usuario():
+    engine = _crear_engine()
+    with Session(engine, expire_on_commit=False) as session:
+        _crear_usuario(session)
+        perfil = session.query(PerfilDemografico).one()
+
+        sentencias = _capturar_sentencias(engine)
+        perfil.ciudad = perfil.ciudad
+        session.commit()
+
+        assert "UPDATE" not in sentencias
+
+
+if __name__ == "__main__":
+    test_actualizar_perfil_emite_un_solo_update_de_usuario()
+    test_perfil_sin_cambios_no_actualiza_usuario()
+    print("✓ Pruebas de eventos ejecutadas correctamente")
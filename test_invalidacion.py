@@ -0,0 +1,69 @@
+"""
+Pruebas del bus de invalidación entre workers (sin conexión a Postgres).
+"""
+
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import invalidacion
+from app.core.invalidacion import CacheProceso
+
+
+def test_cache_expira_y_respeta_maximo():
+    cache = CacheProceso("prueba.lru", ttl=60, maximo=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")
+    cache.guardar("c", 3)
+    # "b" era el menos usado recientemente
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1 and cache.obtener("c") == 3
+
+    cache.ttl = -1
+    cache.guardar("d", 4)
+    assert cache.obtener("d") is None
+
+
+def test_mensaje_de_otro_worker_invalida():
+    cache = CacheProceso("prueba.remoto")
+    cache.guardar("u1", "datos")
+    cache.guardar("juan", "datos")
+
+    propio = json.dumps({"o": invalidacion.ORIGEN, "t": "prueba.remoto", "k": ["u1"]})
+    invalidacion.procesar_mensaje(propio)
+    assert cache.obtener("u1") == "datos"
+
+    ajeno = json.dumps({"o": "otro", "t": "prueba.remoto", "k": ["u1", "juan"]})
+    invalidacion.procesar_mensaje(ajeno)
+    assert cache.obtener("u1") is None and cache.obtener("juan") is None
+
+    # Los mensajes malformados se ignoran
+    invalidacion.procesar_mensaje("no es json")
+
+
+def test_despacho_local_solo_tras_commit():
+    cache = CacheProceso("prueba.commit")
+    engine = create_engine("sqlite://")
+
+    for confirmar in (False, True):
+        cache.guardar("u1", "datos")
+        with Session(engine) as session:
+            # Lo que haría `publicar` además de emitir el NOTIFY
+            session.info.setdefault("voces_invalidaciones", []).append(
+                ("prueba.commit", ("u1",))
+            )
+            assert cache.obtener("u1") == "datos"
+            if confirmar:
+                session.commit()
+            else:
+                session.rollback()
+        assert (cache.obtener("u1") is None) == confirmar
+
+
+if __name__ == "__main__":
+    test_cache_expira_y_respeta_maximo()
+    test_mensaje_de_otro_worker_invalida()
+    test_despacho_local_solo_tras_commit()
+    print("✓ Pruebas del bus de invalidación ejecutadas correctamente")
@@ -0,0 +1,87 @@
+"""
+Pruebas unitarias para el limitador de intentos de inicio de sesión.
+"""
+
+from app.core.limite_intentos import ContadorDeslizante, LimitadorLogin
+
+
+def test_contador_deslizante_pondera_ventana_anterior():
+    contador = ContadorDeslizante(ventana=60)
+    for _ in range(10):
+        contador.incrementar("ip", ahora=0)
+    # A mitad de la siguiente ventana cuenta la mitad de la anterior
+    assert contador.estimar("ip", ahora=90) == 5
+    # Dos ventanas después ya no queda nada
+    assert contador.estimar("ip", ahora=180) == 0
+
+
+def test_bloqueo_por_username():
+    limitador = LimitadorLogin(ventana=60, max_por_ip=100, max_por_usuario=3)
+    for i in range(3):
+        assert limitador.permitido("1.1.1.1", "juan", ahora=i)
+        limitador.registrar_fallo("1.1.1.1", "juan", ahora=i)
+    assert not limitador.permitido("2.2.2.2", "juan", ahora=5)
+    assert limitador.permitido("2.2.2.2", "maria", ahora=5)
+
+
+def test_bloqueo_por_ip():
+    limitador = LimitadorLogin(ventana=60, max_por_ip=5, max_por_usuario=100)
+    for i in range(5):
+        limitador.registrar_fallo("1.1.1.1", f"usuario_{i}", ahora=i)
+    assert not limitador.permitido("1.1.1.1", "otro", ahora=10)
+    assert limitador.permitido("1.1.1.1", "otro", ahora=200)
+
+
+def test_exito_reinicia_username():
+    limitador = LimitadorLogin(ventana=60, max_por_ip=100, max_por_usuario=2)
+    limitador.registrar_fallo("1.1.1.1", "juan", ahora=0)
+    limitador.registrar_fallo("1.1.1.1", "juan", ahora=1)
+    assert not limitador.permitido("1.1.1.1", "juan", ahora=2)
+    limitador.registrar_exito("juan")
+    assert limitador.permitido("1.1.1.1", "juan", ahora=2)
+
+
+def test_un_resumen_por_ventana():
+    limitador = LimitadorLogin(ventana=60)
+    for i in range(50):
+        limitador.registrar_fallo("1.1.1.1", f"u{i % 3}", ahora=i, bloqueado=i >= 20)
+    assert limitador.recolectar(ahora=30) == []
+
+    resumenes = limitador.recolectar(ahora=61)
+    assert len(resumenes) == 1
+    assert resumenes[0]["intentos"] == 50
+    assert resumenes[0]["bloqueados"] == 30
+    assert resumenes[0]["usernames_intentados"] == ["u0", "u1", "u2"]
+    assert limitador.recolectar(ahora=62) == []
+
+
+def test_intentos_rechazados_no_prolongan_el_bloqueo():
+    limitador = LimitadorLogin(ventana=60, max_por_ip=100, max_por_usuario=3)
+    for i in range(3):
+        limitador.registrar_fallo("1.1.1.1", "juan", ahora=i)
+    # Un atacante sigue enviando el username: se rechaza pero no cuenta
+    for i in range(6, 118):
+        assert not limitador.permitido("6.6.6.6", "juan", ahora=i * 0.5)
+        limitador.registrar_fallo("6.6.6.6", "juan", bloqueado=True, ahora=i * 0.5)
+    assert limitador.permitido("2.2.2.2", "juan", ahora=130)
+
+
+def test_contador_acotado_en_memoria():
+    contador = ContadorDeslizante(ventana=60, max_claves=3)
+    for i in range(10):
+        contador.incrementar(f"ip{i}", ahora=i)
+    assert len(contador) == 3
+    # Se descartan las más antiguas
+    assert contador.estimar("ip9", ahora=10) == 1
+    assert contador.estimar("ip0", ahora=10) == 0
+
+
+if __name__ == "__main__":
+    test_contador_deslizante_pondera_ventana_anterior()
+    test_bloqueo_por_username()
+    test_bloqueo_por_ip()
+    test_exito_reinicia_username()
+    test_un_resumen_por_ventana()
+    test_intentos_rechazados_no_prolongan_el_bloqueo()
+    test_contador_acotado_en_memoria()
+    print("✓ Pruebas del limitador de login ejecutadas correctamente")
@@ -0,0 +1,85 @@
+"""
+Pruebas unitarias para las métricas en formato Prometheus.
+"""
+
+import asyncio
+
+from app.core import metricas
+from app.core.metricas import Contador, Histograma, Medidor
+
+
+def test_contador_con_etiquetas():
+    contador = Contador("prueba_total", "Ayuda", ("ruta",))
+    contador.incrementar(ruta="/")
+    contador.incrementar(2, ruta="/")
+    texto = contador.renderizar()
+    assert "# TYPE prueba_total counter" in texto
+    assert 'prueba_total{ruta="/"} 3' in texto
+
+
+def test_medidor_sin_etiquetas_inicia_en_cero():
+    medidor = Medidor("prueba_en_curso", "Ayuda")
+    assert medidor.renderizar().endswith("prueba_en_curso 0")
+    medidor.sumar()
+    medidor.sumar()
+    medidor.restar()
+    assert medidor.renderizar().endswith("prueba_en_curso 1")
+
+
+def test_histograma_buckets_acumulativos():
+    histograma = Histograma("prueba_segundos", "Ayuda", buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 0.7, 3.0):
+        histograma.observar(valor)
+    texto = histograma.renderizar()
+    assert 'prueba_segundos_bucket{le="0.1"} 1' in texto
+    assert 'prueba_segundos_bucket{le="1"} 3' in texto
+    assert 'prueba_segundos_bucket{le="+Inf"} 4' in texto
+    assert "prueba_segundos_count 4" in texto
+
+
+def test_escapa_valores_de_etiquetas():
+    contador = Contador("prueba_escape_total", "Ayuda", ("ruta",))
+    contador.incrementar(ruta='a"b')
+    assert 'ruta="a\\"b"' in contador.renderizar()
+
+
+def test_metrica_sin_lineas_no_se_puede_instanciar():
+    try:
+        metricas._Metrica("prueba_abstracta", "Ayuda")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("_Metrica debe ser abstracta")
+
+
+def test_latencia_incluye_el_cuerpo_en_streaming():
+    import main
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await asyncio.sleep(0.02)
+            await send({"type": "http.response.body", "body": b"x", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def enviar(mensaje):
+        pass
+
+    antes = metricas.peticiones_total.valor(metodo="GET", ruta="sin_ruta", estado="200")
+    scope = {"type": "http", "method": "GET", "path": "/prueba-streaming"}
+    asyncio.run(main.MedirPeticiones(app)(scope, None, enviar))
+
+    serie = metricas.duracion_peticion._valores[("GET", "sin_ruta")]
+    assert serie.suma >= 0.06
+    assert metricas.peticiones_total.valor(metodo="GET", ruta="sin_ruta", estado="200") == antes + 1
+    assert metricas.peticiones_en_curso.valor() == 0
+
+
+if __name__ == "__main__":
+    test_contador_con_etiquetas()
+    test_medidor_sin_etiquetas_inicia_en_cero()
+    test_histograma_buckets_acumulativos()
+    test_escapa_valores_de_etiquetas()
+    test_metrica_sin_lineas_no_se_puede_instanciar()
+    test_latencia_incluye_el_cuerpo_en_streaming()
+    print("✓ Pruebas de métricas ejecutadas correctamente")
@@ -0,0 +1,118 @@
+"""
+Pruebas del perfilado de consultas (consultas lentas y detector de N+1).
+
+Usa SQLite en memoria con un engine instrumentado.
+"""
+
+import logging
+
+from sqlalchemy import create_engine, event, text
+
+from app.core import metricas, perfilado
+
+
+class _Capturador(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+def _preparar():
+    engine = create_engine("sqlite://")
+    perfilado.instrumentar_engine(engine)
+    capturador = _Capturador()
+    perfilado.logger.addHandler(capturador)
+    return engine, capturador
+
+
+def test_detecta_n_mas_1():
+    engine, capturador = _preparar()
+    muestreo_original = perfilado.MUESTREO
+    perfilado.MUESTREO = 1.0
+    try:
+        tokens = perfilado.iniciar_peticion("GET /logs/")
+        with engine.connect() as conn:
+            for i in range(perfilado.UMBRAL_N_MAS_1):
+                conn.execute(text("SELECT :i"), {"i": i})
+        perfilado.finalizar_peticion(tokens, "GET /logs/")
+    finally:
+        perfilado.MUESTREO = muestreo_original
+        perfilado.logger.removeHandler(capturador)
+
+    assert any("Posible N+1 en GET /logs/" in m for m in capturador.mensajes)
+
+
+def test_registra_consulta_lenta():
+    engine, capturador = _preparar()
+    umbral_original = perfilado.UMBRAL_LENTA_MS
+    perfilado.UMBRAL_LENTA_MS = 0
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        perfilado.UMBRAL_LENTA_MS = umbral_original
+        perfilado.logger.removeHandler(capturador)
+
+    assert any("Consulta lenta" in m and "SELECT 1" in m for m in capturador.mensajes)
+
+
+def test_plan_sin_reejecutar_ni_contar_la_consulta():
+    engine, capturador = _preparar()
+    metricas.instrumentar_engine(engine)
+    sentencias = []
+    event.listen(engine, "before_cursor_execute", lambda c, cur, sql, *a: sentencias.append(sql))
+    umbral_original, explain_original = perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN
+    perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN = 0, True
+    antes = metricas.consultas_total.valor()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN = umbral_original, explain_original
+        perfilado.logger.removeHandler(capturador)
+
+    explain = [sql for sql in sentencias if "SAVEPOINT" not in sql]
+    assert explain == ["SELECT 1", "EXPLAIN SELECT 1"]
+    assert metricas.consultas_total.valor() == antes + 1
+    assert not any("no se pudo obtener el plan" in m for m in capturador.mensajes)
+
+
+def test_explain_fallido_no_aborta_la_transaccion():
+    engine, capturador = _preparar()
+    sentencias = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("statement timeout")
+
+    umbral_original, explain_original = perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN
+    perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN = 0, True
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+            conn.execute(text("SELECT x FROM t"))
+            # La transacción sigue utilizable tras el EXPLAIN fallido
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+        with engine.connect() as conn:
+            total = conn.execute(text("SELECT count(*) FROM t")).scalar()
+    finally:
+        perfilado.UMBRAL_LENTA_MS, perfilado.CAPTURAR_EXPLAIN = umbral_original, explain_original
+        perfilado.logger.removeHandler(capturador)
+
+    assert total == 2
+    assert any(sql.startswith("ROLLBACK TO SAVEPOINT") for sql in sentencias)
+    assert any("no se pudo obtener el plan: statement timeout" in m for m in capturador.mensajes)
+
+
+if __name__ == "__main__":
+    test_detecta_n_mas_1()
+    test_registra_consulta_lenta()
+    test_plan_sin_reejecutar_ni_contar_la_consulta()
+    test_explain_fallido_no_aborta_la_transaccion()
+    print("✓ Pruebas de perfilado ejecutadas correctamente")
@@ -0,0 +1,66 @@
+"""
+Pruebas del renderizado de plantillas en streaming.
+"""
+
+import asyncio
+
+from app.core.templates import (
+    TAMANO_BLOQUE,
+    _generar_en_bloques,
+    entorno_streaming,
+    respuesta_streaming,
+    templates,
+)
+
+PAGINA = """<html><head><link rel="stylesheet" href="/static/app.css"></head>
+<body>{% for i in range(filas) %}<tr><td>{{ i }}</td><td>{{ texto }}</td></tr>{% endfor %}</body></html>"""
+
+
+def _bloques(plantilla, contexto) -> list[bytes]:
+    async def recoger():
+        return [bloque async for bloque in _generar_en_bloques(plantilla, contexto)]
+
+    return asyncio.run(recoger())
+
+
+def test_envia_el_head_primero_y_luego_bloques():
+    plantilla = entorno_streaming.from_string(PAGINA)
+    contexto = {"filas": 2000, "texto": "x" * 40}
+    bloques = _bloques(plantilla, contexto)
+
+    assert b"</head>" in bloques[0]
+    assert b"<tr>" not in bloques[0]
+    assert len(bloques) > 3
+    assert all(len(b) < TAMANO_BLOQUE + 200 for b in bloques)
+    # Mismo HTML que el renderizado síncrono de `templates.env`
+    assert b"".join(bloques).decode() == templates.env.from_string(PAGINA).render(contexto)
+
+
+def test_error_a_mitad_de_pagina_corta_la_respuesta():
+    plantilla = entorno_streaming.from_string(PAGINA.replace("{{ texto }}", "{{ 1 // (i - 1500) }}"))
+    bloques = _bloques(plantilla, {"filas": 2000})
+
+    html = b"".join(bloques)
+    assert html.startswith(b"<html><head>")
+    assert b"</html>" not in html
+
+
+def test_respuesta_streaming_es_html():
+    respuesta = respuesta_streaming("layout/base.html", {"request": None})
+    assert respuesta.media_type == "text/html; charset=utf-8"
+    assert respuesta.status_code == 200
+
+
+def test_entorno_streaming_es_asincrono_y_comparte_globales():
+    assert entorno_streaming.is_async and not templates.env.is_async
+    assert entorno_streaming.globals["user_initials"] is templates.env.globals["user_initials"]
+    # Cachés separadas: no se mezclan plantillas compiladas en modo síncrono
+    assert entorno_streaming.get_template("layout/base.html") is not templates.env.get_template("layout/base.html")
+
+
+if __name__ == "__main__":
+    test_envia_el_head_primero_y_luego_bloques()
+    test_error_a_mitad_de_pagina_corta_la_respuesta()
+    test_respuesta_streaming_es_html()
+    test_entorno_streaming_es_asincrono_y_comparte_globales()
+    print("✓ Pruebas de plantillas en streaming ejecutadas correctamente")
@@ -0,0 +1,70 @@
+"""
+Pruebas del enrutamiento de lecturas a la réplica (sin base de datos).
+"""
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, delete, event, insert, select, update
+from starlette.requests import Request
+
+from app.core import replica
+
+
+def _request(cookies: str = "", method: str = "GET") -> Request:
+    headers = [(b"cookie", cookies.encode())] if cookies else []
+    return Request({"type": "http", "method": method, "headers": headers})
+
+
+def test_detecta_escrituras_de_la_peticion():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "after_cursor_execute", replica._marcar_escritura)
+    tabla = Table("nota", MetaData(), Column("id", Integer, primary_key=True))
+    tabla.metadata.create_all(engine)
+
+    def escribio(*sentencias) -> bool:
+        token = replica.iniciar_peticion()
+        with engine.begin() as conn:
+            for sentencia in sentencias:
+                conn.execute(sentencia)
+        return replica.finalizar_peticion(token)
+
+    assert escribio(select(tabla)) is False
+    # Un WITH de solo lectura no es una escritura
+    recientes = select(tabla.c.id).cte("recientes")
+    assert escribio(select(recientes.c.id)) is False
+    assert escribio(insert(tabla).values(id=1)) is True
+    assert escribio(update(tabla).values(id=2)) is True
+    assert escribio(delete(tabla)) is True
+    # SELECT ... FOR UPDATE bloquea filas para escribirlas
+    assert escribio(select(tabla).with_for_update()) is True
+
+    # Fuera de una petición no se marca nada
+    with engine.begin() as conn:
+        conn.execute(delete(tabla))
+
+
+def test_lecturas_a_la_primaria_si_no_procede_la_replica():
+    engine_original = replica.engine_replica
+    disponible_original = replica._replica_disponible
+    try:
+        replica.engine_replica = object()
+        replica._replica_disponible = True
+        assert replica.usar_replica(_request())
+        # Lectura tras escritura
+        assert not replica.usar_replica(_request(f"{replica.COOKIE_PRIMARIA}=1"))
+        # Las escrituras leen de la primaria (misma sesión que get_session)
+        assert not replica.usar_replica(_request(method="POST"))
+        # Réplica atrasada o caída
+        replica._replica_disponible = False
+        assert not replica.usar_replica(_request())
+        # Sin réplica configurada
+        replica.engine_replica = None
+        replica._replica_disponible = True
+        assert not replica.usar_replica(_request())
+    finally:
+        replica.engine_replica = engine_original
+        replica._replica_disponible = disponible_original
+
+
+if __name__ == "__main__":
+    test_detecta_escrituras_de_la_peticion()
+    test_lecturas_a_la_primaria_si_no_procede_la_replica()
+    print("✓ Pruebas de la réplica de lectura ejecutadas correctamente")
@@ -0,0 +1,101 @@
+"""
+Pruebas de la sesión compartida por petición.
+"""
+
+import asyncio
+
+from app.core import sesion_peticion
+
+
+class _SesionFalsa:
+    def __init__(self, creadas: list):
+        self.cerrada = False
+        creadas.append(self)
+
+    async def close(self):
+        self.cerrada = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def test_una_sesion_por_peticion():
+    creadas = []
+
+    def fabrica():
+        return _SesionFalsa(creadas)
+
+    async def peticion():
+        token = sesion_peticion.iniciar_peticion()
+        async with sesion_peticion.sesion_compartida(fabrica) as primera:
+            pass
+        async with sesion_peticion.sesion_compartida(fabrica) as segunda:
+            assert segunda is primera
+        # Sigue abierta hasta que termina la petición
+        assert not primera.cerrada
+        await sesion_peticion.finalizar_peticion(token)
+        assert primera.cerrada
+
+    asyncio.run(peticion())
+    assert len(creadas) == 1
+
+
+def test_sin_peticion_abre_y_cierra_su_propia_sesion():
+    creadas = []
+
+    async def tarea():
+        async with sesion_peticion.sesion_compartida(lambda: _SesionFalsa(creadas)) as sesion:
+            assert not sesion.cerrada
+        assert sesion.cerrada
+
+    asyncio.run(tarea())
+    asyncio.run(tarea())
+    assert len(creadas) == 2
+
+
+def test_perezosa_sin_uso_no_crea_sesion():
+    async def peticion():
+        token = sesion_peticion.iniciar_peticion()
+        await sesion_peticion.finalizar_peticion(token)
+
+    asyncio.run(peticion())
+
+
+def test_recarga_del_usuario_usa_su_propia_sesion(monkeypatch):
+    import main
+    from app.core import database
+
+    creadas = []
+
+    def fabrica():
+        return _SesionFalsa(creadas)
+
+    async def cargar(session, username):
+        return session
+
+    monkeypatch.setattr(main, "async_session_maker", fabrica)
+    monkeypatch.setattr(database, "async_session_maker", fabrica)
+    monkeypatch.setattr(main, "cargar_usuario_actual", cargar)
+
+    async def peticion():
+        token = sesion_peticion.iniciar_peticion()
+        usada_en_recarga = await main._recargar_usuario("ana")
+        # La recarga se comparte entre peticiones: no usa la sesión de esta
+        # y la cierra al terminar
+        assert usada_en_recarga.cerrada
+        async for session in database.get_session():
+            assert session is not usada_en_recarga
+        await sesion_peticion.finalizar_peticion(token)
+
+    asyncio.run(peticion())
+    assert len(creadas) == 2
+
+
+if __name__ == "__main__":
+    test_una_sesion_por_peticion()
+    test_sin_peticion_abre_y_cierra_su_propia_sesion()
+    test_perezosa_sin_uso_no_crea_sesion()
+    print("✓ Pruebas de la sesión por petición ejecutadas correctamente")
@@ -0,0 +1,196 @@
+"""
+Pruebas de la cola de trabajos.
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.core import trabajos
+from app.core.cron import Cron
+
+
+class _SesionFalsa:
+    """Registra las sentencias y simula que cada INSERT crea una fila."""
+
+    def __init__(self):
+        self.info = {}
+        self.sentencias = []
+        self.confirmada = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, parametros=None):
+        self.sentencias.append(statement)
+
+        class _Resultado:
+            def first(self):
+                return (1,)
+
+        return _Resultado()
+
+    async def commit(self):
+        self.confirmada = True
+
+
+def _sql(statement) -> str:
+    return " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+
+def test_reclamo_con_skip_locked():
+    sql = _sql(trabajos._sentencia_tomar(50))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert sql.startswith("WITH disponibles AS")
+    assert "RETURNING trabajo.id, trabajo.tipo, trabajo.argumentos" in sql
+
+
+def test_espera_exponencial_acotada():
+    esperas = [trabajos.calcular_espera(i) for i in range(1, 6)]
+    for intento, espera in enumerate(esperas, start=1):
+        base = trabajos.ESPERA_BASE * 2 ** (intento - 1)
+        assert base * 0.8 <= espera <= base * 1.2
+    assert trabajos.calcular_espera(50) <= trabajos.ESPERA_MAXIMA * 1.2
+
+
+def test_encolar_valida_el_tipo_y_avisa_una_vez():
+    @trabajos.trabajo("prueba_eco")
+    async def eco(valor):
+        return valor
+
+    async def escenario():
+        session = _SesionFalsa()
+        try:
+            await trabajos.encolar(session, "no_existe")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Se encoló un tipo desconocido")
+
+        assert await trabajos.encolar(session, "prueba_eco", {"valor": 1})
+        assert await trabajos.encolar(session, "prueba_eco", {"valor": 2}, clave_unica="eco:2")
+        avisos = [s for s in session.sentencias if "pg_notify" in str(s)]
+        assert len(avisos) == 1
+        # Infiere el índice único parcial: los Fallido no bloquean la clave
+        assert "ON CONFLICT (clave_unica) WHERE estado <> 'Fallido' DO NOTHING" in _sql(session.sentencias[-1])
+
+    asyncio.run(escenario())
+
+
+def test_ejecutar_reporta_errores():
+    @trabajos.trabajo("prueba_falla")
+    async def falla():
+        raise RuntimeError("sin conexión")
+
+    async def escenario():
+        ok = trabajos._Tomado(1, "prueba_eco", {"valor": 1}, 1, 5)
+        error = trabajos._Tomado(2, "prueba_falla", {}, 1, 5)
+        desconocido = trabajos._Tomado(3, "no_existe", {}, 1, 5)
+        assert await trabajos._ejecutar(ok) is None
+        assert "sin conexión" in await trabajos._ejecutar(error)
+        assert "desconocido" in await trabajos._ejecutar(desconocido)
+
+    trabajos.trabajo("prueba_eco")(lambda valor: asyncio.sleep(0))
+    asyncio.run(escenario())
+
+
+def test_reclama_solo_cupos_libres_y_finaliza_cada_trabajo(monkeypatch):
+    liberar_lento = asyncio.Event()
+
+    @trabajos.trabajo("prueba_lenta")
+    async def lenta():
+        await liberar_lento.wait()
+
+    trabajos.trabajo("prueba_eco")(lambda valor: asyncio.sleep(0))
+    cola = [trabajos._Tomado(1, "prueba_lenta", {}, 1, 5)] + [
+        trabajos._Tomado(i, "prueba_eco", {"valor": i}, 1, 5) for i in range(2, 6)
+    ]
+    pedidos, finalizados, liberados = [], [], []
+
+    async def reclamar(limite):
+        pedidos.append(limite)
+        tomados, cola[:] = cola[:limite], cola[limite:]
+        return tomados
+
+    async def finalizar(tomado, error):
+        finalizados.append(tomado.id)
+
+    async def liberar(ids):
+        liberados.extend(ids)
+
+    monkeypatch.setattr(trabajos, "reclamar", reclamar)
+    monkeypatch.setattr(trabajos, "_finalizar", finalizar)
+    monkeypatch.setattr(trabajos, "_liberar", liberar)
+    monkeypatch.setattr(trabajos, "cargar_manejadores", lambda: None)
+    monkeypatch.setattr(trabajos, "CONCURRENCIA", 2)
+    monkeypatch.setattr(trabajos, "INTERVALO_SONDEO", 0.01)
+
+    async def escenario():
+        tarea = asyncio.create_task(trabajos.tarea_trabajos())
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(finalizados) == 4:
+                break
+        # Los rápidos se finalizan sin esperar al lento, que sigue en curso
+        assert finalizados == [2, 3, 4, 5]
+        tarea.cancel()
+        await asyncio.gather(tarea, return_exceptions=True)
+
+    asyncio.run(escenario())
+    # Nunca se reclaman más trabajos que cupos libres
+    assert pedidos[0] == 2 and all(p <= 1 for p in pedidos[1:])
+    # Al detenerse, el trabajo en curso vuelve a la cola
+    assert liberados == [1]
+
+
+def test_periodicos_se_encolan_una_vez_por_ejecucion(monkeypatch):
+    sesiones = []
+    ya_encolada = []
+
+    class _SesionProgramador(_SesionFalsa):
+        async def execute(self, statement, parametros=None):
+            resultado = await super().execute(statement, parametros)
+            if len(self.sentencias) == 1 and ya_encolada:
+                # Otro programador ya avanzó la ejecución: no retorna fila
+                resultado.first = lambda: None
+            return resultado
+
+    def fabrica():
+        sesiones.append(_SesionProgramador())
+        return sesiones[-1]
+
+    monkeypatch.setattr(trabajos, "async_session_maker", fabrica)
+    trabajos.trabajo("prueba_periodica")(lambda: asyncio.sleep(0))
+    periodico = trabajos.Periodico("prueba_periodica", Cron("*/10 * * * *"), "prueba_periodica", {})
+    monkeypatch.setattr(trabajos, "_periodicos", [periodico])
+
+    proximas = {"prueba_periodica": datetime(2025, 3, 1, 12, 10)}
+    asyncio.run(trabajos.encolar_periodicos(proximas, datetime(2025, 3, 1, 12, 9)))
+    assert not sesiones
+
+    asyncio.run(trabajos.encolar_periodicos(proximas, datetime(2025, 3, 1, 12, 10, 5)))
+    assert proximas["prueba_periodica"] == datetime(2025, 3, 1, 12, 20)
+    marca, insert = sesiones[0].sentencias[0], sesiones[0].sentencias[1]
+    sql = _sql(marca)
+    assert "ON CONFLICT (nombre) DO UPDATE" in sql
+    assert "WHERE ejecucion_periodica.ultima_ejecucion < excluded.ultima_ejecucion" in sql
+    assert "INSERT INTO trabajo" in _sql(insert)
+    assert sesiones[0].confirmada
+
+    # Otro worker ya encoló esa ejecución (aunque el trabajo ya se haya borrado)
+    ya_encolada.append(True)
+    proximas["prueba_periodica"] = datetime(2025, 3, 1, 12, 10)
+    asyncio.run(trabajos.encolar_periodicos(proximas, datetime(2025, 3, 1, 12, 10, 5)))
+    assert not any("INSERT INTO trabajo" in _sql(s) for s in sesiones[1].sentencias if hasattr(s, "compile"))
+
+
+if __name__ == "__main__":
+    test_reclamo_con_skip_locked()
+    test_espera_exponencial_acotada()
+    test_encolar_valida_el_tipo_y_avisa_una_vez()
+    test_ejecutar_reporta_errores()
+    print("✓ Pruebas de la cola de trabajos ejecutadas correctamente")
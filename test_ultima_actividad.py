@@ -0,0 +1,60 @@
+"""
+Pruebas del registro diferido de ultima_actividad.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app.core import ultima_actividad
+from app.models import Usuario
+
+
+def _limpiar():
+    ultima_actividad._pendientes.clear()
+    ultima_actividad._aceptados.clear()
+
+
+def test_registrar_una_vez_por_ventana():
+    _limpiar()
+    primera = datetime(2025, 3, 1, 12, 0)
+    ultima_actividad.registrar("u1", primera)
+    ultima_actividad.registrar("u1", primera + timedelta(seconds=1))
+    ultima_actividad.registrar("u2", primera)
+
+    assert ultima_actividad._pendientes == {"u1": primera, "u2": primera}
+    assert ultima_actividad.ultima_actividad_local("u1") == primera
+    _limpiar()
+
+
+def test_lote_no_retrocede_ni_toca_actualizado_en():
+    sentencia = ultima_actividad._sentencia_lote(
+        [("u1", datetime(2025, 3, 1, 12, 0)), ("u2", datetime(2025, 3, 1, 12, 1))]
+    )
+    sql = " ".join(str(sentencia.compile(dialect=postgresql.dialect())).split())
+    assert sql.startswith("UPDATE usuario SET")
+    assert "FROM (VALUES" in sql
+    assert "usuario.ultima_actividad < lote.momento" in sql
+    assert "actualizado_en=usuario.actualizado_en" in sql
+    assert "now()" not in sql
+
+
+def test_esta_en_linea():
+    _limpiar()
+    ahora = datetime(2025, 3, 1, 12, 0)
+    usuario = Usuario(username="ana", email="ana@example.com", password="x", nombres="Ana", apellidos="Díaz")
+
+    assert not ultima_actividad.esta_en_linea(usuario, ahora)
+    usuario.ultima_actividad = ahora - timedelta(minutes=ultima_actividad.EN_LINEA_MINUTOS + 1)
+    assert not ultima_actividad.esta_en_linea(usuario, ahora)
+    # La actividad aún no persistida también cuenta
+    ultima_actividad.registrar(usuario.id, ahora - timedelta(seconds=30))
+    assert ultima_actividad.esta_en_linea(usuario, ahora)
+    _limpiar()
+
+
+if __name__ == "__main__":
+    test_registrar_una_vez_por_ventana()
+    test_lote_no_retrocede_ni_toca_actualizado_en()
+    test_esta_en_linea()
+    print("✓ Pruebas de ultima_actividad ejecutadas correctamente")
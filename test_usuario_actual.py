@@ -0,0 +1,111 @@
+"""
+Pruebas del usuario actual construido desde los claims del JWT.
+"""
+
+import asyncio
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core import usuario_actual
+from app.core.seguridad import ACCESS_TOKEN_EXPIRE_MINUTES, crear_access_token
+from app.core.usuario_actual import UsuarioActual, crear_token_usuario, usuario_desde_token
+from app.models import RolUsuario
+
+
+def _usuario(version: int = 0) -> UsuarioActual:
+    return UsuarioActual(
+        "ABC123", "juan", "Juan", "Pérez", None, RolUsuario.Editor, version
+    )
+
+
+def test_token_vigente_no_requiere_db():
+    usuario, recargar = usuario_desde_token(crear_token_usuario(_usuario()))
+    assert recargar is None
+    assert usuario.id == "ABC123" and usuario.nombres == "Juan"
+    assert usuario.rol is RolUsuario.Editor
+
+
+def test_token_anterior_a_la_version_vigente():
+    token = crear_token_usuario(_usuario(version=1))
+    usuario_actual.registrar_version("ABC123", 2)
+    try:
+        usuario, recargar = usuario_desde_token(token)
+        assert usuario is None and recargar["sub"] == "juan"
+        # Un token con la versión nueva vuelve a ser válido
+        usuario, recargar = usuario_desde_token(crear_token_usuario(_usuario(version=2)))
+        assert usuario is not None and recargar is None
+        # La versión nunca retrocede (mensajes desordenados)
+        usuario_actual.registrar_version("ABC123", 1)
+        assert usuario_actual.version_vigente("ABC123") == 2
+    finally:
+        usuario_actual._versiones.pop("ABC123", None)
+
+
+def test_tokens_antiguos_e_invalidos():
+    # Token emitido antes de incluir los claims: se recarga desde la DB
+    usuario, recargar = usuario_desde_token(crear_access_token({"sub": "juan"}))
+    assert usuario is None and recargar["sub"] == "juan"
+    assert usuario_desde_token("no-es-un-jwt") == (None, None)
+
+
+def test_token_sin_datos_personales_y_cookie_con_su_duracion():
+    claims = _usuario().claims()
+    assert "em" not in claims and "email" not in claims
+    assert usuario_actual.DURACION_COOKIE == ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+def _atender_con_token(token: str):
+    """Pasa una petición con la cookie de sesión por `inject_current_user`."""
+    import main
+
+    cookie = f'access_token="Bearer {token}"'.encode()
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"cookie", cookie)]})
+
+    async def call_next(request):
+        return Response("ok")
+
+    response = asyncio.run(main.inject_current_user(request, call_next))
+    return request.state.usuario_actual, response.headers.getlist("set-cookie")
+
+
+def test_fallo_al_recargar_no_cierra_la_sesion(monkeypatch):
+    import main
+
+    async def recargar_con_error(username):
+        raise TimeoutError("pool agotado")
+
+    monkeypatch.setattr(main, "_recargar_usuario", recargar_con_error)
+    monkeypatch.setattr(main.ultima_actividad, "registrar", lambda usuario_id: None)
+    usuario_actual.registrar_version("ABC123", 2)
+    try:
+        usuario, cookies = _atender_con_token(crear_token_usuario(_usuario(version=1)))
+    finally:
+        usuario_actual._versiones.pop("ABC123", None)
+    # Se atiende con los claims del token y la cookie queda intacta
+    assert usuario is not None and usuario.id == "ABC123"
+    assert cookies == []
+
+
+def test_cuenta_sin_sesion_borra_la_cookie(monkeypatch):
+    import main
+
+    async def recargar_sin_usuario(username):
+        return None
+
+    monkeypatch.setattr(main, "_recargar_usuario", recargar_sin_usuario)
+    usuario_actual.registrar_version("ABC123", 2)
+    try:
+        usuario, cookies = _atender_con_token(crear_token_usuario(_usuario(version=1)))
+    finally:
+        usuario_actual._versiones.pop("ABC123", None)
+    assert usuario is None
+    assert len(cookies) == 1 and cookies[0].startswith("access_token=")
+
+
+if __name__ == "__main__":
+    test_token_vigente_no_requiere_db()
+    test_token_anterior_a_la_version_vigente()
+    test_tokens_antiguos_e_invalidos()
+    test_token_sin_datos_personales_y_cookie_con_su_duracion()
+    print("✓ Pruebas del usuario actual ejecutadas correctamente")
@@ -0,0 +1,128 @@
+"""
+Pruebas de los modelos de lectura de las vistas de listado.
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+from starlette.requests import Request
+
+from app.core import usuario_actual
+from app.core.usuario_actual import UsuarioActual, cargar_usuario_actual
+from app.models import AutorLog, FilaLog, FilaPerfil, FilaUsuario, RolUsuario, TipoAccion
+
+
+def test_columnas_coinciden_con_campos():
+    for vista in (FilaUsuario, FilaPerfil, FilaLog, AutorLog):
+        assert tuple(c.key for c in vista.columnas) == vista._fields
+    assert "password" not in FilaUsuario._fields
+
+
+class _SesionFalsa:
+    def __init__(self, fila):
+        self.fila = fila
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        fila = self.fila
+
+        class _Resultado:
+            def first(self):
+                return fila
+
+        return _Resultado()
+
+
+def test_usuario_actual_se_carga_por_columnas():
+    session = _SesionFalsa(("ABC123", "ana", "Ana", "Díaz", None, RolUsuario.Usuario, 2))
+    usuario = asyncio.run(cargar_usuario_actual(session, "ana"))
+
+    assert isinstance(usuario, UsuarioActual)
+    assert (usuario.id, usuario.username, usuario.version_token) == ("ABC123", "ana", 2)
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "usuario.password" not in sql and "usuario.biografia" not in sql
+    usuario_actual._versiones.pop("ABC123", None)
+
+
+class _SesionFilas:
+    def __init__(self, filas):
+        self.filas = filas
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return iter(self.filas)
+
+
+def _peticion(ruta: str) -> Request:
+    import main
+
+    peticion = Request(
+        {"type": "http", "method": "GET", "path": ruta, "query_string": b"", "headers": [], "app": main.app}
+    )
+    peticion.state.usuario_actual = None
+    return peticion
+
+
+def test_listado_de_logs_se_renderiza():
+    from app.routes.logs import listar_logs
+
+    creado = datetime(2025, 3, 1, 12, 0)
+    session = _SesionFilas([
+        (1, TipoAccion.Login, "Inicio de sesión", True, creado, "ana", "Ana", "Díaz"),
+        (2, TipoAccion.IntentoLoginFallido, "Intento fallido", False, creado, None, None, None),
+    ])
+
+    async def renderizar():
+        respuesta = await listar_logs(_peticion("/logs/"), None, None, [], session)
+        partes = [b async for b in respuesta.body_iterator]
+        return respuesta, b"".join(p if isinstance(p, bytes) else p.encode() for p in partes).decode()
+
+    respuesta, html = asyncio.run(renderizar())
+    assert respuesta.status_code == 200
+    assert "Inicio de sesión" in html and "Intento fallido" in html
+    assert "ana" in html
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert "logactividad.detalles" not in sql and "usuario.password" not in sql
+
+
+def test_perfil_y_actividad_en_una_sesion():
+    from app.routes.usuarios import _consultar_perfil
+
+    creado = datetime(2025, 3, 1, 12, 0)
+
+    class _SesionPerfil:
+        def __init__(self):
+            self.sentencias = []
+
+        async def execute(self, statement):
+            self.sentencias.append(statement)
+            if len(self.sentencias) == 1:
+                fila = ("ABC123", "ana", "Ana", "Díaz", None, creado, None, 3, 7)
+
+                class _Resultado:
+                    def first(self):
+                        return fila
+
+                return _Resultado()
+            return iter([(1, TipoAccion.Login, "Inicio de sesión", True, creado)])
+
+    session = _SesionPerfil()
+    usuario, actividad, siguiente = asyncio.run(_consultar_perfil(session, "ana", (), None))
+
+    assert isinstance(usuario, FilaPerfil) and usuario.total_comentarios == 7
+    assert isinstance(actividad, tuple) and isinstance(actividad[0], FilaLog)
+    assert siguiente is None
+    assert len(session.sentencias) == 2
+    sql = str(session.sentencias[0].compile(dialect=postgresql.dialect()))
+    assert "usuario.password" not in sql and "perfildemografico" not in sql
+
+
+if __name__ == "__main__":
+    test_columnas_coinciden_con_campos()
+    test_usuario_actual_se_carga_por_columnas()
+    test_listado_de_logs_se_renderiza()
+    test_perfil_y_actividad_en_una_sesion()
+    print("✓ Pruebas de modelos de lectura ejecutadas correctamente")
@@ -0,0 +1,75 @@
+"""
+Pruebas de la deduplicación de lecturas concurrentes (single-flight).
+"""
+
+import asyncio
+
+from app.core import metricas
+from app.core.vuelo_unico import _en_curso, compartir
+
+
+def test_lecturas_simultaneas_comparten_una_ejecucion():
+    llamadas = []
+
+    async def cargar(clave):
+        llamadas.append(clave)
+        await asyncio.sleep(0.01)
+        return {"clave": clave}
+
+    async def escenario():
+        antes = metricas.lecturas_compartidas_total.valor(operacion="prueba")
+        resultados = await asyncio.gather(
+            *(compartir("prueba", "ana", lambda: cargar("ana")) for _ in range(20)),
+            compartir("prueba", "juan", lambda: cargar("juan")),
+        )
+        assert all(r is resultados[0] for r in resultados[:20])
+        assert resultados[20] == {"clave": "juan"}
+        assert sorted(llamadas) == ["ana", "juan"]
+        assert metricas.lecturas_compartidas_total.valor(operacion="prueba") - antes == 19
+        assert not _en_curso
+
+        # Terminada la lectura, la siguiente vuelve a consultar
+        await compartir("prueba", "ana", lambda: cargar("ana"))
+        assert llamadas.count("ana") == 2
+
+    asyncio.run(escenario())
+
+
+def test_cancelar_a_quien_lanzo_la_lectura_no_afecta_a_los_demas():
+    async def cargar():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def escenario():
+        primera = asyncio.ensure_future(compartir("prueba", "x", cargar))
+        await asyncio.sleep(0)
+        segunda = asyncio.ensure_future(compartir("prueba", "x", cargar))
+        await asyncio.sleep(0)
+        primera.cancel()
+        assert await segunda == 42
+
+    asyncio.run(escenario())
+
+
+def test_los_errores_llegan_a_todos_y_no_quedan_en_curso():
+    async def cargar():
+        await asyncio.sleep(0)
+        raise RuntimeError("sin conexión")
+
+    async def escenario():
+        resultados = await asyncio.gather(
+            compartir("prueba", "y", cargar),
+            compartir("prueba", "y", cargar),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in resultados)
+        assert not _en_curso
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_lecturas_simultaneas_comparten_una_ejecucion()
+    test_cancelar_a_quien_lanzo_la_lectura_no_afecta_a_los_demas()
+    test_los_errores_llegan_a_todos_y_no_quedan_en_curso()
+    print("✓ Pruebas de lecturas compartidas ejecutadas correctamente")